@@ -0,0 +1,57 @@
+"""
+批量创建外链基准测试
+
+在临时数据库中分别测量逐个调用 create_external_link（每个外链一次写事务）
+和 create_external_links_bulk（一个事务内逐行插入）的耗时。
+
+用法:
+    python benchmarks/bench_bulk_create.py [数量 ...]
+"""
+import contextlib
+import io
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.database import CloudDriveDatabase  # noqa: E402
+from utils.bloom import get_link_filter  # noqa: E402
+
+
+def run(label, count, create):
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        created = create(count)
+    elapsed = time.perf_counter() - start
+    print(f"{label:<10} {count:>7} 个  {elapsed * 1000:10.1f}ms  {count / elapsed:10.0f} 个/秒  创建 {created}")
+
+
+def main():
+    counts = [int(arg) for arg in sys.argv[1:]] or [10000, 100000]
+    # 逐个创建太慢，最多测量1万个
+    single_max = 10000
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "bench.db")
+        db = CloudDriveDatabase(db_path)
+        get_link_filter(db_path)
+        db.add_drive_provider("夸克网盘", {"data": {}})
+        drive_id = db.add_user_drive("夸克网盘", {"data": {}})
+
+        def single(count):
+            return sum(1 for _ in range(count) if db.create_external_link(drive_id, 1))
+
+        def bulk(count):
+            return len(db.create_external_links_bulk(count, drive_id, 1) or [])
+
+        for count in counts:
+            if count <= single_max:
+                run("single", count, single)
+            run("bulk", count, bulk)
+        db.close()
+
+
+if __name__ == '__main__':
+    main()
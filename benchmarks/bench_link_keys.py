@@ -0,0 +1,103 @@
+"""
+外链标识存储基准测试
+
+在临时数据库中分别按旧结构（TEXT格式的UUID，REAL配额）和新结构（BLOB标识，INTEGER配额）
+建表并插入相同数量的外链，比较唯一索引与整表的大小，以及按公开标识查询的耗时。
+新结构的查询耗时包含短码解码。
+
+用法:
+    python benchmarks/bench_link_keys.py [数量] [标识字节数]
+"""
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import time
+import uuid
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.linkcode import encode_link_key, decode_link_code  # noqa: E402
+
+
+LAYOUTS = {
+    "uuid": (
+        "CREATE TABLE external_links (id INTEGER PRIMARY KEY AUTOINCREMENT, drive_id INTEGER NOT NULL, "
+        "total_quota REAL NOT NULL, used_quota REAL NOT NULL DEFAULT 0, link_uuid TEXT UNIQUE NOT NULL, "
+        "expiry_epoch INTEGER)",
+        "SELECT id, used_quota, total_quota FROM external_links WHERE link_uuid = ?",
+    ),
+    "link_key": (
+        "CREATE TABLE external_links (id INTEGER PRIMARY KEY AUTOINCREMENT, drive_id INTEGER NOT NULL, "
+        "total_quota INTEGER NOT NULL, used_quota INTEGER NOT NULL DEFAULT 0, link_key BLOB UNIQUE NOT NULL, "
+        "expiry_epoch INTEGER)",
+        "SELECT id, used_quota, total_quota FROM external_links WHERE link_key = ?",
+    ),
+}
+
+
+def table_sizes(conn):
+    """返回 (表大小, 唯一索引大小)，单位字节，SQLite未编译dbstat时返回None"""
+    try:
+        rows = dict(conn.execute(
+            "SELECT name, SUM(pgsize) FROM dbstat WHERE name IN "
+            "('external_links', 'sqlite_autoindex_external_links_1') GROUP BY name"
+        ).fetchall())
+    except sqlite3.OperationalError:
+        return None
+    return rows.get("external_links", 0), rows.get("sqlite_autoindex_external_links_1", 0)
+
+
+def build(path, layout, identifiers):
+    create_sql, _ = LAYOUTS[layout]
+    conn = sqlite3.connect(path)
+    conn.execute(create_sql)
+    with conn:
+        conn.executemany(
+            f"INSERT INTO external_links (drive_id, total_quota, used_quota, {'link_uuid' if layout == 'uuid' else 'link_key'}, expiry_epoch) "
+            "VALUES (1, 3, 0, ?, 1900000000)",
+            ((value,) for value in identifiers)
+        )
+    conn.execute("VACUUM")
+    return conn
+
+
+def lookup(conn, layout, public_ids):
+    _, query = LAYOUTS[layout]
+    start = time.perf_counter()
+    for public_id in public_ids:
+        param = public_id if layout == "uuid" else decode_link_code(public_id)
+        conn.execute(query, (param,)).fetchone()
+    return time.perf_counter() - start
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 200000
+    key_bytes = int(sys.argv[2]) if len(sys.argv) > 2 else 12
+    lookups = min(count, 50000)
+
+    uuids = [str(uuid.uuid4()) for _ in range(count)]
+    keys = [os.urandom(key_bytes) for _ in range(count)]
+    sample = random.sample(range(count), lookups)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        print(f"{count} 个外链，随机查询 {lookups} 次，新标识 {key_bytes} 字节（短码 {len(encode_link_key(keys[0]))} 位）")
+        for layout, identifiers, public_ids in (
+            ("uuid", uuids, [uuids[i] for i in sample]),
+            ("link_key", keys, [encode_link_key(keys[i]) for i in sample]),
+        ):
+            path = os.path.join(tmp, f"{layout}.db")
+            conn = build(path, layout, identifiers)
+            sizes = table_sizes(conn)
+            # 预热页缓存后再计时
+            lookup(conn, layout, public_ids[:1000])
+            elapsed = lookup(conn, layout, public_ids)
+            size_text = (f"表 {sizes[0] / 1024:9.0f}KB  索引 {sizes[1] / 1024:9.0f}KB" if sizes
+                         else f"文件 {os.path.getsize(path) / 1024:9.0f}KB")
+            print(f"{layout:<9} {size_text}  查询 {elapsed / lookups * 1e6:6.2f}us/次")
+            conn.close()
+
+
+if __name__ == '__main__':
+    main()
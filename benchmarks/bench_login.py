@@ -0,0 +1,83 @@
+"""
+上游登录延迟基准测试
+
+在本地启动一个模拟夸克登录接口的HTTP服务，分别测量每次新建会话（旧实现）
+和复用进程级会话时 login_quark 的延迟分布。
+
+用法:
+    python benchmarks/bench_login.py [请求数] [并发数]
+"""
+import contextlib
+import io
+import json
+import os
+import statistics
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import requests
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils import login  # noqa: E402
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    """模拟登录接口，始终返回登录成功"""
+    protocol_version = "HTTP/1.1"
+    # 响应头和响应体分两次写出，保持连接时需关闭Nagle算法，否则会遇到40ms的延迟确认
+    disable_nagle_algorithm = True
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get('Content-Length', 0)))
+        body = json.dumps({"status": 2000000}).encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def percentile(samples, pct):
+    samples = sorted(samples)
+    return samples[min(len(samples) - 1, int(len(samples) * pct / 100))]
+
+
+def run(label, requests_count, concurrency, session_factory):
+    config_vars = {"queryParams": "a=1&t=", "data": {"client_id": "532", "v": "1.2"}}
+
+    def one(_):
+        start = time.perf_counter()
+        login.login_quark("token", config_vars, session=session_factory())
+        return (time.perf_counter() - start) * 1000
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        with ThreadPoolExecutor(concurrency) as executor:
+            samples = list(executor.map(one, range(requests_count)))
+    print(f"{label:<8} p50={statistics.median(samples):7.2f}ms  p99={percentile(samples, 99):7.2f}ms  "
+          f"mean={statistics.mean(samples):7.2f}ms")
+
+
+def main():
+    requests_count = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    concurrency = int(sys.argv[2]) if len(sys.argv) > 2 else 8
+
+    server = ThreadingHTTPServer(('127.0.0.1', 0), StubHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    login.QUARK_LOGIN_URL = f"http://127.0.0.1:{server.server_port}/cas/ajax/loginWithKpsAndQrcodeToken"
+
+    print(f"{requests_count} 次登录，并发 {concurrency}，本地模拟服务（不含TLS握手）")
+    run("fresh", requests_count, concurrency, requests.Session)
+    shared = login.get_session("quark")
+    run("pooled", requests_count, concurrency, lambda: shared)
+    server.shutdown()
+
+
+if __name__ == '__main__':
+    main()
@@ -11,11 +11,92 @@ TEMPLATES_AUTO_RELOAD= True
 DEFAULT_EXPIRY_HOURS = 24  # 外链默认过期时间（小时）
 MAX_QUOTA_PER_LINK = 100   # 每个外链的最大使用次数
 
-# 日志配置
+# 日志配置（JSON格式，每行一条）
 LOG_LEVEL = 'INFO'
 LOG_FILE = 'logs/app.log'
-LOG_MAX_SIZE = 10240    # 日志文件最大大小（字节）
-LOG_BACKUP_COUNT = 10   # 日志备份文件数量
+LOG_MAX_SIZE = 10485760 # 日志文件最大大小（字节），超过后轮转
+LOG_BACKUP_COUNT = 5    # 日志备份文件数量
+LOG_QUEUE_SIZE = 10000  # 等待写入的日志队列容量，写入跟不上时丢弃新日志而不阻塞请求
+LOG_CONSOLE_LEVEL = 'WARNING'  # 同时输出到控制台的最低级别，None表示不输出
+# 访问日志按endpoint采样的保留比例，未列出的endpoint全部记录，WARNING及以上级别不采样
+LOG_SAMPLING = {"login_job": 0.05, "qrlink": 0.2, "static": 0.01}
 
 #数据库
-DATABASE = 'database.db'
\ No newline at end of file
+DATABASE = 'database.db'
+DB_POOL_SIZE = 8        # 连接池保留的最大空闲连接数
+DB_WRITE_BATCH_SIZE = 64  # 写线程单次提交最多合并的写操作数
+DB_WRITE_TIMEOUT = 30     # 等待写操作提交的超时（秒），超时后请求报错而不是一直等待
+
+# 缓存配置
+LINK_CACHE_SIZE = 1024  # 外链解析缓存的最大条目数
+LINK_CACHE_TTL = 30     # 外链解析缓存的存活时间（秒）
+LINK_FILTER_ERROR_RATE = 0.001  # 外链短码布隆过滤器的目标误判率
+JSON_MEMO_SIZE = 4096            # 已解析的网盘登录配置与服务商配置的缓存条数
+LOGIN_TEMPLATE_CACHE_SIZE = 1024  # 编译后的网盘登录请求模板的最大缓存条数
+LOGIN_TEMPLATE_CACHE_TTL = 60     # 登录请求模板的存活时间（秒）；登录配置更新后按网盘行版本号立即重新编译
+LINK_KEY_BYTES = 12             # 新建外链的标识长度（8-16字节），12字节对应17位短码
+# 外链令牌签名密钥，密钥ID -> 密钥（至少16字节的随机值）；未配置时不启用令牌，密钥为占位值时拒绝启动
+# 轮换时加入新密钥并设为签发密钥，旧密钥保留到其签发的令牌全部过期
+# LINK_TOKEN_KEYS = {"2025a": "replace-with-random-secret"}
+# LINK_TOKEN_ACTIVE_KEY = "2025a"
+
+# 上游网盘接口配置
+UPSTREAM_POOL_SIZE = 16         # 每个上游主机保持的最大连接数
+UPSTREAM_CONNECT_TIMEOUT = 3.05 # 连接超时（秒）
+UPSTREAM_READ_TIMEOUT = 10      # 读取超时（秒）
+UPSTREAM_RETRIES = 2            # 建立连接失败时的重试次数
+
+# 异步登录任务配置
+LOGIN_JOB_WORKERS = 8        # 执行上游登录的线程数
+LOGIN_JOB_MAX_PENDING = 64   # 排队与执行中的最大任务数，超出时拒绝新的登录请求
+LOGIN_JOB_RESULT_TTL = 300   # 任务结果保留时间（秒）
+LOGIN_JOB_TIMEOUT = 60       # 轮询未知任务时视为仍在执行的最长时间（秒）
+
+# 账号熔断与并发限制配置
+BREAKER_FAILURE_THRESHOLD = 5   # 连续失败多少次后熔断
+BREAKER_RECOVERY_TIMEOUT = 30   # 熔断后多久允许试探请求（秒）
+LIMITER_INITIAL = 4             # 每个账号的初始并发上限
+LIMITER_MAX = 32                # 每个账号的最大并发上限
+LIMITER_LATENCY_TARGET = 3.0    # 目标延迟（秒），超过时降低并发上限
+
+# 访问事件日志配置
+EVENT_BUFFER_SIZE = 10000     # 内存中最多缓冲的事件数，超出时丢弃新事件
+EVENT_FLUSH_INTERVAL = 1.0    # 事件批量写入数据库的间隔（秒）
+ROLLUP_MINUTE_RETENTION = 21600   # 分钟统计桶保留时间（秒），超过后合并为小时桶
+ROLLUP_HOUR_RETENTION = 2592000   # 小时统计桶保留时间（秒），超过后合并为天桶
+ROLLUP_COMPACT_INTERVAL = 300     # 统计桶压缩间隔（秒）
+EVENT_RETENTION = 2592000         # 原始访问事件保留时间（秒），按整天删除，统计桶不受影响；为0时不删除
+
+# 外链归档配置
+ARCHIVE_RETENTION = 604800   # 外链过期或用尽后在主表中保留的时间（秒），之后移入归档表
+ARCHIVE_INTERVAL = 300       # 归档任务执行间隔（秒）
+ARCHIVE_BATCH_SIZE = 200     # 每个写事务最多归档的外链数
+ARCHIVE_MAX_BATCHES = 50     # 每轮最多执行的批次数
+ARCHIVE_BATCH_PAUSE = 0.1    # 批次之间的暂停时间（秒），限制对写入的影响
+
+# 数据导出配置
+EXPORT_CHUNK_SIZE = 1000     # 导出时每次从数据库读取的行数
+EXLINK_BULK_MAX = 100000     # 单次批量创建外链的最大数量
+
+# HTTP缓存与压缩配置
+EXLINK_CACHE_CONTROL = 'private, no-cache'           # 外链页：每次向服务器验证ETag，未变化时返回304
+EXLINK_ERROR_CACHE_CONTROL = 'no-store'             # 外链错误页：不缓存，外链状态变化后立即生效
+ADMIN_CACHE_CONTROL = 'private, no-cache'            # 仪表盘与统计接口
+ADMIN_ETAG_WINDOW = 10       # 仪表盘与统计接口ETag的时间窗口（秒），数据库无提交时结果最多滞后该时长
+COMPRESS_MIN_SIZE = 512      # 小于该大小（字节）的响应不压缩
+COMPRESS_GZIP_LEVEL = 6      # gzip压缩级别
+COMPRESS_BROTLI_QUALITY = 5  # brotli压缩质量（0-11），需安装brotli或brotlicffi
+
+# 外链页扫码配置
+EXLINK_SCAN_FPS = 8          # 每秒最多识别的帧数
+EXLINK_SCAN_ROI = 0.7        # 只识别画面中心的正方形区域，边长占画面短边的比例
+EXLINK_SCAN_SIZE = 400       # 识别前将中心区域缩小到的边长（像素）
+
+# 仪表盘计数推送配置
+DASHBOARD_RESYNC_INTERVAL = 60   # 有仪表盘打开时重新统计计数的间隔（秒），用于纠正过期与其他进程写入造成的偏差
+DASHBOARD_PUBLISH_INTERVAL = 0.5 # 两次推送之间的最小间隔（秒），期间的变化合并为一次推送
+DASHBOARD_HEARTBEAT = 15         # 没有变化时发送心跳的间隔（秒）
+DASHBOARD_STREAM_MAX = 8         # 同时打开的推送连接数上限，超出时返回503，页面改为定时请求
+DASHBOARD_STREAM_MAX_AGE = 300   # 单个推送连接的最长持续时间（秒），到期后断开由浏览器自动重连
+# 每个推送连接在整个连接期间占用一个请求线程：部署时需使用多线程或gevent工作进程（如 gunicorn --threads 或 -k gevent），
+# 且线程数应明显大于 DASHBOARD_STREAM_MAX，否则打开的仪表盘会占满同步工作进程，其他请求无法处理
@@ -1,35 +1,129 @@
 import os
+import time
 import requests
 import sqlite3
 import json
 from flask import g
-from flask import Flask, render_template, request, redirect, url_for, session,make_response,send_from_directory,jsonify
+from flask import Flask, Response, render_template, request, redirect, url_for, session,make_response,send_from_directory,jsonify
 from flask.views import MethodView
 from werkzeug.routing import BaseConverter
-from utils.login import login_quark
-from utils.database import CloudDriveDatabase
-from datetime import datetime, timezone
+from utils.login import configure_sessions, warm_sessions
+from utils.drivers import login_with_drive, configure_templates, template_stats
+from utils.breaker import GuardRejected, get_guard, configure_guards, all_guard_stats
+from utils.balancer import select_drive
+from utils.database import CloudDriveDatabase, get_link_cache, MAX_PAGE_SIZE
+from utils.pool import get_pool
+from utils.writer import get_writer
+from utils.bloom import get_link_filter
+from utils.jobs import JobRunner, job_age
+from utils.events import get_event_log
+from utils.sweeper import get_sweeper
+from utils.export import EXPORT_TABLES, export_columns, iter_rows, ndjson_chunks, csv_chunks, gzip_chunks
+from utils.rollups import GRANULARITIES, configure_rollups
+from utils.expiry import parse_expiry, is_expired, format_expiry
+from utils.linkcode import configure_link_codes, normalize_link_code
+from utils.tokens import LinkSigner, InvalidToken, is_link_token
+from utils.rows import configure_json_memo, json_memo_stats
+from utils.counters import get_dashboard_counters
+from utils.httpcache import get_version_probe, make_etag, choose_encoding, compress_body, COMPRESSIBLE_MIMETYPES
+from utils.logs import setup_logging, logging_stats
+from functools import lru_cache, wraps
 import logging
-from logging.handlers import RotatingFileHandler
 
 
 app = Flask(__name__)
+# 配置需在创建任何组件之前加载，下面的连接池、缓存、日志等都在模块加载时按配置创建
+app.config.from_pyfile("config.py", silent=True)
 app.jinja_env.auto_reload = True
 
 DATABASE = app.config.get('DATABASE') if app.config.get('DATABASE') else 'database.db'
 
-if not os.path.exists('logs'):
-    os.mkdir('logs')
+# 日志先放入内存队列，由后台线程以JSON格式写入文件，请求线程不等待磁盘写入
+setup_logging(
+    app.config.get('LOG_FILE', 'logs/app.log'),
+    level=app.config.get('LOG_LEVEL', 'INFO'),
+    max_bytes=app.config.get('LOG_MAX_SIZE', 10 * 1024 * 1024),
+    backup_count=app.config.get('LOG_BACKUP_COUNT', 5),
+    queue_size=app.config.get('LOG_QUEUE_SIZE', 10000),
+    sampling=app.config.get('LOG_SAMPLING', {"login_job": 0.05, "qrlink": 0.2, "static": 0.01}),
+    console_level=app.config.get('LOG_CONSOLE_LEVEL', 'WARNING'),
+)
+access_logger = logging.getLogger("access")
+app.logger.info('Flask App startup')
 
-file_handler = RotatingFileHandler('logs/app.log', maxBytes=10240, backupCount=10)
-file_handler.setFormatter(logging.Formatter(
-    '%(asctime)s %(levelname)s: %(message)s [in %(pathname)s:%(lineno)d]'
-))
-file_handler.setLevel(logging.INFO)
+# 进程启动时创建连接池并执行数据库迁移，请求中只从池中取用连接
+get_pool(DATABASE, app.config.get('DB_POOL_SIZE', 8))
+# 所有写操作由单一写线程合并提交
+get_writer(DATABASE, app.config.get('DB_WRITE_BATCH_SIZE', 64), app.config.get('DB_WRITE_TIMEOUT', 30))
+# 外链解析结果（外链+网盘配置）的进程内缓存
+get_link_cache(DATABASE, app.config.get('LINK_CACHE_SIZE', 1024), app.config.get('LINK_CACHE_TTL', 30))
+# 全部外链短码的布隆过滤器，随机ID的探测请求无需查询数据库
+get_link_filter(DATABASE, app.config.get('LINK_FILTER_ERROR_RATE', 0.001))
+# 新建外链的标识长度（字节），决定公开短码的长度
+configure_link_codes(app.config.get('LINK_KEY_BYTES', 12))
+configure_json_memo(app.config.get('JSON_MEMO_SIZE', 4096))
+# 编译后的网盘登录请求模板
+configure_templates(app.config.get('LOGIN_TEMPLATE_CACHE_SIZE', 1024), app.config.get('LOGIN_TEMPLATE_CACHE_TTL', 60))
+# 只读JSON接口按数据库的数据版本号生成ETag
+get_version_probe(DATABASE)
+# 仪表盘计数保存在内存中，由写操作更新并通过SSE推送给打开的仪表盘
+get_dashboard_counters(
+    DATABASE,
+    resync_interval=app.config.get('DASHBOARD_RESYNC_INTERVAL', 60),
+    min_publish_interval=app.config.get('DASHBOARD_PUBLISH_INTERVAL', 0.5),
+    heartbeat=app.config.get('DASHBOARD_HEARTBEAT', 15),
+)
+# 上游登录使用复用连接的会话，并预先建立连接
+configure_sessions(
+    app.config.get('UPSTREAM_POOL_SIZE', 16),
+    (app.config.get('UPSTREAM_CONNECT_TIMEOUT', 3.05), app.config.get('UPSTREAM_READ_TIMEOUT', 10)),
+    app.config.get('UPSTREAM_RETRIES', 2),
+)
+warm_sessions()
+# 每个网盘账号独立的熔断器和自适应并发限制
+configure_guards(
+    failure_threshold=app.config.get('BREAKER_FAILURE_THRESHOLD', 5),
+    recovery_timeout=app.config.get('BREAKER_RECOVERY_TIMEOUT', 30),
+    initial_limit=app.config.get('LIMITER_INITIAL', 4),
+    max_limit=app.config.get('LIMITER_MAX', 32),
+    latency_target=app.config.get('LIMITER_LATENCY_TARGET', 3.0),
+)
+# 访问统计的分钟桶和小时桶保留时间，超过后合并为更粗的粒度；原始事件超过保留时间后删除
+configure_rollups(
+    minute_retention=app.config.get('ROLLUP_MINUTE_RETENTION', 6 * 3600),
+    hour_retention=app.config.get('ROLLUP_HOUR_RETENTION', 30 * 86400),
+    compact_interval=app.config.get('ROLLUP_COMPACT_INTERVAL', 300),
+    event_retention=app.config.get('EVENT_RETENTION', 30 * 86400),
+)
+# 外链访问与登录事件先写入内存缓冲区，由后台线程批量落库
+get_event_log(DATABASE, app.config.get('EVENT_BUFFER_SIZE', 10000), app.config.get('EVENT_FLUSH_INTERVAL', 1.0))
+# 过期或用尽的外链在保留期后分批移入归档表
+get_sweeper(
+    DATABASE,
+    retention=app.config.get('ARCHIVE_RETENTION', 7 * 86400),
+    interval=app.config.get('ARCHIVE_INTERVAL', 300),
+    batch_size=app.config.get('ARCHIVE_BATCH_SIZE', 200),
+    max_batches=app.config.get('ARCHIVE_MAX_BATCHES', 50),
+    pause=app.config.get('ARCHIVE_BATCH_PAUSE', 0.1),
+)
+
+
+def save_login_job(job_id, job):
+    # 任务结果写入数据库，轮询请求落到其他工作进程时也能查到
+    db = CloudDriveDatabase(DATABASE)
+    try:
+        db.save_login_job(job_id, job, app.config.get('LOGIN_JOB_RESULT_TTL', 300))
+    finally:
+        db.close()
 
-app.logger.addHandler(file_handler)
-app.logger.setLevel(logging.INFO)
-app.logger.info('Flask App startup')
+
+# 上游登录在有界线程池中执行，请求线程不再等待上游响应
+login_jobs = JobRunner(
+    app.config.get('LOGIN_JOB_WORKERS', 8),
+    app.config.get('LOGIN_JOB_MAX_PENDING', 64),
+    app.config.get('LOGIN_JOB_RESULT_TTL', 300),
+    on_finish=save_login_job,
+)
 
 
 def get_db():
@@ -50,6 +144,195 @@ def inject_db(f):
     return decorated_function
 
 
+@lru_cache(maxsize=32)
+def render_exlink_error(message):
+    # 错误页只与提示信息有关，渲染一次后复用
+    return render_template('exlink_error.html', message=message)
+
+
+def exlink_error_response(message):
+    # 错误页不缓存：外链可能随后被创建、续期或释放配额，共享缓存中的错误页会让有效外链继续显示为无效
+    response = make_response(render_exlink_error(message))
+    response.headers['Cache-Control'] = app.config.get('EXLINK_ERROR_CACHE_CONTROL', 'no-store')
+    return response
+
+
+# 外链页模板的修改时间计入ETag，更新模板后浏览器缓存的页面随之失效
+EXLINK_TEMPLATE_MTIME = os.path.getmtime(os.path.join(app.root_path, app.template_folder, 'exlink_view.html'))
+
+# 外链页扫码使用的jsQR脚本，在解码线程中加载；浏览器支持 BarcodeDetector 时不加载
+JSQR_URL = 'https://cdn.jsdelivr.net/npm/jsqr@1.4.0/dist/jsQR.min.js'
+
+
+def get_scan_options():
+    # 外链页扫码参数：识别帧率、中心识别区域占画面短边的比例、识别前缩小到的边长（像素）
+    return {
+        "fps": app.config.get('EXLINK_SCAN_FPS', 8),
+        "roi": app.config.get('EXLINK_SCAN_ROI', 0.7),
+        "size": app.config.get('EXLINK_SCAN_SIZE', 400),
+    }
+
+
+def with_validators(response, etag, cache_control):
+    """
+    为响应设置ETag和Cache-Control
+    
+    参数:
+        response: 视图返回值
+        etag: 不带引号的ETag值，内容与压缩格式无关，使用弱校验
+        cache_control: Cache-Control策略
+    
+    返回:
+        Response: 响应对象
+    """
+    response = make_response(response)
+    response.set_etag(etag, weak=True)
+    response.headers['Cache-Control'] = cache_control
+    return response
+
+
+def not_modified(etag, cache_control):
+    """
+    客户端缓存的版本仍然有效时返回304响应
+    
+    参数:
+        etag: 当前内容的ETag值
+        cache_control: Cache-Control策略
+    
+    返回:
+        Response: 304响应，客户端缓存已失效时返回None
+    """
+    if request.if_none_match.contains_weak(etag):
+        return with_validators(Response(status=304), etag, cache_control)
+    return None
+
+
+def data_versioned(f):
+    """
+    只读JSON接口的条件请求处理
+    
+    ETag由数据库的数据版本号、请求路径与查询参数以及时间窗口生成：数据库没有新的提交且仍在同一时间窗口内时，
+    直接返回304，不执行查询也不序列化。时间窗口用于覆盖随时间变化的结果（如外链过期、以当前时间为终点的趋势）。
+    数据版本号在执行查询之前读取，查询期间发生的提交只会使下一次请求的ETag变化，不会把新数据标记为旧版本。
+    多进程部署时各进程的数据版本号不同，请求落到其他进程只会重新返回完整响应。
+    """
+    @wraps(f)
+    def decorated_function(*args, **kwargs):
+        cache_control = app.config.get('ADMIN_CACHE_CONTROL', 'private, no-cache')
+        window = app.config.get('ADMIN_ETAG_WINDOW', 10)
+        etag = make_etag(get_version_probe(DATABASE).version(), request.full_path, int(time.time() // window))
+        cached = not_modified(etag, cache_control)
+        if cached is not None:
+            return cached
+        response = make_response(f(*args, **kwargs))
+        # 查询失败的结果不设置ETag，下次请求重新查询
+        payload = response.get_json(silent=True) if response.is_json else None
+        if response.status_code != 200 or not (payload or {}).get("status"):
+            response.headers['Cache-Control'] = 'no-store'
+            return response
+        return with_validators(response, etag, cache_control)
+    return decorated_function
+
+
+@app.before_request
+def start_request_timer():
+    g._request_start = time.perf_counter()
+
+
+@app.after_request
+def log_request(response):
+    """
+    记录访问日志，按endpoint采样（LOG_SAMPLING）
+    
+    记录路由规则而不是实际路径，外链短码和令牌不会出现在访问日志中。
+    """
+    start = g.pop('_request_start', None)
+    access_logger.info("request", extra={
+        "route": request.endpoint,
+        "method": request.method,
+        "path": request.url_rule.rule if request.url_rule else None,
+        "status": response.status_code,
+        "duration_ms": round((time.perf_counter() - start) * 1000, 2) if start is not None else None,
+    })
+    return response
+
+
+@app.after_request
+def compress_response(response):
+    """
+    按客户端的 Accept-Encoding 以brotli或gzip压缩文本类响应
+    
+    流式响应（导出等，可能已经gzip压缩）、静态文件、已压缩或过小的响应保持原样。
+    """
+    if (response.status_code != 200 or response.direct_passthrough or response.is_streamed
+            or 'Content-Encoding' in response.headers or response.mimetype not in COMPRESSIBLE_MIMETYPES):
+        return response
+    response.vary.add('Accept-Encoding')
+    data = response.get_data()
+    if len(data) < app.config.get('COMPRESS_MIN_SIZE', 512):
+        return response
+    encoding = choose_encoding(request.accept_encodings)
+    if encoding is None:
+        return response
+    response.set_data(compress_body(
+        data, encoding,
+        app.config.get('COMPRESS_GZIP_LEVEL', 6), app.config.get('COMPRESS_BROTLI_QUALITY', 5)
+    ))
+    response.headers['Content-Encoding'] = encoding
+    return response
+
+
+@lru_cache(maxsize=1)
+def get_link_signer():
+    """
+    获取外链令牌签发器，首次使用时创建
+    
+    只使用 LINK_TOKEN_KEYS 中的密钥，未配置时不启用令牌；不会退回使用 SECRET_KEY。
+    
+    返回:
+        LinkSigner: 令牌签发器，未启用时返回None
+    
+    异常:
+        ValueError: 密钥为占位值或长度不足
+    """
+    keys = app.config.get('LINK_TOKEN_KEYS')
+    if not keys:
+        return None
+    return LinkSigner(keys, app.config.get('LINK_TOKEN_ACTIVE_KEY'))
+
+
+# 密钥配置有误时拒绝启动，而不是等到首次签发或校验令牌时才报错
+get_link_signer()
+
+
+def parse_link_id(value):
+    """
+    将外链地址中的ID解析为外链短码，不访问数据库
+    
+    令牌在这里完成签名和过期校验；短码和旧版UUID经过布隆过滤器判断。
+    
+    参数:
+        value: 外链短码、旧版UUID或外链令牌
+    
+    返回:
+        tuple: (外链短码, 令牌内容, 错误信息)，令牌内容只在使用令牌访问时返回
+    """
+    if is_link_token(value):
+        signer = get_link_signer()
+        if signer is None:
+            return None, None, "无效的外链ID"
+        try:
+            claims = signer.verify(value)
+        except InvalidToken as e:
+            return None, None, "此外链已过期" if e.reason == "expired" else "无效的外链ID"
+        return claims['link_code'], claims, None
+    # 旧版UUID链接转换为短码后统一处理
+    link_code = normalize_link_code(value)
+    if not link_code or not get_link_filter(DATABASE).might_contain(link_code):
+        return None, None, "无效的外链ID"
+    return link_code, None, None
+
+
 @app.teardown_appcontext
 def close_connection(exception):
     db = getattr(g, '_database', None)
@@ -73,86 +356,172 @@ def profile():
 
 
 
+def run_login_job(link_code, token, claims=None):
+    """
+    在后台线程中执行扫码登录
+    
+    参数:
+        link_code: 外链短码
+        token: 二维码中的登录token
+        claims: 通过外链令牌访问时的令牌内容
+    
+    返回:
+        tuple: (是否登录成功, 提示信息)
+    """
+    db = CloudDriveDatabase(DATABASE)
+    start = time.perf_counter()
+    # 登录事件，上游调用抛出异常时以error结果记录
+    event = {"outcome": "error", "drive_id": None, "provider_name": None}
+    try:
+        # 获取当前外链及关联网盘的登录配置
+        resolved = db.get_resolved_link(link_code)
+        # 与外链页相同：令牌签发后外链改绑了其他网盘时令牌作废
+        if not resolved or (claims and claims['drive_id'] != resolved[0]['drive_id']):
+            event = None
+            return False, "无效的外链ID"
+        
+        link_info, drives = resolved
+        if not drives:
+            event["outcome"] = "no_drive"
+            return False, "找不到关联的网盘信息"
+        
+        if link_info.get('pool_id'):
+            # 绑定账号池的外链按策略选择一个未熔断、并发未满的账号
+            drive_info = select_drive(link_info['pool_id'], drives, link_info.get('pool_strategy'))
+            if not drive_info:
+                event["outcome"] = "rejected"
+                return False, "账号池中的网盘账号暂时都不可用，请稍后重试"
+        else:
+            drive_info = drives[0]
+        event.update(drive_id=drive_info['id'], provider_name=drive_info['provider_name'])
+        
+        # 账号熔断或并发已满时直接失败，不占用配额
+        guard = get_guard(drive_info['id'])
+        reason = guard.reject_reason()
+        if reason:
+            event["outcome"] = "rejected"
+            return False, reason
+        
+        # 先原子地预占一次配额，再请求上游；登录失败或出错时自动归还
+        reservation = db.consume_quota(link_code)
+        if not reservation:
+            event["outcome"] = "exhausted"
+            return False, "此外链已达到使用次数限制"
+        
+        with reservation:
+            # 按网盘类型选择登录驱动，请求模板在首次使用时编译并缓存
+            try:
+                status = guard.call(login_with_drive, drive_info, token)
+            except GuardRejected as e:
+                event["outcome"] = "rejected"
+                return False, e.message
+            if status is None:
+                event["outcome"] = "unsupported"
+                return False, "不支持的网盘类型"
+            if status:
+                reservation.commit()
+                app.logger.info("已扣减外链的一次使用次数", extra={"link_code": link_code})
+        
+        event["outcome"] = "success" if status else "failed"
+        return status, "登录成功" if status else "登录失败"
+    finally:
+        db.close()
+        if event:
+            get_event_log(DATABASE).record("login", link_code, latency_ms=(time.perf_counter() - start) * 1000, **event)
+
+
 @app.route('/login',methods=['POST'])
 def login():
     # 获取POST请求中的JSON数据
     data = request.get_json()
     token = data.get('token')
-    link_uuid = data.get('link_uuid')
+    # 通过令牌打开的页面提交link_token；兼容升级前打开的页面提交的link_uuid参数
+    link_id = data.get('link_token') or data.get('link_code') or data.get('link_uuid')
     
     if not token:
-        print('缺少token参数')
+        app.logger.warning('缺少token参数')
         return jsonify({"status": False, "message": "缺少token参数"})
     
-
+    if not link_id:
+        return jsonify({"status": False, "message": "缺少link_code参数"})
     
+    link_code, claims, error = parse_link_id(link_id)
+    if error:
+        return jsonify({"status": False, "message": error})
     
-    # 如果有外链UUID，则更新其使用次数
-    if link_uuid:
-        db = get_db()
-        # 获取当前外链信息
-        link_info = db.get_external_link_by_uuid(link_uuid)
-        
-        if link_info:
-            # 获取当前已使用次数和总次数
-            used_quota = link_info.get('used_quota', 0)
-            total_quota = link_info.get('total_quota', 0)
-            exdrive_id = link_info.get('drive_id',0)
-            
-            # 确保不超过总次数
-            if used_quota < total_quota:
+    # 登录任务入队后立即返回任务ID，由页面轮询 /login/<job_id> 获取结果
+    job_id = login_jobs.submit(run_login_job, link_code, token, claims)
+    if not job_id:
+        return jsonify({"status": False, "message": "服务繁忙，请稍后重试"})
+    
+    return jsonify({"status": True, "job_id": job_id, "message": "登录任务已提交"})
 
-                # 根据exdrive_id从drive_providers表查询config_vars
-                drive_info = db.get_user_drive(exdrive_id)
-                #print(drive_info)
-                if drive_info:
-                    config_vars = drive_info.get("login_config")
-                    status = login_quark(token,config_vars)
 
-                # 增加使用次数
-                new_used_quota = used_quota + 1
-                update_success = db.update_external_link_quota(link_uuid, new_used_quota)
-                if update_success:
-                    print(f"已更新外链 {link_uuid} 的使用次数: {int(new_used_quota)}/{int(total_quota)}")
+@app.route('/login/<string:job_id>',methods=['GET'])
+def login_job(job_id):
+    data = {"status": False}
+    job = login_jobs.get(job_id)
+    if job is None:
+        db = get_db()
+        job = db.get_login_job(job_id)
+    
+    if job is None:
+        # 任务可能由其他工作进程执行且尚未结束
+        age = job_age(job_id)
+        if age is not None and 0 <= age < app.config.get('LOGIN_JOB_TIMEOUT', 60):
+            job = {"state": "pending", "result": None, "message": None}
     
-    return jsonify({"status": status})
+    if job:
+        data["status"] = True
+        data["data"] = {
+            "state": job["state"],
+            "result": job["result"],
+            "message": job["message"],
+        }
+    else:
+        data["message"] = "登录任务不存在或已过期"
+    return jsonify(data)
 
 @app.route('/exlink/<string:id>')
 def qrlink(id):
+    # 格式无效、过滤器判断一定不存在的ID以及伪造或过期的令牌直接返回缓存的错误页，不占用数据库连接
+    link_code, claims, error = parse_link_id(id)
+    if error:
+        return exlink_error_response(error)
+    
     db = get_db()
     data = {"status": False}
+    start = time.perf_counter()
     
-    # 获取外链信息
-    link_info = db.get_external_link_by_uuid(id)
+    # 获取外链及关联网盘信息
+    resolved = db.get_resolved_link(link_code)
     
-    if link_info:
-        # 检查是否已过期
-        expiry_time = link_info.get('expiry_time')
-        if expiry_time:
-            try:
-                # 解决时区问题
-                # 使用 fromisoformat 解析 ISO 8601 UTC 字符串
-                # Python < 3.11 doesn't handle Z directly, remove it.
-                if expiry_time.endswith('Z'):
-                    expiry_time_str = expiry_time[:-1] + '+00:00'
-                else:
-                    expiry_time_str = expiry_time
-                
-                expiry_datetime = datetime.fromisoformat(expiry_time_str)
-                
-                if expiry_datetime.tzinfo is None:
-                     expiry_datetime = expiry_datetime.replace(tzinfo=timezone.utc)
-                
-                # 获取当前 UTC 时间进行比较
-                if datetime.now(timezone.utc) > expiry_datetime:
-                    data["message"] = "此外链已过期"
-                    return render_template('exlink_error.html', message=data["message"])
-            except (ValueError, TypeError) as e:
-                # 解析失败，记录错误，并可能视为无效链接
-                print(f"Error parsing expiry_time '{expiry_time}': {e}")
-                data["message"] = "外链信息有误（无效的过期时间）"
-                return render_template('exlink_error.html', message=data["message"]) 
-                
+    # 令牌签发后外链改绑了其他网盘时令牌作废
+    if resolved and claims and claims['drive_id'] != resolved[0]['drive_id']:
+        resolved = None
+    
+    if resolved:
+        link_info, drives = resolved
+        # 账号池外链的各账号属于同一服务商，页面展示使用第一个
+        drive_info = drives[0] if drives else None
+        
+        def record_view(outcome):
+            # 只记录真实存在的外链，随机ID的探测请求不写入事件日志
+            get_event_log(DATABASE).record(
+                "view", link_code, outcome, (time.perf_counter() - start) * 1000,
+                drive_info['id'] if drive_info else None, drive_info['provider_name'] if drive_info else None
+            )
+        
+        # 检查是否已过期，expiry_epoch 为UTC时间戳，迁移时无法解析的旧数据记为0
+        expiry_epoch = link_info.get('expiry_epoch')
+        if expiry_epoch == 0:
+            data["message"] = "外链信息有误（无效的过期时间）"
+            record_view("bad_expiry")
+            return exlink_error_response(data["message"])
+        if is_expired(expiry_epoch):
+            data["message"] = "此外链已过期"
+            record_view("expired")
+            return exlink_error_response(data["message"])
         
         # 检查使用次数是否超过限制
         used_quota = link_info.get('used_quota', 0)
@@ -160,10 +529,6 @@ def qrlink(id):
         
         if used_quota < total_quota:
             # 不再自动增加使用次数，而是由扫码登录成功后增加
-            # 获取关联的网盘信息
-            drive_id = link_info.get('drive_id')
-            drive_info = db.get_user_drive(drive_id)
-            
             if drive_info:
                 data["status"] = True
                 data["drive_info"] = {
@@ -174,28 +539,61 @@ def qrlink(id):
                 data["remaining"] = total_quota - used_quota
                 
                 # 返回页面和网盘信息
-                return render_template('exlink_view.html', 
+                record_view("ok")
+                # ETag由页面用到的全部数据生成，剩余次数、过期时间或模板未变化时返回304，不渲染模板
+                cache_control = app.config.get('EXLINK_CACHE_CONTROL', 'private, no-cache')
+                scan_options = get_scan_options()
+                etag = make_etag(id, total_quota - used_quota, expiry_epoch,
+                                 drive_info.get('provider_name'), EXLINK_TEMPLATE_MTIME, scan_options)
+                cached = not_modified(etag, cache_control)
+                if cached is not None:
+                    return cached
+                return with_validators(render_template('exlink_view.html', 
                                       link_info=link_info, 
                                       drive_info=drive_info,
                                       remaining_count=total_quota - used_quota,
-                                      expiry_time=link_info.get('expiry_time'))
+                                      expiry_time=format_expiry(expiry_epoch),
+                                      link_token=id if claims else None,
+                                      scan_options=scan_options,
+                                      jsqr_url=JSQR_URL), etag, cache_control)
             else:
                 data["message"] = "找不到关联的网盘信息"
+                record_view("no_drive")
         else:
             data["message"] = "此外链已达到使用次数限制"
+            record_view("exhausted")
     else:
         data["message"] = "无效的外链ID"
     
     # 如果失败，返回错误页面
-    return render_template('exlink_error.html', message=data["message"])
+    return exlink_error_response(data["message"])
 
 
 @app.route('/admin/')
 def admin():
     db = get_db()
     providers = db.get_all_drive_providers()
-    alluser_drives = db.get_all_user_drives()
-    return render_template('admin.html',providers=providers,alluser_drives=alluser_drives)
+    # 网盘账号和外链列表由页面分页加载，这里只渲染服务商
+    return render_template('admin.html',providers=providers)
+
+
+def get_page_args(body):
+    """
+    从请求参数中解析分页参数
+    
+    参数:
+        body: 请求JSON或查询参数
+    
+    返回:
+        tuple: (游标, 每页条数, 字段列表)，参数无效时抛出ValueError
+    """
+    cursor = body.get('cursor')
+    cursor = int(cursor) if cursor not in (None, '') else None
+    limit = int(body.get('limit') or 50)
+    fields = body.get('fields')
+    if isinstance(fields, str):
+        fields = [field.strip() for field in fields.split(',') if field.strip()]
+    return cursor, limit, fields
 
 
 @app.route('/admin/drive_provider/<metfunc>',methods=['POST'])
@@ -257,29 +655,34 @@ def user_drive(metfunc):
             else:
                 data["status"] = False
                 data["message"] = "未找到指定的网盘账号"
-        # 如果提供了provider_name，则返回该类型的所有账号
-        elif body and 'provider_name' in body:
-            provider_name = body.get('provider_name')
-            provider_drives = db.get_user_drives_by_provider(provider_name)
-            data["status"] = True
-            data["data"] = provider_drives if provider_drives else []
         else:
-            # 否则返回所有驱动的信息
-            alluser_drives = db.get_all_user_drives()
+            # 否则按ID倒序分页返回，可按服务商、备注过滤；登录配置只在fields包含login_config时返回
+            body = body or {}
+            try:
+                cursor, limit, fields = get_page_args(body)
+            except (TypeError, ValueError):
+                data["message"] = "分页参数无效"
+                return data
+            drives, next_cursor = db.list_user_drives(
+                cursor, limit,
+                provider_name=body.get('provider_name'),
+                remarks=body.get('remarks'),
+                fields=fields,
+            )
             # 即使列表为空也返回成功状态和空数组
             data["status"] = True
-            data["data"] = alluser_drives if alluser_drives else []
+            data["data"] = drives
+            data["next_cursor"] = next_cursor
     elif metfunc == "add":
         body = request.get_json()
-        print(body)
+        app.logger.debug("添加网盘账号", extra={"body": body})
         status = db.add_user_drive(body.get("provider_name","测试网盘"),body.get("login_config"),body.get("remarks",""))
         if status:
             data["status"] = True
             data["data"] = body
     elif metfunc == "update":
         body = request.get_json()
-        print(body)
-        print(body.get("id"),body.get("login_config"))
+        app.logger.debug("更新网盘账号", extra={"body": body})
         status = db.update_user_drive(body.get("id"),json.loads(body.get("login_config")),body.get("remarks",""))
         if status:
             data["status"] = True
@@ -288,8 +691,8 @@ def user_drive(metfunc):
         body = request.get_json()
         drive_id = body.get("id")
         if drive_id:
-            # 检查是否有关联的外链，如果有则不允许删除
-            external_links = db.get_external_links_by_drive(drive_id)
+            # 检查是否有关联的外链，如果有则不允许删除；绑定账号池的外链不依赖单个账号
+            external_links = [link for link in db.get_external_links_by_drive(drive_id) if not link.get('pool_id')]
             if external_links and len(external_links) > 0:
                 data["status"] = False
                 data["message"] = "该网盘账号有关联的外链，请先删除外链后再删除账号"
@@ -305,6 +708,62 @@ def user_drive(metfunc):
             data["message"] = "缺少必要的ID参数"
     return data
 
+@app.route('/admin/drive_pool/<metfunc>',methods=['POST'])
+def drive_pool(metfunc):
+    db = get_db()
+    data = {"status":False}
+    body = request.get_json(silent=True) or {}
+    if metfunc == "get":
+        if 'id' in body:
+            pool = db.get_drive_pool(body.get('id'))
+            if pool:
+                data["status"] = True
+                data["data"] = pool
+            else:
+                data["message"] = "未找到指定的账号池"
+        else:
+            data["status"] = True
+            data["data"] = db.get_all_drive_pools()
+    elif metfunc == "add":
+        """
+        json样板
+        body -- {
+            "pool_name": "夸克账号池",
+            "provider_name": "夸克网盘",
+            "drive_ids": [1, 2, 3],
+            "strategy": "round_robin",  // round_robin / least_in_flight / latency_weighted
+            "remarks": ""
+        }
+        """
+        pool_id = db.add_drive_pool(body.get("pool_name"), body.get("provider_name"), body.get("drive_ids") or [],
+                                    body.get("strategy", "round_robin"), body.get("remarks", ""))
+        if pool_id:
+            data["status"] = True
+            data["data"] = db.get_drive_pool(pool_id)
+        else:
+            data["message"] = "账号池创建失败，请检查名称、策略以及账号是否属于同一服务商"
+    elif metfunc == "update":
+        status = db.update_drive_pool(body.get("id"), body.get("drive_ids"), body.get("strategy"), body.get("remarks"))
+        if status:
+            data["status"] = True
+            data["data"] = db.get_drive_pool(body.get("id"))
+        else:
+            data["message"] = "账号池更新失败"
+    elif metfunc == "delete":
+        pool_id = body.get("id")
+        if pool_id:
+            if db.get_external_links_by_pool(pool_id):
+                data["message"] = "该账号池有关联的外链，请先删除外链后再删除账号池"
+                return data
+            if db.delete_drive_pool(pool_id):
+                data["status"] = True
+                data["message"] = "账号池删除成功"
+            else:
+                data["message"] = "账号池删除失败，可能不存在"
+        else:
+            data["message"] = "缺少必要的ID参数"
+    return data
+
 
 class Exlink(MethodView):
     def demo(self):
@@ -333,14 +792,26 @@ class Exlink(MethodView):
         db = get_db()
         data = {"status": False}
         try:
-            # 获取所有外链
-            external_links = []
-            results = db.cursor.execute("SELECT * FROM external_links").fetchall()
-            for row in results:
-                external_links.append(dict(row))
+            # 按ID倒序分页获取外链，POST时参数在JSON中，GET时在查询参数中
+            body = request.get_json(silent=True) or request.args.to_dict()
+            try:
+                cursor, limit, fields = get_page_args(body)
+                drive_id = int(body['drive_id']) if body.get('drive_id') not in (None, '') else None
+            except (TypeError, ValueError):
+                data["message"] = "分页参数无效"
+                return jsonify(data)
+            external_links, next_cursor = db.list_external_links(
+                cursor, limit,
+                drive_id=drive_id,
+                provider_name=body.get('provider_name'),
+                status=body.get('status'),
+                remarks=body.get('remarks'),
+                fields=fields,
+            )
             
             data["status"] = True
             data["data"] = external_links
+            data["next_cursor"] = next_cursor
         except Exception as e:
             data["message"] = f"获取外链列表失败: {str(e)}"
         
@@ -361,39 +832,52 @@ class Exlink(MethodView):
                 # 如果参数被封装在data字段中，提取出来
                 body_data = body.get('data')
                 drive_id = body_data.get('account_id')  # 前端传的是account_id
-                total_quota = float(body_data.get('total_quota', 1))
+                total_quota = int(body_data.get('total_quota', 1))
                 remarks = body_data.get('remarks', '')
                 expiry_time = body_data.get('expiry_time')
+                pool_id = body_data.get('pool_id')
             else:
                 # 直接从body中获取
                 drive_id = body.get('drive_id')
-                total_quota = float(body.get('total_quota', 1))
+                total_quota = int(body.get('total_quota', 1))
                 remarks = body.get('remarks', '')
                 expiry_time = body.get('expiry_time')
+                pool_id = body.get('pool_id')
             
-            if not drive_id:
-                data["message"] = "缺少必要的drive_id参数"
+            if expiry_time and not parse_expiry(expiry_time):
+                data["message"] = "过期时间格式无效"
                 return jsonify(data)
-                
-            # 检查网盘是否存在
-            user_drive = db.get_user_drive(drive_id)
-            if not user_drive:
-                data["message"] = "指定的网盘账号不存在"
+            
+            if pool_id:
+                # 绑定账号池时不需要指定单个网盘
+                pool = db.get_drive_pool(pool_id)
+                if not pool or not pool['drive_ids']:
+                    data["message"] = "指定的账号池不存在或没有账号"
+                    return jsonify(data)
+            elif not drive_id:
+                data["message"] = "缺少必要的drive_id参数"
                 return jsonify(data)
+            else:
+                # 检查网盘是否存在
+                user_drive = db.get_user_drive(drive_id)
+                if not user_drive:
+                    data["message"] = "指定的网盘账号不存在"
+                    return jsonify(data)
                 
             # 创建外链
-            link_uuid = db.create_external_link(
+            link_code = db.create_external_link(
                 drive_id=drive_id,
                 total_quota=total_quota,
                 remarks=remarks,
-                expiry_time=expiry_time
+                expiry_time=expiry_time,
+                pool_id=pool_id or None
             )
             
-            if link_uuid:
+            if link_code:
                 data["status"] = True
                 data["data"] = {
-                    "link_uuid": link_uuid,
-                    "url": f"/exlink/{link_uuid}"
+                    "link_code": link_code,
+                    "url": f"/exlink/{link_code}"
                 }
                 data["message"] = "外链创建成功"
             else:
@@ -410,14 +894,14 @@ class Exlink(MethodView):
         
         try:
             body = request.get_json()
-            link_uuid = body.get('link_uuid')
+            link_code = body.get('link_code') or body.get('link_uuid')
             
-            if not link_uuid:
-                data["message"] = "缺少必要的link_uuid参数"
+            if not link_code:
+                data["message"] = "缺少必要的link_code参数"
                 return jsonify(data)
                 
-            # 删除外链
-            status = db.delete_external_link(link_uuid)
+            # 删除外链，缓存和过滤器以短码为键，旧版UUID先转换
+            status = db.delete_external_link(normalize_link_code(link_code) or link_code)
             
             if status:
                 data["status"] = True
@@ -444,6 +928,163 @@ def create_external_link():
     return Exlink().post()
 
 
+@app.route('/admin/exlink/archive', methods=['POST'])
+def get_archived_links():
+    # 查询已归档的外链，可按link_code查询单条
+    db = get_db()
+    body = request.get_json(silent=True) or {}
+    try:
+        limit = min(int(body.get('limit', 100)), 1000)
+    except (TypeError, ValueError):
+        limit = 100
+    return jsonify({"status": True, "data": db.get_archived_links(body.get('link_code'), limit)})
+
+
+@app.route('/admin/exlink/token', methods=['POST'])
+def issue_link_tokens():
+    """
+    为外链签发令牌，使用令牌访问时伪造和过期的请求不查询数据库
+    
+    json样板
+    body -- {
+        "link_codes": ["0Op4cfL3jMpHee77d"]    // 或 "link_code": "0Op4cfL3jMpHee77d"
+    }
+    Return: [{"link_code", "token", "url"}]，不存在的外链跳过
+    """
+    signer = get_link_signer()
+    if signer is None:
+        return jsonify({"status": False, "message": "未配置外链令牌密钥"})
+    db = get_db()
+    body = request.get_json(silent=True) or {}
+    link_codes = body.get('link_codes') or ([body['link_code']] if body.get('link_code') else [])
+    if not link_codes or len(link_codes) > MAX_PAGE_SIZE:
+        return jsonify({"status": False, "message": f"link_codes需包含1到{MAX_PAGE_SIZE}个外链"})
+    
+    tokens = []
+    for link_code in link_codes:
+        link_info = db.get_external_link_by_code(str(link_code))
+        if not link_info:
+            continue
+        token = signer.sign(link_info['link_code'], link_info['drive_id'], link_info['expiry_epoch'])
+        tokens.append({"link_code": link_info['link_code'], "token": token, "url": f"/exlink/{token}"})
+    return jsonify({"status": True, "data": tokens})
+
+
+@app.route('/admin/exlink/bulk_create', methods=['POST'])
+def bulk_create_external_links():
+    """
+    批量创建外链，所有外链在一个事务中插入
+    
+    json样板
+    body -- {
+        "drive_id": 1,            // 或 "pool_id": 1
+        "count": 1000,
+        "total_quota": 1,
+        "remarks": "活动外链",
+        "expiry_time": "2025-05-01T00:00:00Z",
+        "format": "ndjson"        // 或 csv
+    }
+    Return: 逐行返回 {"id", "link_code", "url"}
+    """
+    db = get_db()
+    body = request.get_json(silent=True) or {}
+    try:
+        count = int(body.get('count', 0))
+        total_quota = int(body.get('total_quota', 1))
+    except (TypeError, ValueError):
+        return jsonify({"status": False, "message": "count或total_quota参数无效"})
+    max_count = app.config.get('EXLINK_BULK_MAX', 100000)
+    if not 0 < count <= max_count:
+        return jsonify({"status": False, "message": f"count需在1到{max_count}之间"})
+    
+    drive_id, pool_id = body.get('drive_id'), body.get('pool_id')
+    if not drive_id and not pool_id:
+        return jsonify({"status": False, "message": "缺少必要的drive_id或pool_id参数"})
+    expiry_time = body.get('expiry_time')
+    if expiry_time and not parse_expiry(expiry_time):
+        return jsonify({"status": False, "message": "过期时间格式无效"})
+    
+    created = db.create_external_links_bulk(count, drive_id, total_quota, body.get('remarks', ''), expiry_time, pool_id or None)
+    if not created:
+        return jsonify({"status": False, "message": "批量创建外链失败，请检查网盘账号或账号池是否存在"})
+    
+    fmt = body.get('format', 'ndjson')
+    chunk_size = app.config.get('EXPORT_CHUNK_SIZE', 1000)
+    chunks = (
+        [(link_id, link_code, f"/exlink/{link_code}") for link_id, link_code in created[i:i + chunk_size]]
+        for i in range(0, len(created), chunk_size)
+    )
+    columns = ["id", "link_code", "url"]
+    if fmt == 'csv':
+        return Response(csv_chunks(chunks, columns), mimetype='text/csv')
+    return Response(ndjson_chunks(chunks, columns), mimetype='application/x-ndjson')
+
+
+@app.route('/admin/exlink/bulk/<action>', methods=['POST'])
+def bulk_update_external_links(action):
+    """
+    按ID列表或筛选条件批量修改外链
+    
+    action: extend_expiry、set_quota 或 delete
+    json样板
+    body -- {
+        "selection": {"drive_id": 1, "status": "active"},   // 或 {"ids": [1, 2, 3]}
+        "values": {"extend_seconds": 86400},               // set_quota 时为 {"total_quota": 5}
+        "dry_run": true                                    // 只返回匹配数量
+    }
+    Return: {"matched": 匹配数, "affected": 修改数}
+    """
+    db = get_db()
+    body = request.get_json(silent=True) or {}
+    try:
+        result = db.bulk_update_links(
+            action,
+            body.get('selection') or {},
+            body.get('values') or {},
+            dry_run=bool(body.get('dry_run')),
+        )
+    except (KeyError, TypeError, ValueError) as e:
+        return jsonify({"status": False, "message": f"批量操作参数无效: {e}"})
+    except Exception as e:
+        app.logger.error("批量修改外链错误: %s", e)
+        return jsonify({"status": False, "message": "批量修改外链失败"})
+    return jsonify({"status": True, "data": result, "dry_run": bool(body.get('dry_run'))})
+
+
+@app.route('/admin/export/<name>', methods=['GET'])
+def export_data(name):
+    """
+    流式导出外链、网盘账号或归档外链
+    
+    查询参数:
+        format: ndjson（默认）或 csv
+        gzip: 为1时以.gz文件导出
+        fields: 逗号分隔的导出字段，默认为全部字段
+    """
+    if name not in EXPORT_TABLES:
+        return jsonify({"status": False, "message": "不支持导出该数据"}), 404
+    
+    fmt = request.args.get('format', 'ndjson')
+    if fmt not in ('ndjson', 'csv'):
+        return jsonify({"status": False, "message": "导出格式只支持ndjson或csv"}), 400
+    fields = [field.strip() for field in request.args.get('fields', '').split(',') if field.strip()]
+    columns = export_columns(name, fields)
+    
+    # 响应体由生成器逐块产出，内存占用与表大小无关
+    chunks = iter_rows(DATABASE, name, columns, app.config.get('EXPORT_CHUNK_SIZE', 1000))
+    if fmt == 'csv':
+        body, mimetype = csv_chunks(chunks, columns), 'text/csv'
+    else:
+        body, mimetype = ndjson_chunks(chunks, columns), 'application/x-ndjson'
+    filename = f"{name}.{fmt}"
+    if request.args.get('gzip') in ('1', 'true'):
+        body, mimetype, filename = gzip_chunks(body), 'application/gzip', filename + '.gz'
+    
+    response = Response(body, mimetype=mimetype)
+    response.headers['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return response
+
+
 @app.route('/admin/exlink/delete', methods=['POST'])
 def delete_external_link():
     return Exlink().delete()
@@ -451,6 +1092,7 @@ def delete_external_link():
 
 # 新增：仪表盘数据 API
 @app.route('/admin/dashboard_data', methods=['GET'])
+@data_versioned
 def get_dashboard_data():
     db = get_db()
     try:
@@ -468,38 +1110,165 @@ def get_dashboard_data():
             }
         }
     except Exception as e:
-        print(f"获取仪表盘数据错误: {e}")
+        app.logger.error("获取仪表盘数据错误: %s", e)
         data = {"status": False, "message": "获取仪表盘数据失败"}
     return jsonify(data)
 
 
+# 仪表盘计数推送：连接后先收到全部计数的快照，之后只在计数变化时收到增量
+@app.route('/admin/dashboard_stream', methods=['GET'])
+def dashboard_stream():
+    # 每个连接占用一个请求线程：限制同时打开的连接数，并在连接打开一段时间后结束，由浏览器重新连接
+    subscription = get_dashboard_counters(DATABASE).subscribe(
+        max_subscribers=app.config.get('DASHBOARD_STREAM_MAX', 8),
+        max_age=app.config.get('DASHBOARD_STREAM_MAX_AGE', 300),
+    )
+    if subscription is None:
+        return jsonify({"status": False, "message": "仪表盘连接数过多，请稍后重试"}), 503
+    
+    def stream():
+        try:
+            # 断开或到期后浏览器3秒后自动重连
+            yield "retry: 3000\n\n"
+            yield from subscription
+        finally:
+            subscription.close()
+    
+    response = Response(stream(), mimetype='text/event-stream')
+    response.headers['Cache-Control'] = 'no-store'
+    # 关闭反向代理的缓冲，事件立即送达
+    response.headers['X-Accel-Buffering'] = 'no'
+    return response
+
+
+# 访问趋势单次返回的最大数据点数，超出时自动使用更粗的粒度，仍超出时截短开始时间
+MAX_TREND_POINTS = 1440
+# 访问趋势可查询的最长时间范围（秒）
+MAX_TREND_SPAN = 366 * 86400
+_RANGE_UNITS = {"m": 60, "h": 3600, "d": 86400}
+
+
+def parse_trend_range(value):
+    """
+    解析访问趋势的时间范围参数
+    
+    参数:
+        value: 形如 60m、24h、7d 的字符串
+    
+    返回:
+        int: 时间范围（秒），格式无效时返回None
+    """
+    value = (value or "").strip().lower()
+    if len(value) < 2 or value[-1] not in _RANGE_UNITS or not value[:-1].isdigit():
+        return None
+    return int(value[:-1]) * _RANGE_UNITS[value[-1]] or None
+
+
+def get_access_trend_args():
+    """
+    从查询参数解析访问趋势的时间范围与粒度
+    
+    支持 range=24h 或 start/end 时间戳两种方式，granularity 为 minute、hour、day 或 auto。
+    
+    返回:
+        tuple: (开始时间戳, 结束时间戳, 粒度名称)
+    
+    异常:
+        ValueError: 时间戳为负数，或时间范围超过 MAX_TREND_SPAN
+    """
+    now = int(time.time())
+    end = request.args.get('end', type=int) or now
+    start = request.args.get('start', type=int)
+    if start is None or start >= end:
+        start = end - (parse_trend_range(request.args.get('range')) or 86400)
+    if start < 0 or end < 0:
+        raise ValueError("时间戳不能为负数")
+    span = end - start
+    if span > MAX_TREND_SPAN:
+        raise ValueError(f"时间范围不能超过{MAX_TREND_SPAN // 86400}天")
+    
+    granularity = request.args.get('granularity', 'auto')
+    if granularity not in GRANULARITIES:
+        granularity = "minute" if span <= 6 * 3600 else "hour" if span <= 7 * 86400 else "day"
+    # 数据点过多时改用更粗的粒度
+    for name in ("hour", "day"):
+        if span / GRANULARITIES[granularity] > MAX_TREND_POINTS and GRANULARITIES[name] > GRANULARITIES[granularity]:
+            granularity = name
+    # 指定了较细的粒度时，只返回最近的 MAX_TREND_POINTS 个数据点
+    start = max(start, end - MAX_TREND_POINTS * GRANULARITIES[granularity])
+    return start, end, granularity
+
+
 # 新增：统计分析数据 API
 @app.route('/admin/statistics_data', methods=['GET'])
+@data_versioned
 def get_statistics_data():
+    try:
+        start, end, granularity = get_access_trend_args()
+    except ValueError as e:
+        return jsonify({"status": False, "message": str(e)}), 400
     db = get_db()
     try:
         drives_by_provider = db.get_user_drives_count_by_provider()
-        # 这里可以添加更多统计数据，例如外链访问趋势 (需要记录访问日志)
-        # 暂时只返回网盘分布数据
+        # 访问趋势只读取预聚合的统计桶，不扫描原始事件
+        step = GRANULARITIES[granularity]
+        points = db.get_access_trend(
+            start, end, step,
+            link_code=normalize_link_code(request.args['link_code']) if request.args.get('link_code') else None,
+            drive_id=request.args.get('drive_id', type=int),
+            provider_name=request.args.get('provider_name'),
+        )
         
         data = {
             "status": True,
             "data": {
                 "drives_by_provider": drives_by_provider,
-                # "access_trend": [] # 示例：将来可以添加访问趋势数据
+                "access_trend": {
+                    "start": start,
+                    "end": end,
+                    "granularity": granularity,
+                    "step": step,
+                    "points": points,
+                },
             }
         }
     except Exception as e:
-        print(f"获取统计数据错误: {e}")
+        app.logger.error("获取统计数据错误: %s", e)
         data = {"status": False, "message": "获取统计数据失败"}
     return jsonify(data)
 
 
+# 运行时状态 API：缓存命中率、连接池和写队列
+@app.route('/admin/runtime_data', methods=['GET'])
+def get_runtime_data():
+    data = {
+        "status": True,
+        "data": {
+            "link_cache": get_link_cache(DATABASE).stats(),
+            "link_filter": get_link_filter(DATABASE).stats(),
+            "db_pool": get_pool(DATABASE).stats(),
+            "db_writer": get_writer(DATABASE).stats(),
+            "login_jobs": login_jobs.stats(),
+            "drive_guards": all_guard_stats(),
+            "link_events": get_event_log(DATABASE).stats(),
+            "link_sweeper": get_sweeper(DATABASE).stats(),
+            "json_memo": json_memo_stats(),
+            "login_templates": template_stats(),
+            "dashboard_counters": get_dashboard_counters(DATABASE).stats(),
+            "logging": logging_stats(),
+            "data_version_probes": get_version_probe(DATABASE).probes,
+        }
+    }
+    response = jsonify(data)
+    # 运行时状态每次请求都不同，不缓存
+    response.headers['Cache-Control'] = 'no-store'
+    return response
+
+
 # -----------------------------
 #      应用程序运行入口
 # -----------------------------
 if __name__ == '__main__':
-    app.config.from_pyfile("config.py")
     app.run(host="0.0.0.0")
     
 
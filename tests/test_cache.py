@@ -0,0 +1,42 @@
+from utils.cache import TTLCache
+
+
+def test_set_skipped_after_invalidate():
+    cache = TTLCache(maxsize=8, ttl=60)
+    generation = cache.generation("a")
+    # 读取数据库期间该键被修改并失效，条目当时并不在缓存中
+    assert not cache.invalidate("a")
+    assert not cache.set("a", "stale", generation)
+    assert cache.get("a") is None
+    assert cache.stats()["stale_sets"] == 1
+
+    assert cache.set("a", "fresh", cache.generation("a"))
+    assert cache.get("a") == "fresh"
+
+
+def test_other_keys_unaffected():
+    cache = TTLCache(maxsize=8, ttl=60)
+    generation = cache.generation("a")
+    cache.invalidate("b")
+    assert cache.set("a", 1, generation)
+
+
+def test_invalidate_where_and_clear_skip_pending_sets():
+    cache = TTLCache(maxsize=8, ttl=60)
+    generation = cache.generation("a")
+    cache.invalidate_where(lambda key, value: False)
+    assert not cache.set("a", 1, generation)
+
+    generation = cache.generation("a")
+    cache.clear()
+    assert not cache.set("a", 1, generation)
+
+
+def test_generation_tracking_is_bounded():
+    cache = TTLCache(maxsize=4, ttl=60)
+    generation = cache.generation("a")
+    for key in range(10):
+        cache.invalidate(key)
+    assert len(cache._generations) <= 4
+    assert not cache.set("a", 1, generation)
+    assert cache.set("a", 1)
@@ -0,0 +1,31 @@
+from utils import drivers
+
+
+def drive(version, client_id="532"):
+    return {
+        "id": 7, "provider_name": "夸克网盘", "version": version,
+        "login_config": {"queryParams": "a=1&t=", "data": {"client_id": client_id}},
+    }
+
+
+def test_template_recompiled_when_version_changes():
+    drivers.configure_templates()
+    template = drivers.get_template(drive(1))
+    assert drivers.get_template(drive(1)) is template
+    # 其他进程更新了登录配置，本进程没有收到失效通知，只读到了新版本的网盘行
+    updated = drivers.get_template(drive(2, client_id="999"))
+    assert updated is not template
+    assert updated.form != template.form
+    assert drivers.get_template(drive(2, client_id="999")) is updated
+
+
+def test_invalidate_accepts_string_id():
+    drivers.configure_templates()
+    template = drivers.get_template(drive(1))
+    drivers.invalidate_templates(drive_id="7")
+    assert drivers.get_template(drive(1)) is not template
+
+
+def test_unknown_provider_has_no_driver():
+    drivers.configure_templates()
+    assert drivers.get_template({**drive(1), "provider_name": "未知网盘"}) is None
@@ -0,0 +1,50 @@
+import sqlite3
+
+import pytest
+
+from utils import rollups
+
+
+DAY = 86400
+NOW = 100 * DAY + 3600
+
+
+@pytest.fixture
+def conn():
+    conn = sqlite3.connect(":memory:")
+    conn.execute("CREATE TABLE link_events (id INTEGER PRIMARY KEY AUTOINCREMENT, ts REAL NOT NULL, event TEXT NOT NULL)")
+    yield conn
+    conn.close()
+
+
+@pytest.fixture
+def retention():
+    original = rollups.get_rollup_option("event_retention")
+    yield lambda seconds: rollups.configure_rollups(event_retention=seconds)
+    rollups.configure_rollups(event_retention=original)
+
+
+def insert(conn, *timestamps):
+    conn.executemany("INSERT INTO link_events (ts, event) VALUES (?, 'view')", [(ts,) for ts in timestamps])
+
+
+def test_prune_deletes_whole_days_past_retention(conn, retention):
+    retention(30 * DAY)
+    # 保留期截止于第70天开始时，第70天内的事件保留
+    insert(conn, 60 * DAY, 69 * DAY + DAY - 1, 70 * DAY, 99 * DAY)
+    assert rollups.prune_events(conn, now=NOW) == 2
+    assert [row[0] for row in conn.execute("SELECT ts FROM link_events ORDER BY ts")] == [70 * DAY, 99 * DAY]
+
+
+def test_prune_in_batches(conn, retention):
+    retention(30 * DAY)
+    insert(conn, *[DAY] * 5)
+    assert rollups.prune_events(conn, now=NOW, limit=2) == 2
+    assert rollups.prune_events(conn, now=NOW, limit=2) == 2
+    assert rollups.prune_events(conn, now=NOW, limit=2) == 1
+
+
+def test_prune_disabled(conn, retention):
+    retention(0)
+    insert(conn, DAY)
+    assert rollups.prune_events(conn, now=NOW) == 0
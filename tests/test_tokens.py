@@ -0,0 +1,155 @@
+import importlib
+import os
+import shutil
+import time
+
+import pytest
+
+from utils.linkcode import encode_link_key, new_link_key
+from utils.tokens import InvalidToken, LinkSigner
+
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SECRET = "0123456789abcdef0123456789abcdef"
+
+
+@pytest.fixture
+def link_code():
+    return encode_link_key(new_link_key())
+
+
+def test_sign_and_verify(link_code):
+    signer = LinkSigner({"k1": SECRET})
+    claims = signer.verify(signer.sign(link_code, 7, None))
+    assert claims == {"link_code": link_code, "drive_id": 7, "expiry_epoch": None, "key_id": "k1"}
+
+
+@pytest.mark.parametrize("tamper", [
+    lambda token: token[:-2] + ("AA" if not token.endswith("AA") else "BB"),
+    lambda token: token.replace(".", ".A", 1),
+    lambda token: "k1." + token.split(".", 2)[1],
+])
+def test_tampered_token_rejected(link_code, tamper):
+    signer = LinkSigner({"k1": SECRET})
+    with pytest.raises(InvalidToken) as excinfo:
+        signer.verify(tamper(signer.sign(link_code, 7, None)))
+    assert excinfo.value.reason in ("bad_signature", "malformed")
+
+
+def test_other_key_rejected(link_code):
+    token = LinkSigner({"k1": SECRET}).sign(link_code, 7, None)
+    with pytest.raises(InvalidToken) as excinfo:
+        LinkSigner({"k1": SECRET[::-1]}).verify(token)
+    assert excinfo.value.reason == "bad_signature"
+
+
+def test_expiry(link_code):
+    signer = LinkSigner({"k1": SECRET})
+    expiry = int(time.time()) + 60
+    token = signer.sign(link_code, 7, expiry)
+    assert signer.verify(token)["expiry_epoch"] == expiry
+    with pytest.raises(InvalidToken) as excinfo:
+        signer.verify(token, now=expiry)
+    assert excinfo.value.reason == "expired"
+
+
+def test_key_rotation(link_code):
+    old = LinkSigner({"k1": SECRET})
+    old_token = old.sign(link_code, 7, None)
+
+    rotated = LinkSigner({"k1": SECRET, "k2": SECRET[::-1]}, active_key="k2")
+    new_token = rotated.sign(link_code, 7, None)
+    assert new_token.startswith("k2.")
+    # 轮换期间旧密钥签发的令牌仍然有效
+    assert rotated.verify(old_token)["key_id"] == "k1"
+
+    retired = LinkSigner({"k2": SECRET[::-1]})
+    assert retired.verify(new_token)["key_id"] == "k2"
+    with pytest.raises(InvalidToken) as excinfo:
+        retired.verify(old_token)
+    assert excinfo.value.reason == "unknown_key"
+
+
+@pytest.mark.parametrize("secret", ["", "short", "replace-with-your-secure-key", "replace-with-random-secret"])
+def test_weak_or_placeholder_key_refused(secret):
+    with pytest.raises(ValueError):
+        LinkSigner({"k1": secret})
+
+
+@pytest.fixture(scope="module")
+def main(tmp_path_factory):
+    """在临时目录中的数据库副本上加载应用"""
+    workdir = tmp_path_factory.mktemp("app")
+    shutil.copy(os.path.join(REPO_DIR, "database.db"), workdir / "database.db")
+    cwd = os.getcwd()
+    os.chdir(workdir)
+    try:
+        main = importlib.import_module("main")
+        main.app.config["LINK_TOKEN_KEYS"] = {"k1": SECRET}
+        main.get_link_signer.cache_clear()
+        yield main
+    finally:
+        main.get_link_signer.cache_clear()
+        os.chdir(cwd)
+
+
+@pytest.fixture(scope="module")
+def link(main):
+    client = main.app.test_client()
+    client.post("/admin/drive_provider/add", json={"provider_name": "token-test", "config_vars": {"data": {}}})
+    client.post("/admin/user_drive/add", json={
+        "provider_name": "token-test", "login_config": {"data": {}}, "remarks": "token-test",
+    })
+    drives = client.post("/admin/user_drive/get", json={}).get_json()["data"]
+    drive_id = [drive for drive in drives if drive["remarks"] == "token-test"][-1]["id"]
+    created = client.post("/admin/exlink/create", json={"drive_id": drive_id, "total_quota": 3}).get_json()
+    return created["data"]["link_code"], drive_id
+
+
+def test_signer_requires_explicit_keys(main):
+    main.app.config.pop("LINK_TOKEN_KEYS")
+    main.get_link_signer.cache_clear()
+    try:
+        # SECRET_KEY 不再作为令牌密钥
+        assert main.app.secret_key
+        assert main.get_link_signer() is None
+    finally:
+        main.app.config["LINK_TOKEN_KEYS"] = {"k1": SECRET}
+        main.get_link_signer.cache_clear()
+
+
+def test_exlink_token_claims(main, link):
+    link_code, drive_id = link
+    client = main.app.test_client()
+    signer = main.get_link_signer()
+
+    response = client.get(f"/exlink/{signer.sign(link_code, drive_id, None)}")
+    assert "无效的外链ID" not in response.get_data(as_text=True)
+
+    response = client.get(f"/exlink/{signer.sign(link_code, drive_id + 1000, None)}")
+    assert "无效的外链ID" in response.get_data(as_text=True)
+
+
+def test_login_rejects_claim_mismatch(main, link):
+    link_code, drive_id = link
+    client = main.app.test_client()
+    token = main.get_link_signer().sign(link_code, drive_id + 1000, None)
+
+    submitted = client.post("/login", json={"token": "qr-token", "link_token": token}).get_json()
+    assert submitted["status"]
+    for _ in range(100):
+        job = client.get(f"/login/{submitted['job_id']}").get_json()["data"]
+        if job["state"] != "pending" and job["state"] != "running":
+            break
+        time.sleep(0.05)
+    assert job["result"] is False
+    assert job["message"] == "无效的外链ID"
+
+
+def test_login_rejects_forged_token(main, link):
+    link_code, drive_id = link
+    client = main.app.test_client()
+    forged = LinkSigner({"k1": SECRET[::-1]}).sign(link_code, drive_id, None)
+
+    response = client.post("/login", json={"token": "qr-token", "link_token": forged}).get_json()
+    assert response == {"status": False, "message": "无效的外链ID"}
@@ -0,0 +1,145 @@
+import sqlite3
+import threading
+from concurrent.futures import TimeoutError
+
+import pytest
+
+from utils.writer import WriteQueue
+
+
+@pytest.fixture
+def writer(tmp_path):
+    db_path = str(tmp_path / "writer.db")
+    conn = sqlite3.connect(db_path)
+    conn.execute("PRAGMA journal_mode = WAL")
+    conn.execute("CREATE TABLE items (id INTEGER PRIMARY KEY, name TEXT UNIQUE)")
+    conn.close()
+    writer = WriteQueue(db_path, max_batch=16, timeout=5)
+    yield writer
+    writer.close()
+
+
+def insert(name):
+    def operation(conn):
+        return conn.execute("INSERT INTO items (name) VALUES (?)", (name,)).lastrowid
+    return operation
+
+
+def names(writer):
+    conn = sqlite3.connect(writer.db_path)
+    try:
+        return sorted(row[0] for row in conn.execute("SELECT name FROM items"))
+    finally:
+        conn.close()
+
+
+def hold_writer(writer):
+    """阻塞写线程，使后续提交的操作进入同一批次"""
+    started, release = threading.Event(), threading.Event()
+
+    def operation(conn):
+        started.set()
+        release.wait(5)
+
+    future = writer.submit(operation)
+    assert started.wait(5)
+    return future, release
+
+
+def test_group_commit_isolates_failed_operation(writer):
+    blocker, release = hold_writer(writer)
+    futures = [writer.submit(insert("a")), writer.submit(insert("a")), writer.submit(insert("b"))]
+    release.set()
+    blocker.result(5)
+
+    assert futures[0].result(5)
+    with pytest.raises(sqlite3.IntegrityError):
+        futures[1].result(5)
+    assert futures[2].result(5)
+    assert names(writer) == ["a", "b"]
+    assert writer.stats()["failed_batches"] == 0
+
+
+def test_savepoint_failure_fails_whole_batch(writer):
+    def broken(conn):
+        # 释放了SAVEPOINT之后再抛异常，ROLLBACK TO 会失败
+        conn.execute("RELEASE write_op")
+        raise ValueError("boom")
+
+    blocker, release = hold_writer(writer)
+    futures = [writer.submit(insert("a")), writer.submit(broken), writer.submit(insert("b"))]
+    release.set()
+
+    for future in futures:
+        with pytest.raises(sqlite3.OperationalError):
+            future.result(5)
+    assert names(writer) == []
+    assert writer.stats()["failed_batches"] == 1
+
+    # 写线程仍在运行，后续写操作正常提交
+    assert writer.execute(insert("c"))
+    assert names(writer) == ["c"]
+
+
+def test_transaction_already_rolled_back(writer):
+    def rollback(conn):
+        # 模拟SQLite在IOERR/FULL等错误后自动回滚了整个事务
+        conn.execute("ROLLBACK")
+
+    blocker, release = hold_writer(writer)
+    futures = [writer.submit(insert("a")), writer.submit(rollback)]
+    release.set()
+
+    for future in futures:
+        with pytest.raises(sqlite3.OperationalError):
+            future.result(5)
+    assert not writer._conn.in_transaction
+    assert writer.execute(insert("b"))
+    assert names(writer) == ["b"]
+
+
+def test_commit_failure_fails_batch(writer):
+    writer.execute(lambda conn: conn.execute(
+        "CREATE TABLE children (parent INTEGER REFERENCES items(id) DEFERRABLE INITIALLY DEFERRED)"
+    ))
+    writer._conn.execute("PRAGMA foreign_keys = ON")
+
+    blocker, release = hold_writer(writer)
+    futures = [
+        writer.submit(insert("a")),
+        # 外键延迟到提交时检查，COMMIT失败
+        writer.submit(lambda conn: conn.execute("INSERT INTO children (parent) VALUES (42)")),
+    ]
+    release.set()
+
+    for future in futures:
+        with pytest.raises(sqlite3.IntegrityError):
+            future.result(5)
+    assert names(writer) == []
+    assert writer.stats()["failed_commits"] == 1
+    assert writer.execute(insert("b"))
+
+
+def test_execute_timeout_cancels_pending_operation(writer):
+    blocker, release = hold_writer(writer)
+    with pytest.raises(TimeoutError):
+        writer.execute(insert("a"), timeout=0.05)
+    release.set()
+    blocker.result(5)
+
+    assert writer.execute(insert("b"))
+    assert names(writer) == ["b"]
+    assert writer.stats()["timeouts"] == 1
+
+
+@pytest.mark.filterwarnings("ignore::pytest.PytestUnhandledThreadExceptionWarning")
+def test_writer_thread_restarts(writer):
+    def stop(conn):
+        raise SystemExit
+
+    with pytest.raises(SystemExit):
+        writer.execute(stop)
+    writer._thread.join(5)
+    assert not writer._thread.is_alive()
+    assert writer.execute(insert("a"))
+    assert names(writer) == ["a"]
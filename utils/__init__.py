@@ -1,2 +1,22 @@
-from .database import CloudDriveDatabase
-from .login import login_quark
\ No newline at end of file
+from .database import CloudDriveDatabase, get_link_cache
+from .login import login_quark, get_session, configure_sessions, warm_sessions, QuarkDriver
+from .drivers import BaseDriver, LoginTemplate, UpstreamError, register_driver, get_driver, login_with_drive, configure_templates, template_stats
+from .pool import ConnectionPool, get_pool
+from .migrations import run_migrations
+from .writer import WriteQueue, get_writer
+from .cache import TTLCache
+from .bloom import CountingBloomFilter, LinkFilter, get_link_filter
+from .jobs import JobRunner
+from .breaker import CircuitBreaker, AIMDLimiter, GuardRejected, get_guard
+from .balancer import select_drive
+from .events import EventLog, get_event_log
+from .rollups import configure_rollups, compact_rollups, prune_events, query_access_trend
+from .expiry import parse_expiry, format_expiry, is_expired
+from .sweeper import LinkSweeper, get_sweeper
+from .export import EXPORT_TABLES, iter_rows, ndjson_chunks, csv_chunks, gzip_chunks
+from .linkcode import encode_link_key, decode_link_code, normalize_link_code, configure_link_codes
+from .tokens import LinkSigner, InvalidToken
+from .rows import LazyJSONRow, configure_json_memo, json_memo_stats
+from .httpcache import DataVersionProbe, get_version_probe, make_etag, choose_encoding, compress_body
+from .counters import DashboardCounters, get_dashboard_counters
+from .logs import setup_logging, logging_stats, redact
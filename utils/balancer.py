@@ -0,0 +1,52 @@
+import itertools
+import random
+import threading
+from typing import Any, Dict, List, Optional
+
+from .breaker import get_guard
+
+
+# 账号池支持的选择策略
+STRATEGIES = ("round_robin", "least_in_flight", "latency_weighted")
+
+_round_robin: Dict[Any, itertools.count] = {}
+_round_robin_lock = threading.Lock()
+
+
+def _next_index(pool_key: Any) -> int:
+    """获取账号池的下一个轮询序号"""
+    counter = _round_robin.get(pool_key)
+    if counter is None:
+        with _round_robin_lock:
+            counter = _round_robin.setdefault(pool_key, itertools.count())
+    return next(counter)
+
+
+def select_drive(pool_key: Any, drives: List[Dict[str, Any]], strategy: str = "round_robin") -> Optional[Dict[str, Any]]:
+    """
+    从账号池中选择一个用于本次登录的网盘账号
+
+    已熔断或并发已满的账号会被跳过。
+
+    参数:
+        pool_key: 账号池标识，用于区分轮询序号
+        drives: 账号池中的用户网盘列表
+        strategy: 选择策略，round_robin、least_in_flight 或 latency_weighted
+
+    返回:
+        Dict: 选中的用户网盘，没有可用账号时返回None
+    """
+    available = [drive for drive in drives if get_guard(drive['id']).reject_reason() is None]
+    if not available:
+        return None
+    if len(available) == 1:
+        return available[0]
+
+    if strategy == "least_in_flight":
+        # 按并发占用比例选择最空闲的账号
+        return min(available, key=lambda drive: get_guard(drive['id']).limiter.in_flight / get_guard(drive['id']).limiter.limit)
+    if strategy == "latency_weighted":
+        # 按平均延迟的倒数加权随机选择，尚无延迟数据的账号按1秒计
+        weights = [1 / (get_guard(drive['id']).limiter.latency_ewma or 1.0) for drive in available]
+        return random.choices(available, weights=weights)[0]
+    return available[_next_index(pool_key) % len(available)]
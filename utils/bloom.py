@@ -0,0 +1,294 @@
+import hashlib
+import math
+import threading
+from typing import Dict, Any, Iterable, List, Optional, Tuple
+
+from .httpcache import get_version_probe
+from .pool import get_pool
+
+
+class CountingBloomFilter:
+    """
+    计数布隆过滤器
+
+    每个位置使用一个字节的计数器，因此支持删除元素。判断结果为不存在时一定不存在，
+    判断为存在时有一定概率误判。计数器达到255后不再变化，以免删除时产生漏判。
+    """
+
+    def __init__(self, capacity: int = 10000, error_rate: float = 0.001):
+        """
+        初始化过滤器
+
+        参数:
+            capacity: 预期元素数量
+            error_rate: 元素数量达到capacity时的目标误判率
+        """
+        self.capacity = max(1, capacity)
+        self.error_rate = error_rate
+        self.size = max(8, int(math.ceil(-self.capacity * math.log(error_rate) / (math.log(2) ** 2))))
+        self.hash_count = max(1, int(round(self.size / self.capacity * math.log(2))))
+        self._counters = bytearray(self.size)
+        self.count = 0
+
+    def _positions(self, item: str) -> Iterable[int]:
+        """使用双重哈希计算元素对应的计数器位置"""
+        digest = hashlib.blake2b(item.encode('utf-8'), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], 'little')
+        h2 = int.from_bytes(digest[8:], 'little') | 1
+        return ((h1 + i * h2) % self.size for i in range(self.hash_count))
+
+    def add(self, item: str):
+        """
+        添加元素
+
+        参数:
+            item: 元素
+        """
+        for pos in self._positions(item):
+            if self._counters[pos] < 255:
+                self._counters[pos] += 1
+        self.count += 1
+
+    def remove(self, item: str) -> bool:
+        """
+        删除元素，只应删除确实添加过的元素
+
+        参数:
+            item: 元素
+
+        返回:
+            bool: 元素是否可能存在并已删除
+        """
+        positions = list(self._positions(item))
+        if not all(self._counters[pos] for pos in positions):
+            return False
+        for pos in positions:
+            if self._counters[pos] < 255:
+                self._counters[pos] -= 1
+        self.count = max(0, self.count - 1)
+        return True
+
+    def __contains__(self, item: str) -> bool:
+        return all(self._counters[pos] for pos in self._positions(item))
+
+    def __len__(self) -> int:
+        return self.count
+
+    def false_positive_rate(self) -> float:
+        """
+        按当前元素数量估算误判率
+
+        返回:
+            float: 估算的误判率
+        """
+        return (1 - math.exp(-self.hash_count * self.count / self.size)) ** self.hash_count
+
+    def memory_bytes(self) -> int:
+        """
+        获取计数器占用的内存
+
+        返回:
+            int: 字节数
+        """
+        return len(self._counters)
+
+
+class LinkFilter:
+    """
+    外链短码的成员过滤器
+
+    启动时从数据库加载全部外链短码，本进程的创建和删除即时同步。其他进程创建的外链
+    通过按自增ID增量同步获得：判断为不存在时先读取数据库的数据版本号（PRAGMA data_version），
+    自上次同步以来有新的提交才增量同步再判断，因此不会把其他进程刚创建的外链误判为不存在；
+    数据库没有变化时随机探测不会产生数据库查询。其他进程删除的外链只会造成误判为存在，
+    后续数据库查询会给出正确结果。
+    """
+
+    def __init__(self, db_path: str, error_rate: float = 0.001, min_capacity: int = 10000):
+        """
+        初始化过滤器并从数据库加载
+
+        参数:
+            db_path: 数据库文件路径
+            error_rate: 目标误判率
+            min_capacity: 过滤器的最小容量
+        """
+        self.db_path = db_path
+        self.error_rate = error_rate
+        self.min_capacity = min_capacity
+        self._probe = get_version_probe(db_path)
+        self._lock = threading.Lock()
+        self._sync_lock = threading.Lock()
+        self._local_ids = set()
+        self.lookups = 0
+        self.rejected = 0
+        self.syncs = 0
+        self.rebuilds = 0
+        self._rebuild()
+
+    def _rebuild(self):
+        """从数据库全量重建过滤器"""
+        # 先读取版本号，加载期间的提交会在下一次未命中时同步
+        version = self._probe.version()
+        pool = get_pool(self.db_path)
+        conn = pool.acquire()
+        try:
+            count = conn.execute("SELECT COUNT(*) FROM external_links").fetchone()[0]
+            bloom = CountingBloomFilter(max(self.min_capacity, count * 2), self.error_rate)
+            max_id = 0
+            for row in conn.execute("SELECT id, link_code(link_key) FROM external_links"):
+                bloom.add(row[1])
+                max_id = max(max_id, row[0])
+        finally:
+            pool.release(conn)
+        with self._lock:
+            self._bloom = bloom
+            self._max_id = max_id
+            self._local_ids.clear()
+            self._synced_version = version
+        self.rebuilds += 1
+
+    def _sync(self):
+        """增量加载上次同步之后新建的外链，调用方需持有 _sync_lock"""
+        version = self._probe.version()
+        pool = get_pool(self.db_path)
+        conn = pool.acquire()
+        try:
+            rows = conn.execute(
+                "SELECT id, link_code(link_key) FROM external_links WHERE id > ? ORDER BY id", (self._max_id,)
+            ).fetchall()
+        finally:
+            pool.release(conn)
+        with self._lock:
+            for link_id, link_code in rows:
+                # 本进程创建的外链已经在创建时加入
+                if link_id in self._local_ids:
+                    self._local_ids.discard(link_id)
+                else:
+                    self._bloom.add(link_code)
+                self._max_id = max(self._max_id, link_id)
+            self._synced_version = version
+            needs_rebuild = self._bloom.count > self._bloom.capacity
+        self.syncs += 1
+        if needs_rebuild:
+            self._rebuild()
+
+    def might_contain(self, link_code: str) -> bool:
+        """
+        判断外链短码是否可能存在
+
+        参数:
+            link_code: 外链短码
+
+        返回:
+            bool: 为False时外链一定不存在
+        """
+        self.lookups += 1
+        if link_code in self._bloom:
+            return True
+        if self._probe.version() != self._synced_version:
+            # 同一时刻只有一个线程同步，其他线程等待其完成后直接使用同步结果
+            with self._sync_lock:
+                if self._probe.version() != self._synced_version:
+                    self._sync()
+            if link_code in self._bloom:
+                return True
+        self.rejected += 1
+        return False
+
+    def add(self, link_code: str, link_id: int):
+        """
+        记录本进程新建的外链
+
+        参数:
+            link_code: 外链短码
+            link_id: 外链自增ID
+        """
+        with self._lock:
+            self._bloom.add(link_code)
+            if link_id > self._max_id:
+                self._local_ids.add(link_id)
+
+    def add_many(self, links: List[Tuple[str, int]]):
+        """
+        批量记录本进程新建的外链，超出容量时直接从数据库重建
+
+        参数:
+            links: (外链短码, 外链自增ID) 列表
+        """
+        with self._lock:
+            needs_rebuild = self._bloom.count + len(links) > self._bloom.capacity
+            if not needs_rebuild:
+                for link_code, link_id in links:
+                    self._bloom.add(link_code)
+                    if link_id > self._max_id:
+                        self._local_ids.add(link_id)
+        if needs_rebuild:
+            self._rebuild()
+
+    def remove(self, link_code: str):
+        """
+        移除本进程删除的外链
+
+        参数:
+            link_code: 外链短码
+        """
+        with self._lock:
+            self._bloom.remove(link_code)
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        获取过滤器统计信息
+
+        返回:
+            Dict: 元素数、容量、内存占用、估算误判率及查询/拦截次数
+        """
+        bloom = self._bloom
+        return {
+            "items": bloom.count,
+            "capacity": bloom.capacity,
+            "hash_count": bloom.hash_count,
+            "memory_bytes": bloom.memory_bytes(),
+            "false_positive_rate": round(bloom.false_positive_rate(), 6),
+            "lookups": self.lookups,
+            "rejected": self.rejected,
+            "syncs": self.syncs,
+            "rebuilds": self.rebuilds,
+        }
+
+
+_filters: Dict[str, LinkFilter] = {}
+_filters_lock = threading.Lock()
+
+
+def get_link_filter(db_path: str, error_rate: float = 0.001) -> LinkFilter:
+    """
+    获取指定数据库的进程级外链过滤器，首次调用时从数据库构建
+
+    参数:
+        db_path: 数据库文件路径
+        error_rate: 目标误判率，仅首次创建时生效
+
+    返回:
+        LinkFilter: 外链过滤器
+    """
+    link_filter = _filters.get(db_path)
+    if link_filter is None:
+        with _filters_lock:
+            link_filter = _filters.get(db_path)
+            if link_filter is None:
+                link_filter = _filters[db_path] = LinkFilter(db_path, error_rate)
+    return link_filter
+
+
+def loaded_link_filter(db_path: str) -> Optional[LinkFilter]:
+    """
+    获取已构建的外链过滤器，不会触发构建
+
+    参数:
+        db_path: 数据库文件路径
+
+    返回:
+        LinkFilter: 外链过滤器，尚未构建时返回None
+    """
+    return _filters.get(db_path)
@@ -0,0 +1,285 @@
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+
+class GuardRejected(Exception):
+    """请求在到达上游之前被熔断器或并发限制拒绝"""
+
+    def __init__(self, message: str):
+        super().__init__(message)
+        self.message = message
+
+
+class CircuitBreaker:
+    """
+    熔断器
+
+    连续失败达到阈值后进入open状态，期间请求直接失败；经过恢复时间后进入half_open状态，
+    放行少量试探请求，试探成功则恢复closed，失败则重新open。
+    """
+
+    def __init__(self, failure_threshold: int = 5, recovery_timeout: float = 30, half_open_max: int = 1):
+        """
+        参数:
+            failure_threshold: 触发熔断的连续失败次数
+            recovery_timeout: 熔断后到允许试探的时间（秒）
+            half_open_max: half_open状态下同时放行的试探请求数
+        """
+        self.failure_threshold = failure_threshold
+        self.recovery_timeout = recovery_timeout
+        self.half_open_max = half_open_max
+        self.state = "closed"
+        self.consecutive_failures = 0
+        self.opened_at = 0.0
+        self._half_open_in_flight = 0
+        self._lock = threading.Lock()
+
+    def _refresh(self):
+        """open状态超过恢复时间后转为half_open，调用方需持有锁"""
+        if self.state == "open" and time.monotonic() - self.opened_at >= self.recovery_timeout:
+            self.state = "half_open"
+            self._half_open_in_flight = 0
+
+    def is_open(self) -> bool:
+        """
+        判断当前是否处于熔断状态，不占用试探名额
+
+        返回:
+            bool: 请求是否会被直接拒绝
+        """
+        with self._lock:
+            self._refresh()
+            return self.state == "open" or (
+                self.state == "half_open" and self._half_open_in_flight >= self.half_open_max
+            )
+
+    def allow(self) -> bool:
+        """
+        判断是否放行一次请求，half_open状态下会占用一个试探名额
+
+        返回:
+            bool: 是否放行
+        """
+        with self._lock:
+            self._refresh()
+            if self.state == "closed":
+                return True
+            if self.state == "half_open" and self._half_open_in_flight < self.half_open_max:
+                self._half_open_in_flight += 1
+                return True
+            return False
+
+    def record_success(self):
+        """记录一次成功的上游调用"""
+        with self._lock:
+            self.consecutive_failures = 0
+            if self.state == "half_open":
+                self.state = "closed"
+
+    def record_failure(self):
+        """记录一次失败的上游调用"""
+        with self._lock:
+            self.consecutive_failures += 1
+            if self.state == "half_open" or self.consecutive_failures >= self.failure_threshold:
+                self.state = "open"
+                self.opened_at = time.monotonic()
+
+
+class AIMDLimiter:
+    """
+    加性增、乘性减的自适应并发限制
+
+    调用成功且延迟不超过目标时，并发上限每轮缓慢增加；出错或延迟超标时上限按比例下降。
+    """
+
+    def __init__(self, initial: int = 4, min_limit: int = 1, max_limit: int = 32,
+                 latency_target: float = 3.0, backoff: float = 0.5):
+        """
+        参数:
+            initial: 初始并发上限
+            min_limit: 并发上限的最小值
+            max_limit: 并发上限的最大值
+            latency_target: 目标延迟（秒），超过视为上游过载
+            backoff: 过载时并发上限的缩减比例
+        """
+        self.limit = float(initial)
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.latency_target = latency_target
+        self.backoff = backoff
+        self.in_flight = 0
+        self.latency_ewma = 0.0
+        self.rejected = 0
+        self._lock = threading.Lock()
+
+    def try_acquire(self) -> bool:
+        """
+        尝试占用一个并发名额
+
+        返回:
+            bool: 是否占用成功
+        """
+        with self._lock:
+            if self.in_flight >= int(self.limit):
+                self.rejected += 1
+                return False
+            self.in_flight += 1
+            return True
+
+    def cancel(self):
+        """归还未实际使用的并发名额，不调整上限"""
+        with self._lock:
+            self.in_flight -= 1
+
+    def release(self, latency: float, ok: bool):
+        """
+        归还并发名额并根据本次结果调整上限
+
+        参数:
+            latency: 本次调用耗时（秒）
+            ok: 本次调用是否成功
+        """
+        with self._lock:
+            self.in_flight -= 1
+            self.latency_ewma = latency if not self.latency_ewma else 0.8 * self.latency_ewma + 0.2 * latency
+            if ok and latency <= self.latency_target:
+                # 每个成功调用增加 1/limit，约等于每轮并发窗口增加1
+                self.limit = min(self.max_limit, self.limit + 1 / self.limit)
+            else:
+                self.limit = max(self.min_limit, self.limit * self.backoff)
+
+
+class DriveGuard:
+    """单个网盘账号的熔断器与并发限制"""
+
+    def __init__(self, drive_id: int, options: Dict[str, Any]):
+        """
+        参数:
+            drive_id: 网盘ID
+            options: 熔断与并发限制参数
+        """
+        self.drive_id = drive_id
+        self.breaker = CircuitBreaker(options["failure_threshold"], options["recovery_timeout"])
+        self.limiter = AIMDLimiter(options["initial_limit"], 1, options["max_limit"], options["latency_target"])
+        self.successes = 0
+        self.failures = 0
+
+    def reject_reason(self) -> Optional[str]:
+        """
+        在发起调用前检查是否会被拒绝，不占用任何名额
+
+        返回:
+            str: 拒绝原因，可以调用时返回None
+        """
+        if self.breaker.is_open():
+            return "网盘账号暂时不可用，请稍后重试"
+        if self.limiter.in_flight >= int(self.limiter.limit):
+            return "网盘账号登录请求过多，请稍后重试"
+        return None
+
+    def call(self, fn: Callable[..., Any], *args) -> Any:
+        """
+        在熔断器与并发限制保护下调用上游
+
+        调用抛出异常（超时、连接失败、上游限流等）计为失败；正常返回的登录结果，
+        无论登录是否成功，都说明上游可用，计为成功。
+
+        参数:
+            fn: 上游调用
+            args: 调用参数
+
+        返回:
+            Any: 上游调用的返回值
+        """
+        # 先占用并发名额再检查熔断器，避免half_open的试探名额被并发限制拒绝后无法归还
+        if not self.limiter.try_acquire():
+            raise GuardRejected("网盘账号登录请求过多，请稍后重试")
+        if not self.breaker.allow():
+            self.limiter.cancel()
+            raise GuardRejected("网盘账号暂时不可用，请稍后重试")
+        start = time.monotonic()
+        ok = False
+        try:
+            result = fn(*args)
+            ok = True
+            return result
+        finally:
+            latency = time.monotonic() - start
+            self.limiter.release(latency, ok)
+            if ok:
+                self.successes += 1
+                self.breaker.record_success()
+            else:
+                self.failures += 1
+                self.breaker.record_failure()
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        获取熔断与并发限制状态
+
+        返回:
+            Dict: 熔断状态、并发上限、执行中请求数、平均延迟等
+        """
+        return {
+            "drive_id": self.drive_id,
+            "state": self.breaker.state,
+            "consecutive_failures": self.breaker.consecutive_failures,
+            "limit": round(self.limiter.limit, 2),
+            "in_flight": self.limiter.in_flight,
+            "latency_ms": round(self.limiter.latency_ewma * 1000, 1),
+            "rejected": self.limiter.rejected,
+            "successes": self.successes,
+            "failures": self.failures,
+        }
+
+
+_guard_options = {
+    "failure_threshold": 5,
+    "recovery_timeout": 30,
+    "initial_limit": 4,
+    "max_limit": 32,
+    "latency_target": 3.0,
+}
+_guards: Dict[str, DriveGuard] = {}
+_guards_lock = threading.Lock()
+
+
+def configure_guards(**options):
+    """
+    设置熔断与并发限制参数，只对之后创建的账号生效
+
+    参数:
+        options: failure_threshold、recovery_timeout、initial_limit、max_limit、latency_target
+    """
+    _guard_options.update(options)
+
+
+def get_guard(drive_id: int) -> DriveGuard:
+    """
+    获取网盘账号的熔断器与并发限制，首次调用时创建
+
+    参数:
+        drive_id: 网盘ID
+
+    返回:
+        DriveGuard: 账号保护器
+    """
+    key = str(drive_id)
+    guard = _guards.get(key)
+    if guard is None:
+        with _guards_lock:
+            guard = _guards.get(key)
+            if guard is None:
+                guard = _guards[key] = DriveGuard(drive_id, dict(_guard_options))
+    return guard
+
+
+def all_guard_stats() -> List[Dict[str, Any]]:
+    """
+    获取所有网盘账号的熔断与并发限制状态
+
+    返回:
+        List: 各账号状态列表
+    """
+    return [guard.stats() for guard in list(_guards.values())]
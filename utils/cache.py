@@ -0,0 +1,168 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple
+
+
+class TTLCache:
+    """
+    线程安全的LRU缓存，条目超过存活时间后视为失效
+
+    读取数据库后回填缓存时，数据可能在读取之后、回填之前被修改并使缓存失效，直接回填会把旧数据写回缓存。
+    因此每个键维护一个失效代数：读取前用 generation() 取得代数，回填时传给 set()，期间发生过失效则放弃回填。
+    """
+
+    def __init__(self, maxsize: int = 1024, ttl: float = 30.0):
+        """
+        初始化缓存
+
+        参数:
+            maxsize: 最大条目数，超出时淘汰最久未使用的条目
+            ttl: 条目存活时间（秒）
+        """
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+        self.stale_sets = 0
+        # 键 -> 失效次数；按条件失效或清空时无法逐键记录，改为递增整体纪元
+        self._generations: Dict[Hashable, int] = {}
+        self._epoch = 0
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """
+        读取缓存条目
+
+        参数:
+            key: 缓存键
+            default: 未命中时的返回值
+
+        返回:
+            Any: 缓存值，未命中或已过期时返回default
+        """
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                self.misses += 1
+                return default
+            expires_at, value = entry
+            if expires_at < time.monotonic():
+                del self._data[key]
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def generation(self, key: Hashable) -> Tuple[int, int]:
+        """
+        获取缓存键当前的失效代数，在读取要回填的数据之前调用
+
+        参数:
+            key: 缓存键
+
+        返回:
+            Tuple: 失效代数，传给 set() 的 generation 参数
+        """
+        with self._lock:
+            return self._epoch, self._generations.get(key, 0)
+
+    def set(self, key: Hashable, value: Any, generation: Optional[Tuple[int, int]] = None) -> bool:
+        """
+        写入缓存条目
+
+        参数:
+            key: 缓存键
+            value: 缓存值
+            generation: 读取数据前由 generation() 取得的失效代数，之后该键失效过时不写入
+
+        返回:
+            bool: 是否已写入
+        """
+        with self._lock:
+            if generation is not None and generation != (self._epoch, self._generations.get(key, 0)):
+                self.stale_sets += 1
+                return False
+            self._data[key] = (time.monotonic() + self.ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+            return True
+
+    def _bump(self, key: Hashable):
+        """递增键的失效代数，调用方需持有锁"""
+        self._generations[key] = self._generations.get(key, 0) + 1
+        if len(self._generations) > self.maxsize:
+            # 限制记录的键数：递增纪元同样能让进行中的回填全部放弃，之后可以清空逐键记录
+            self._epoch += 1
+            self._generations.clear()
+
+    def invalidate(self, key: Hashable) -> bool:
+        """
+        使指定条目失效
+
+        参数:
+            key: 缓存键
+
+        返回:
+            bool: 条目是否存在
+        """
+        with self._lock:
+            # 条目不在缓存中时也要递增代数，正在读取该键的请求可能稍后回填
+            self._bump(key)
+            if self._data.pop(key, None) is None:
+                return False
+            self.invalidations += 1
+            return True
+
+    def invalidate_where(self, predicate: Callable[[Hashable, Any], bool]) -> int:
+        """
+        使满足条件的所有条目失效
+
+        参数:
+            predicate: 接收 (键, 值) 的判断函数
+
+        返回:
+            int: 失效的条目数
+        """
+        with self._lock:
+            self._epoch += 1
+            keys = [key for key, (_, value) in self._data.items() if predicate(key, value)]
+            for key in keys:
+                del self._data[key]
+            self.invalidations += len(keys)
+            return len(keys)
+
+    def clear(self):
+        """清空缓存"""
+        with self._lock:
+            self._epoch += 1
+            self._generations.clear()
+            self.invalidations += len(self._data)
+            self._data.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        获取缓存统计信息
+
+        返回:
+            Dict: 条目数、命中/未命中次数、命中率、淘汰与失效次数、因期间失效而放弃的回填次数
+        """
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._data),
+                "maxsize": self.maxsize,
+                "ttl": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+                "stale_sets": self.stale_sets,
+            }
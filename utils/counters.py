@@ -0,0 +1,352 @@
+import json
+import logging
+import queue
+import threading
+import time
+from typing import Any, Dict, Iterator, Optional
+
+from .pool import get_pool
+
+
+logger = logging.getLogger(__name__)
+
+
+COUNTER_FIELDS = ("user_drives_count", "active_links_count", "total_links_count")
+
+
+def format_event(event: str, data: Dict[str, Any], event_id: Optional[int] = None) -> str:
+    """
+    格式化一条 Server-Sent Events 消息
+
+    参数:
+        event: 事件类型
+        data: 事件数据，序列化为JSON
+        event_id: 事件序号
+
+    返回:
+        str: SSE消息文本
+    """
+    lines = [f"event: {event}"]
+    if event_id is not None:
+        lines.append(f"id: {event_id}")
+    lines.append(f"data: {json.dumps(data, ensure_ascii=False, separators=(',', ':'))}")
+    return "\n".join(lines) + "\n\n"
+
+
+class Subscription:
+    """
+    仪表盘计数订阅，迭代得到SSE消息文本
+
+    由发布线程写入队列，订阅方的请求线程只从自己的队列读取；队列积压时丢弃积压的增量，
+    改为推送一次完整快照。设置了 max_age 时到期后迭代结束，浏览器的 EventSource 会自动重连，
+    长期打开的页面不会一直占用同一个请求线程。
+    """
+
+    def __init__(self, counters: "DashboardCounters", heartbeat: float, backlog: int,
+                 max_age: Optional[float] = None):
+        self._counters = counters
+        self._heartbeat = heartbeat
+        self._deadline = time.monotonic() + max_age if max_age else None
+        self._queue = queue.Queue(maxsize=backlog)
+        # 是否已推送过快照，之后只推送增量
+        self.greeted = False
+        self.closed = False
+
+    def push(self, message: str):
+        """由发布线程调用，写入一条消息，队列已满时清空积压并改为推送快照"""
+        try:
+            self._queue.put_nowait(message)
+        except queue.Full:
+            while True:
+                try:
+                    self._queue.get_nowait()
+                except queue.Empty:
+                    break
+            self._queue.put_nowait(self._counters.snapshot_event())
+
+    def __iter__(self) -> Iterator[str]:
+        while not self.closed:
+            timeout = self._heartbeat
+            if self._deadline is not None:
+                remaining = self._deadline - time.monotonic()
+                if remaining <= 0:
+                    return
+                timeout = min(timeout, remaining)
+            try:
+                yield self._queue.get(timeout=timeout)
+            except queue.Empty:
+                if self._deadline is not None and time.monotonic() >= self._deadline:
+                    return
+                # 注释行作为心跳，保持连接并及时发现已断开的客户端
+                yield ": ping\n\n"
+
+    def close(self):
+        """取消订阅"""
+        self.closed = True
+        self._counters.unsubscribe(self)
+
+
+class DashboardCounters:
+    """
+    仪表盘计数器（网盘账号数、有效外链数、外链总数）
+
+    计数保存在内存中，由数据库写操作在提交后按变化量更新；单一发布线程把变化合并后推送给所有订阅者，
+    订阅者数量不影响数据库查询次数。有效外链数会随时间过期而减少，其他进程的写入也不会经过本进程，
+    因此有订阅者时发布线程会定期、以及在最近一个有效外链到期时重新统计一次。
+    """
+
+    def __init__(self, db_path: str, resync_interval: float = 60, min_publish_interval: float = 0.5,
+                 heartbeat: float = 15, backlog: int = 64):
+        """
+        初始化计数器，首次订阅时从数据库统计并启动发布线程
+
+        参数:
+            db_path: 数据库文件路径
+            resync_interval: 有订阅者时重新统计的间隔（秒）
+            min_publish_interval: 两次推送之间的最小间隔（秒），期间的变化合并为一次推送
+            heartbeat: 没有变化时发送心跳的间隔（秒）
+            backlog: 每个订阅者最多积压的消息数
+        """
+        self.db_path = db_path
+        self.resync_interval = resync_interval
+        self.min_publish_interval = min_publish_interval
+        self.heartbeat = heartbeat
+        self.backlog = backlog
+        self._cond = threading.Condition()
+        self._values: Optional[Dict[str, int]] = None
+        self._published: Dict[str, int] = {}
+        self._seq = 0
+        self._subscribers = set()
+        self._resync_requested = True
+        # 由 refresh() 请求的统计本来就会改变计数，不计入偏差
+        self._refresh_pending = False
+        self._resynced_at = 0.0
+        self._next_expiry: Optional[int] = None
+        self._thread: Optional[threading.Thread] = None
+        self.resyncs = 0
+        self.published = 0
+        self.drift = 0
+        self.rejected = 0
+
+    def add(self, **deltas: int):
+        """
+        在数据库写操作提交后更新计数
+
+        参数:
+            deltas: 计数名 -> 变化量，如 total_links_count=1
+        """
+        with self._cond:
+            if self._values is None:
+                return
+            for field, delta in deltas.items():
+                if delta:
+                    self._values[field] += delta
+            self._cond.notify()
+
+    def refresh(self):
+        """无法确定变化量的写操作（如批量修改）之后调用，由发布线程重新统计"""
+        with self._cond:
+            self._resync_requested = True
+            self._refresh_pending = True
+            self._cond.notify()
+
+    def values(self) -> Optional[Dict[str, int]]:
+        """
+        获取当前计数
+
+        返回:
+            Dict: 计数名 -> 值，尚未统计时返回None
+        """
+        with self._cond:
+            return dict(self._values) if self._values is not None else None
+
+    def snapshot_event(self) -> str:
+        """生成包含全部计数的快照消息"""
+        with self._cond:
+            return format_event("snapshot", dict(self._published), self._seq)
+
+    def subscribe(self, max_subscribers: Optional[int] = None, max_age: Optional[float] = None) -> Optional[Subscription]:
+        """
+        订阅计数变化，第一条消息为当前计数的快照
+
+        参数:
+            max_subscribers: 订阅者数量上限，达到上限时拒绝订阅
+            max_age: 订阅的最长持续时间（秒），到期后迭代结束
+
+        返回:
+            Subscription: 订阅，迭代得到SSE消息文本；订阅者已达上限时返回None
+        """
+        subscription = Subscription(self, self.heartbeat, self.backlog, max_age)
+        with self._cond:
+            if max_subscribers is not None and len(self._subscribers) >= max_subscribers:
+                self.rejected += 1
+                return None
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._loop, name="dashboard-counters", daemon=True)
+                self._thread.start()
+            # 长时间没有订阅者时计数可能已经偏离，先重新统计
+            if time.monotonic() - self._resynced_at >= self.resync_interval:
+                self._resync_requested = True
+            self._subscribers.add(subscription)
+            if self._values is not None and not self._resync_requested:
+                subscription.greeted = True
+                subscription.push(format_event("snapshot", dict(self._published), self._seq))
+            self._cond.notify()
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription):
+        with self._cond:
+            self._subscribers.discard(subscription)
+
+    def _count(self) -> Dict[str, Any]:
+        """从数据库统计全部计数，以及最近一个有效外链的到期时间"""
+        now = int(time.time())
+        pool = get_pool(self.db_path)
+        conn = pool.acquire()
+        try:
+            row = conn.execute(
+                "SELECT (SELECT COUNT(*) FROM user_drives), "
+                "(SELECT COUNT(*) FROM external_links WHERE expiry_epoch > ? AND used_quota < total_quota)"
+                " + (SELECT COUNT(*) FROM external_links WHERE expiry_epoch IS NULL AND used_quota < total_quota), "
+                "(SELECT COUNT(*) FROM external_links), "
+                "(SELECT MIN(expiry_epoch) FROM external_links WHERE expiry_epoch > ? AND used_quota < total_quota)",
+                (now, now)
+            ).fetchone()
+        finally:
+            pool.release(conn)
+        return {
+            "values": dict(zip(COUNTER_FIELDS, row[:3])),
+            "next_expiry": row[3],
+        }
+
+    def _resync_due(self) -> Optional[float]:
+        """距离下一次定期统计的秒数，没有订阅者时返回None"""
+        if not self._subscribers:
+            return None
+        if self._resync_requested:
+            return 0
+        due = self._resynced_at + self.resync_interval
+        if self._next_expiry is not None:
+            # 换算为单调时钟，外链到期后1秒重新统计
+            due = min(due, time.monotonic() + self._next_expiry - time.time() + 1)
+        return max(0.0, due - time.monotonic())
+
+    def _loop(self):
+        """发布线程主循环：等待变化或定期统计，合并后推送给全部订阅者"""
+        while True:
+            with self._cond:
+                while True:
+                    due = self._resync_due()
+                    if due == 0 or (self._values is not None and self._values != self._published and self._subscribers):
+                        break
+                    self._cond.wait(due)
+                resync = due == 0
+                if resync:
+                    self._resync_requested = False
+                    refreshed, self._refresh_pending = self._refresh_pending, False
+
+            if resync:
+                try:
+                    counted = self._count()
+                except Exception:
+                    logger.exception("统计仪表盘计数失败")
+                    with self._cond:
+                        self._resync_requested = False
+                        self._resynced_at = time.monotonic()
+                    continue
+                with self._cond:
+                    if self._values is not None and not refreshed:
+                        self.drift += sum(abs(counted["values"][field] - self._values[field]) for field in COUNTER_FIELDS)
+                    self._values = counted["values"]
+                    self._next_expiry = counted["next_expiry"]
+                    self._resynced_at = time.monotonic()
+                    self.resyncs += 1
+
+            self._publish()
+            time.sleep(self.min_publish_interval)
+
+    def _publish(self):
+        """把与上次推送相比的变化量推送给全部订阅者，尚未收到快照的订阅者推送快照"""
+        with self._cond:
+            if self._values is None:
+                return
+            changes = {field: self._values[field] - self._published.get(field, 0)
+                       for field in COUNTER_FIELDS if self._values[field] != self._published.get(field)}
+            if changes:
+                self._seq += 1
+                self._published = dict(self._values)
+                self.published += 1
+            seq, values = self._seq, dict(self._published)
+            subscribers = [subscription for subscription in self._subscribers if changes or not subscription.greeted]
+        if not subscribers:
+            return
+        # 消息只格式化一次，所有订阅者共用
+        snapshot = format_event("snapshot", values, seq)
+        delta = format_event("delta", {"changes": changes, "values": values}, seq) if changes else None
+        for subscription in subscribers:
+            if subscription.greeted:
+                subscription.push(delta)
+            else:
+                subscription.greeted = True
+                subscription.push(snapshot)
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        获取计数器统计信息
+
+        返回:
+            Dict: 当前计数、订阅者数、因达到上限被拒绝的订阅数、统计与推送次数，以及重新统计时发现的累计偏差
+        """
+        with self._cond:
+            return {
+                "values": dict(self._values) if self._values is not None else None,
+                "subscribers": len(self._subscribers),
+                "rejected": self.rejected,
+                "resyncs": self.resyncs,
+                "published": self.published,
+                "drift": self.drift,
+                "seq": self._seq,
+            }
+
+
+_counters: Dict[str, DashboardCounters] = {}
+_counters_lock = threading.Lock()
+
+
+def get_dashboard_counters(db_path: str, resync_interval: float = 60, min_publish_interval: float = 0.5,
+                           heartbeat: float = 15, backlog: int = 64) -> DashboardCounters:
+    """
+    获取指定数据库的进程级仪表盘计数器
+
+    参数:
+        db_path: 数据库文件路径
+        resync_interval: 有订阅者时重新统计的间隔（秒），仅首次创建时生效
+        min_publish_interval: 两次推送之间的最小间隔（秒），仅首次创建时生效
+        heartbeat: 心跳间隔（秒），仅首次创建时生效
+        backlog: 每个订阅者最多积压的消息数，仅首次创建时生效
+
+    返回:
+        DashboardCounters: 仪表盘计数器
+    """
+    counters = _counters.get(db_path)
+    if counters is None:
+        with _counters_lock:
+            counters = _counters.get(db_path)
+            if counters is None:
+                counters = _counters[db_path] = DashboardCounters(
+                    db_path, resync_interval, min_publish_interval, heartbeat, backlog
+                )
+    return counters
+
+
+def loaded_dashboard_counters(db_path: str) -> Optional[DashboardCounters]:
+    """
+    获取已创建的仪表盘计数器，不会触发创建
+
+    参数:
+        db_path: 数据库文件路径
+
+    返回:
+        DashboardCounters: 仪表盘计数器，未创建时返回None
+    """
+    return _counters.get(db_path)
@@ -1,8 +1,165 @@
 import sqlite3
 import json
-import uuid
-from typing import Dict, Any, Optional
-from datetime import datetime, timedelta
+import logging
+import threading
+import time
+from typing import Dict, Any, List, Optional, Tuple
+
+from .pool import get_pool
+from .writer import get_writer
+from .cache import TTLCache
+from .bloom import loaded_link_filter
+from .drivers import invalidate_templates
+from .balancer import STRATEGIES
+from .rollups import query_access_trend
+from .expiry import parse_expiry, format_expiry
+from .linkcode import new_link_key, encode_link_key, decode_link_code
+from .rows import drive_row, provider_row
+from .counters import loaded_dashboard_counters
+
+
+logger = logging.getLogger(__name__)
+
+
+# 分页查询允许返回的字段
+LINK_FIELDS = ("id", "drive_id", "pool_id", "total_quota", "used_quota", "link_code", "remarks",
+               "expiry_time", "expiry_epoch", "exhausted_at")
+ARCHIVE_FIELDS = LINK_FIELDS + ("archived_at", "archive_reason")
+DRIVE_FIELDS = ("id", "provider_name", "login_config", "remarks", "version")
+# 不直接对应表中列的字段 -> SELECT表达式，外链以BLOB存储标识，对外返回base62短码
+COMPUTED_FIELDS = {"link_code": "link_code(link_key) AS link_code"}
+# 分页查询单页最多返回的条数
+MAX_PAGE_SIZE = 500
+
+def select_list(columns) -> str:
+    """
+    将字段列表转换为SELECT列表，计算字段替换为对应的表达式
+
+    参数:
+        columns: 字段列表
+
+    返回:
+        str: SELECT列表
+    """
+    return ", ".join(COMPUTED_FIELDS.get(column, column) for column in columns)
+
+
+LINK_SELECT = select_list(LINK_FIELDS)
+ARCHIVE_SELECT = select_list(ARCHIVE_FIELDS)
+
+_link_caches: Dict[str, TTLCache] = {}
+_link_caches_lock = threading.Lock()
+
+
+def get_link_cache(db_path: str, maxsize: int = 1024, ttl: float = 30.0) -> TTLCache:
+    """
+    获取指定数据库的进程级外链解析缓存，首次调用时创建
+
+    缓存键为外链短码，值为 (外链信息, 候选网盘列表)。写操作会使相关条目失效；
+    其他进程的写入只能等待条目过期，因此ttl不宜过长。
+
+    参数:
+        db_path: 数据库文件路径
+        maxsize: 最大条目数，仅首次创建时生效
+        ttl: 条目存活时间（秒），仅首次创建时生效
+
+    返回:
+        TTLCache: 外链解析缓存
+    """
+    cache = _link_caches.get(db_path)
+    if cache is None:
+        with _link_caches_lock:
+            cache = _link_caches.get(db_path)
+            if cache is None:
+                cache = _link_caches[db_path] = TTLCache(maxsize, ttl)
+    return cache
+
+
+def _project(fields: Optional[List[str]], allowed: tuple, default: tuple) -> List[str]:
+    """
+    根据请求的字段列表确定查询的列，忽略不允许的字段，始终包含作为游标的id
+    
+    参数:
+        fields: 请求的字段
+        allowed: 允许的字段
+        default: 未指定字段时使用的字段
+        
+    返回:
+        List: 查询的列
+    """
+    selected = [field for field in (fields or default) if field in allowed]
+    if "id" not in selected:
+        selected.insert(0, "id")
+    return selected
+
+
+def _like_pattern(text: str) -> str:
+    """将文字转为LIKE子串匹配模式，转义其中的通配符"""
+    escaped = text.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+    return f"%{escaped}%"
+
+
+def _link_conditions(selection: Dict[str, Any]) -> Tuple[List[str], list]:
+    """
+    将外链筛选条件转换为WHERE条件
+    
+    参数:
+        selection: 筛选条件，支持以下可选键
+            ids: 外链ID列表
+            link_codes: 外链短码列表，也可以是旧版UUID
+            drive_id: 网盘ID
+            pool_id: 账号池ID
+            provider_name: 服务商名称
+            status: active、expired 或 exhausted
+            remarks: 备注包含的文字
+            expiry_before / expiry_after: 过期时间范围，ISO 8601字符串或时间戳
+        
+    返回:
+        Tuple: (条件列表, 参数列表)
+    """
+    conditions, params = [], []
+    # ID列表作为一个JSON参数传入，不受SQL参数个数限制
+    if selection.get("ids") is not None:
+        conditions.append("id IN (SELECT value FROM json_each(?))")
+        params.append(json.dumps([int(link_id) for link_id in selection["ids"]]))
+    if selection.get("link_codes") is not None:
+        keys = [decode_link_code(str(link_code)) for link_code in selection["link_codes"]]
+        if None in keys:
+            raise ValueError("外链短码格式无效")
+        conditions.append(f"link_key IN ({', '.join('?' * len(keys))})" if keys else "0")
+        params.extend(keys)
+    for column in ("drive_id", "pool_id"):
+        if selection.get(column) not in (None, ""):
+            conditions.append(f"{column} = ?")
+            params.append(int(selection[column]))
+    if selection.get("provider_name"):
+        conditions.append("drive_id IN (SELECT id FROM user_drives WHERE provider_name = ?)")
+        params.append(selection["provider_name"])
+    status = selection.get("status")
+    if status:
+        now = int(time.time())
+        if status == "active":
+            conditions.append("(expiry_epoch IS NULL OR expiry_epoch > ?) AND used_quota < total_quota")
+            params.append(now)
+        elif status == "expired":
+            conditions.append("expiry_epoch <= ?")
+            params.append(now)
+        elif status == "exhausted":
+            conditions.append("used_quota >= total_quota")
+        else:
+            raise ValueError(f"未知的外链状态: {status}")
+    for key, operator in (("expiry_before", "<"), ("expiry_after", ">=")):
+        value = selection.get(key)
+        if value not in (None, ""):
+            epoch = int(value) if isinstance(value, (int, float)) or str(value).isdigit() else parse_expiry(value)
+            if not epoch:
+                raise ValueError(f"无效的过期时间: {value}")
+            conditions.append(f"expiry_epoch {operator} ?")
+            params.append(epoch)
+    if selection.get("remarks"):
+        conditions.append("remarks LIKE ? ESCAPE '\\'")
+        params.append(_like_pattern(selection["remarks"]))
+    return conditions, params
 
 
 class CloudDriveDatabase:
@@ -10,77 +167,21 @@ class CloudDriveDatabase:
     
     def __init__(self, db_path: str = "cloud_drive.db"):
         """
-        初始化数据库连接
-        
+        从连接池获取数据库连接
+
+        表结构由连接池在进程内首次创建时通过迁移完成，这里不再重复建表。
+        self.conn 为只读连接，所有写操作通过进程级写队列合并提交。
+
         参数:
             db_path: 数据库文件路径
         """
         self.db_path = db_path
-        self.conn = sqlite3.connect(db_path)
-        self.conn.row_factory = sqlite3.Row
+        self._pool = get_pool(db_path)
+        self._writer = get_writer(db_path)
+        self._link_cache = get_link_cache(db_path)
+        self.conn = self._pool.acquire()
         self.cursor = self.conn.cursor()
-        self._create_tables()
-        
-    def _create_tables(self):
-        """创建所需的数据库表并确保表结构是最新的"""
-        # 1. 网盘驱动表
-        self.cursor.execute('''
-        CREATE TABLE IF NOT EXISTS drive_providers (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            provider_name TEXT UNIQUE NOT NULL,
-            config_vars TEXT NOT NULL,
-            remarks TEXT
-        )
-        ''')
-        
-        # 2. 用户网盘表
-        self.cursor.execute('''
-        CREATE TABLE IF NOT EXISTS user_drives (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            provider_name TEXT NOT NULL,
-            login_config TEXT NOT NULL,
-            remarks TEXT,
-            FOREIGN KEY (provider_name) REFERENCES drive_providers (provider_name)
-        )
-        ''')
-        
-        # 3. 外链表
-        self.cursor.execute('''
-        CREATE TABLE IF NOT EXISTS external_links (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            drive_id INTEGER NOT NULL,
-            total_quota REAL NOT NULL,
-            used_quota REAL NOT NULL DEFAULT 0,
-            link_uuid TEXT UNIQUE NOT NULL,
-            remarks TEXT,
-            FOREIGN KEY (drive_id) REFERENCES user_drives (id)
-        )
-        ''')
-        
-        # 检查并添加expiry_time列到external_links表
-        self._add_column_if_not_exists('external_links', 'expiry_time', 'TEXT')
-        
-        self.conn.commit()
-    
-    def _add_column_if_not_exists(self, table_name: str, column_name: str, column_type: str):
-        """
-        检查表是否存在指定列，如果不存在则添加
         
-        参数:
-            table_name: 表名
-            column_name: 列名
-            column_type: 列类型
-        """
-        self.cursor.execute(f"PRAGMA table_info({table_name})")
-        columns = [column[1] for column in self.cursor.fetchall()]
-        if column_name not in columns:
-            try:
-                self.cursor.execute(f"ALTER TABLE {table_name} ADD COLUMN {column_name} {column_type}")
-                self.conn.commit()
-                print(f"已成功添加列 '{column_name}' 到表 '{table_name}'")
-            except sqlite3.OperationalError as e:
-                print(f"添加列 '{column_name}' 到表 '{table_name}' 时出错: {e}")
-    
     # 网盘驱动表操作
     def add_drive_provider(self, provider_name: str, config_vars: Dict[str, Any], remarks: Optional[str] = None) -> bool:
         """
@@ -94,12 +195,12 @@ class CloudDriveDatabase:
         返回:
             bool: 是否添加成功
         """
+        config_vars_json = json.dumps(config_vars, ensure_ascii=False)
         try:
-            self.cursor.execute(
+            self._writer.execute(lambda conn: conn.execute(
                 "INSERT INTO drive_providers (provider_name, config_vars, remarks) VALUES (?, ?, ?)",
-                (provider_name, json.dumps(config_vars, ensure_ascii=False), remarks)
-            )
-            self.conn.commit()
+                (provider_name, config_vars_json, remarks)
+            ))
             return True
         except sqlite3.IntegrityError:
             # 服务商名称已存在
@@ -113,15 +214,11 @@ class CloudDriveDatabase:
             provider_name: 服务商名称
             
         返回:
-            Dict: 服务商信息，不存在时返回None
+            Dict: 服务商信息，config_vars在首次访问时解析；不存在时返回None
         """
         self.cursor.execute("SELECT * FROM drive_providers WHERE provider_name = ?", (provider_name,))
         result = self.cursor.fetchone()
-        if result:
-            result_dict = dict(result)
-            result_dict['config_vars'] = json.loads(result_dict['config_vars'])
-            return result_dict
-        return None
+        return provider_row(result) if result else None
     
     def get_all_drive_providers(self) -> list:
         """
@@ -131,13 +228,7 @@ class CloudDriveDatabase:
             List: 所有服务商信息列表
         """
         self.cursor.execute("SELECT * FROM drive_providers")
-        results = self.cursor.fetchall()
-        providers = []
-        for row in results:
-            provider = dict(row)
-            provider['config_vars'] = json.loads(provider['config_vars'])
-            providers.append(provider)
-        return providers
+        return [provider_row(row) for row in self.cursor.fetchall()]
     
     def update_drive_provider(self, provider_name: str, config_vars: Dict[str, Any] = None, remarks: str = None) -> bool:
         """
@@ -151,27 +242,45 @@ class CloudDriveDatabase:
         返回:
             bool: 是否更新成功
         """
+        # 只写入变化的列，不读取当前行
+        columns = {}
+        if config_vars is not None:
+            columns['config_vars'] = json.dumps(config_vars, ensure_ascii=False)
+        if remarks is not None:
+            columns['remarks'] = remarks
+        if not columns:
+            return self.get_drive_provider(provider_name) is not None
+        
         try:
-            current = self.get_drive_provider(provider_name)
-            if not current:
-                return False
-                
-            if config_vars is not None:
-                config_vars_json = json.dumps(config_vars, ensure_ascii=False)
-            else:
-                config_vars_json = json.dumps(current['config_vars'], ensure_ascii=False)
-                
-            if remarks is None:
-                remarks = current['remarks']
-                
-            self.cursor.execute(
-                "UPDATE drive_providers SET config_vars = ?, remarks = ? WHERE provider_name = ?",
-                (config_vars_json, remarks, provider_name)
+            return self._writer.execute(
+                lambda conn: self._update_versioned(conn, "drive_providers", "provider_name", provider_name, columns)
             )
-            self.conn.commit()
-            return True
         except Exception:
             return False
+        finally:
+            invalidate_templates(provider_name=provider_name)
+    
+    @staticmethod
+    def _update_versioned(conn: sqlite3.Connection, table: str, key_column: str, key: Any,
+                          columns: Dict[str, Any]) -> bool:
+        """
+        只更新指定的列并递增行版本号，在写线程中调用
+        
+        参数:
+            conn: 写连接
+            table: 表名
+            key_column: 定位行的列
+            key: 定位行的值
+            columns: 列名 -> 新值
+            
+        返回:
+            bool: 行是否存在并已更新
+        """
+        assignments = ", ".join(f"{column} = ?" for column in columns)
+        return conn.execute(
+            f"UPDATE {table} SET {assignments}, version = version + 1 WHERE {key_column} = ?",
+            list(columns.values()) + [key]
+        ).rowcount > 0
     
     def delete_drive_provider(self, provider_name: str) -> bool:
         """
@@ -184,9 +293,9 @@ class CloudDriveDatabase:
             bool: 是否删除成功
         """
         try:
-            self.cursor.execute("DELETE FROM drive_providers WHERE provider_name = ?", (provider_name,))
-            self.conn.commit()
-            return self.cursor.rowcount > 0
+            return self._writer.execute(lambda conn: conn.execute(
+                "DELETE FROM drive_providers WHERE provider_name = ?", (provider_name,)
+            ).rowcount > 0)
         except Exception:
             return False
     
@@ -203,19 +312,25 @@ class CloudDriveDatabase:
         返回:
             int: 新添加的用户网盘ID，失败时返回None
         """
-        try:
+        login_config_json = json.dumps(login_config, ensure_ascii=False)
+        
+        def insert(conn):
             # 检查服务商是否存在
-            if not self.get_drive_provider(provider_name):
+            if not conn.execute("SELECT 1 FROM drive_providers WHERE provider_name = ?", (provider_name,)).fetchone():
                 return None
                 
-            self.cursor.execute(
+            return conn.execute(
                 "INSERT INTO user_drives (provider_name, login_config, remarks) VALUES (?, ?, ?)",
-                (provider_name, json.dumps(login_config, ensure_ascii=False), remarks)
-            )
-            self.conn.commit()
-            return self.cursor.lastrowid
+                (provider_name, login_config_json, remarks)
+            ).lastrowid
+        
+        try:
+            drive_id = self._writer.execute(insert)
         except Exception:
             return None
+        if drive_id:
+            self._count_changes(user_drives_count=1)
+        return drive_id
     
     def get_user_drive(self, drive_id: int) -> Optional[Dict[str, Any]]:
         """
@@ -229,11 +344,7 @@ class CloudDriveDatabase:
         """
         self.cursor.execute("SELECT * FROM user_drives WHERE id = ?", (drive_id,))
         result = self.cursor.fetchone()
-        if result:
-            result_dict = dict(result)
-            result_dict['login_config'] = json.loads(result_dict['login_config'])
-            return result_dict
-        return None
+        return drive_row(result) if result else None
     
     def get_user_drives_by_provider(self, provider_name: str) -> list:
         """
@@ -246,13 +357,7 @@ class CloudDriveDatabase:
             List: 用户网盘信息列表
         """
         self.cursor.execute("SELECT * FROM user_drives WHERE provider_name = ?", (provider_name,))
-        results = self.cursor.fetchall()
-        drives = []
-        for row in results:
-            drive = dict(row)
-            drive['login_config'] = json.loads(drive['login_config'])
-            drives.append(drive)
-        return drives
+        return [drive_row(row) for row in self.cursor.fetchall()]
     
     def get_all_user_drives(self) -> list:
         """
@@ -262,13 +367,73 @@ class CloudDriveDatabase:
             List: 所有用户网盘信息列表
         """
         self.cursor.execute("SELECT * FROM user_drives")
-        results = self.cursor.fetchall()
-        drives = []
-        for row in results:
-            drive = dict(row)
-            drive['login_config'] = json.loads(drive['login_config'])
-            drives.append(drive)
-        return drives
+        return [drive_row(row) for row in self.cursor.fetchall()]
+    
+    def list_user_drives(self, cursor: Optional[int] = None, limit: int = 50, provider_name: Optional[str] = None,
+                         remarks: Optional[str] = None, fields: Optional[List[str]] = None) -> Tuple[list, Optional[int]]:
+        """
+        按ID倒序分页查询用户网盘
+        
+        使用上一页最后一条的ID作为游标，翻页代价与页码无关。
+        只有fields中包含login_config时才读取并解析登录配置。
+        
+        参数:
+            cursor: 上一页返回的游标，None表示第一页
+            limit: 每页条数
+            provider_name: 只查询指定服务商，可选
+            remarks: 备注包含的文字，可选
+            fields: 返回的字段，默认为除login_config外的全部字段
+            
+        返回:
+            Tuple: (用户网盘列表, 下一页游标)，没有下一页时游标为None
+        """
+        columns = _project(fields, DRIVE_FIELDS, ("id", "provider_name", "remarks"))
+        if "login_config" in columns and "version" not in columns:
+            # 解析结果按版本号缓存
+            columns.append("version")
+        conditions, params = [], []
+        if provider_name:
+            conditions.append("provider_name = ?")
+            params.append(provider_name)
+        if remarks:
+            conditions.append("remarks LIKE ? ESCAPE '\\'")
+            params.append(_like_pattern(remarks))
+        rows, next_cursor = self._fetch_page("user_drives", columns, conditions, params, cursor, limit)
+        if "login_config" in columns:
+            rows = [drive_row(row) for row in rows]
+        return rows, next_cursor
+    
+    def _fetch_page(self, table: str, columns: List[str], conditions: List[str], params: list,
+                    cursor: Optional[int], limit: int) -> Tuple[list, Optional[int]]:
+        """
+        执行按ID倒序的键集分页查询
+        
+        参数:
+            table: 表名
+            columns: 查询的列，需包含id
+            conditions: WHERE条件
+            params: 条件参数
+            cursor: 上一页最后一条的ID
+            limit: 每页条数
+            
+        返回:
+            Tuple: (结果列表, 下一页游标)
+        """
+        limit = max(1, min(int(limit), MAX_PAGE_SIZE))
+        if cursor is not None:
+            conditions = conditions + ["id < ?"]
+            params = params + [int(cursor)]
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+        # 多取一条判断是否还有下一页
+        self.cursor.execute(
+            f"SELECT {select_list(columns)} FROM {table} {where} ORDER BY id DESC LIMIT ?",
+            params + [limit + 1]
+        )
+        rows = [dict(row) for row in self.cursor.fetchall()]
+        if len(rows) > limit:
+            rows = rows[:limit]
+            return rows, rows[-1]['id']
+        return rows, None
     
     def update_user_drive(self, drive_id: int, login_config: Dict[str, Any] = None, remarks: str = None) -> bool:
         """
@@ -282,27 +447,22 @@ class CloudDriveDatabase:
         返回:
             bool: 是否更新成功
         """
+        columns = {}
+        if login_config is not None:
+            columns['login_config'] = json.dumps(login_config, ensure_ascii=False)
+        if remarks is not None:
+            columns['remarks'] = remarks
+        if not columns:
+            return self.get_user_drive(drive_id) is not None
+        
         try:
-            current = self.get_user_drive(drive_id)
-            if not current:
-                return False
-                
-            if login_config is not None:
-                login_config_json = json.dumps(login_config, ensure_ascii=False)
-            else:
-                login_config_json = json.dumps(current['login_config'], ensure_ascii=False)
-                
-            if remarks is None:
-                remarks = current['remarks']
-                
-            self.cursor.execute(
-                "UPDATE user_drives SET login_config = ?, remarks = ? WHERE id = ?",
-                (login_config_json, remarks, drive_id)
+            return self._writer.execute(
+                lambda conn: self._update_versioned(conn, "user_drives", "id", drive_id, columns)
             )
-            self.conn.commit()
-            return True
         except Exception:
             return False
+        finally:
+            self._invalidate_drive(drive_id)
     
     def delete_user_drive(self, drive_id: int) -> bool:
         """
@@ -315,49 +475,362 @@ class CloudDriveDatabase:
             bool: 是否删除成功
         """
         try:
-            self.cursor.execute("DELETE FROM user_drives WHERE id = ?", (drive_id,))
-            self.conn.commit()
-            return self.cursor.rowcount > 0
+            def delete(conn):
+                # 同时移出所在的账号池
+                conn.execute("DELETE FROM drive_pool_members WHERE drive_id = ?", (drive_id,))
+                return conn.execute("DELETE FROM user_drives WHERE id = ?", (drive_id,)).rowcount > 0
+            
+            deleted = self._writer.execute(delete)
+            if deleted:
+                self._count_changes(user_drives_count=-1)
+            return deleted
+        except Exception:
+            return False
+        finally:
+            self._invalidate_drive(drive_id)
+    
+    def _count_changes(self, **deltas: int):
+        """
+        写操作提交后更新仪表盘计数，计数器未创建（没有打开过仪表盘）时忽略
+        
+        参数:
+            deltas: 计数名 -> 变化量；不传时表示无法确定变化量，由计数器重新统计
+        """
+        counters = loaded_dashboard_counters(self.db_path)
+        if counters is None:
+            return
+        if deltas:
+            counters.add(**deltas)
+        else:
+            counters.refresh()
+    
+    def _invalidate_drive(self, drive_id: int):
+        """
+        使引用指定网盘的外链解析缓存失效，包括该网盘所在账号池的外链
+        
+        参数:
+            drive_id: 网盘ID
+        """
+        # 前端传入的ID可能是字符串，统一按字符串比较
+        invalidate_templates(drive_id=drive_id)
+        drive_id = str(drive_id)
+        self._link_cache.invalidate_where(
+            lambda _, value: str(value[0].get('drive_id')) == drive_id
+            or any(str(drive['id']) == drive_id for drive in value[1])
+        )
+    
+    # 账号池表操作
+    def add_drive_pool(self, pool_name: str, provider_name: str, drive_ids: List[int],
+                       strategy: str = "round_robin", remarks: Optional[str] = None) -> Optional[int]:
+        """
+        添加网盘账号池
+        
+        参数:
+            pool_name: 账号池名称
+            provider_name: 服务商名称，池中账号必须属于该服务商
+            drive_ids: 池中的网盘ID列表
+            strategy: 账号选择策略，round_robin、least_in_flight 或 latency_weighted
+            remarks: 备注说明
+            
+        返回:
+            int: 新添加的账号池ID，失败时返回None
+        """
+        if strategy not in STRATEGIES:
+            return None
+        
+        def insert(conn):
+            members = sorted({int(drive_id) for drive_id in drive_ids})
+            if not self._check_pool_members(conn, provider_name, members):
+                return None
+            pool_id = conn.execute(
+                "INSERT INTO drive_pools (pool_name, provider_name, strategy, remarks) VALUES (?, ?, ?, ?)",
+                (pool_name, provider_name, strategy, remarks)
+            ).lastrowid
+            conn.executemany(
+                "INSERT INTO drive_pool_members (pool_id, drive_id) VALUES (?, ?)",
+                [(pool_id, drive_id) for drive_id in members]
+            )
+            return pool_id
+        
+        try:
+            return self._writer.execute(insert)
         except Exception:
+            return None
+    
+    @staticmethod
+    def _check_pool_members(conn: sqlite3.Connection, provider_name: str, drive_ids: List[int]) -> bool:
+        """检查账号池成员非空、全部存在且属于同一服务商"""
+        if not drive_ids:
             return False
+        placeholders = ",".join("?" * len(drive_ids))
+        count = conn.execute(
+            f"SELECT COUNT(*) FROM user_drives WHERE provider_name = ? AND id IN ({placeholders})",
+            (provider_name, *drive_ids)
+        ).fetchone()[0]
+        return count == len(drive_ids)
+    
+    def get_drive_pool(self, pool_id: int) -> Optional[Dict[str, Any]]:
+        """
+        获取账号池信息
+        
+        参数:
+            pool_id: 账号池ID
+            
+        返回:
+            Dict: 账号池信息，drive_ids为成员网盘ID列表；不存在时返回None
+        """
+        self.cursor.execute("SELECT * FROM drive_pools WHERE id = ?", (pool_id,))
+        result = self.cursor.fetchone()
+        if not result:
+            return None
+        pool = dict(result)
+        self.cursor.execute("SELECT drive_id FROM drive_pool_members WHERE pool_id = ? ORDER BY drive_id", (pool_id,))
+        pool['drive_ids'] = [row[0] for row in self.cursor.fetchall()]
+        return pool
+    
+    def get_all_drive_pools(self) -> list:
+        """
+        获取所有账号池
+        
+        返回:
+            List: 账号池信息列表
+        """
+        self.cursor.execute("SELECT * FROM drive_pools")
+        pools = {row['id']: dict(row, drive_ids=[]) for row in self.cursor.fetchall()}
+        self.cursor.execute("SELECT pool_id, drive_id FROM drive_pool_members ORDER BY drive_id")
+        for pool_id, drive_id in self.cursor.fetchall():
+            if pool_id in pools:
+                pools[pool_id]['drive_ids'].append(drive_id)
+        return list(pools.values())
+    
+    def get_pool_drives(self, pool_id: int) -> list:
+        """
+        获取账号池中的所有用户网盘
+        
+        参数:
+            pool_id: 账号池ID
+            
+        返回:
+            List: 用户网盘信息列表
+        """
+        self.cursor.execute(
+            "SELECT d.* FROM drive_pool_members m JOIN user_drives d ON d.id = m.drive_id WHERE m.pool_id = ? ORDER BY d.id",
+            (pool_id,)
+        )
+        return [drive_row(row) for row in self.cursor.fetchall()]
+    
+    def update_drive_pool(self, pool_id: int, drive_ids: List[int] = None, strategy: str = None, remarks: str = None) -> bool:
+        """
+        更新账号池信息
+        
+        参数:
+            pool_id: 账号池ID
+            drive_ids: 成员网盘ID列表，可选，指定时整体替换
+            strategy: 账号选择策略，可选
+            remarks: 备注说明，可选
+            
+        返回:
+            bool: 是否更新成功
+        """
+        if strategy is not None and strategy not in STRATEGIES:
+            return False
+        
+        def update(conn):
+            current = conn.execute("SELECT * FROM drive_pools WHERE id = ?", (pool_id,)).fetchone()
+            if not current:
+                return False
+            
+            if drive_ids is not None:
+                members = sorted({int(drive_id) for drive_id in drive_ids})
+                if not self._check_pool_members(conn, current['provider_name'], members):
+                    return False
+                conn.execute("DELETE FROM drive_pool_members WHERE pool_id = ?", (pool_id,))
+                conn.executemany(
+                    "INSERT INTO drive_pool_members (pool_id, drive_id) VALUES (?, ?)",
+                    [(pool_id, drive_id) for drive_id in members]
+                )
+            
+            conn.execute(
+                "UPDATE drive_pools SET strategy = ?, remarks = ? WHERE id = ?",
+                (current['strategy'] if strategy is None else strategy,
+                 current['remarks'] if remarks is None else remarks, pool_id)
+            )
+            return True
+        
+        try:
+            return self._writer.execute(update)
+        except Exception:
+            return False
+        finally:
+            self._invalidate_pool(pool_id)
+    
+    def delete_drive_pool(self, pool_id: int) -> bool:
+        """
+        删除账号池
+        
+        参数:
+            pool_id: 账号池ID
+            
+        返回:
+            bool: 是否删除成功
+        """
+        def delete(conn):
+            conn.execute("DELETE FROM drive_pool_members WHERE pool_id = ?", (pool_id,))
+            return conn.execute("DELETE FROM drive_pools WHERE id = ?", (pool_id,)).rowcount > 0
+        
+        try:
+            return self._writer.execute(delete)
+        except Exception:
+            return False
+        finally:
+            self._invalidate_pool(pool_id)
+    
+    def _invalidate_pool(self, pool_id: int):
+        """
+        使绑定指定账号池的外链解析缓存失效
+        
+        参数:
+            pool_id: 账号池ID
+        """
+        pool_id = str(pool_id)
+        self._link_cache.invalidate_where(lambda _, value: str(value[0].get('pool_id')) == pool_id)
     
     # 外链表操作
-    def create_external_link(self, drive_id: int, total_quota: float, remarks: Optional[str] = None, expiry_time: str = None) -> Optional[str]:
+    def create_external_link(self, drive_id: int, total_quota: int, remarks: Optional[str] = None, expiry_time: str = None,
+                             pool_id: Optional[int] = None) -> Optional[str]:
         """
         创建外链
         
         参数:
-            drive_id: 网盘ID
+            drive_id: 网盘ID，指定pool_id时可为None
             total_quota: 总配额（使用次数）
             remarks: 备注说明
-            expiry_time: 过期时间，格式为ISO 8601
+            expiry_time: 过期时间，格式为ISO 8601，不带时区时按UTC处理
+            pool_id: 账号池ID，指定时外链登录从池中选择账号
             
         返回:
-            str: 外链UUID，失败时返回None
+            str: 外链短码，失败或过期时间无效时返回None
         """
-        try:
+        # 如果没有指定到期时间，默认为24小时后
+        if expiry_time:
+            expiry_epoch = parse_expiry(expiry_time)
+            if not expiry_epoch:
+                return None
+        else:
+            expiry_epoch = int(time.time()) + 24 * 3600
+        # 统一保存为UTC时间
+        expiry_time = format_expiry(expiry_epoch)
+        
+        def insert(conn):
+            link_drive_id = drive_id
+            if pool_id is not None:
+                # 绑定账号池的外链以池中首个账号作为drive_id
+                row = conn.execute(
+                    "SELECT drive_id FROM drive_pool_members WHERE pool_id = ? ORDER BY drive_id LIMIT 1", (pool_id,)
+                ).fetchone()
+                if not row:
+                    return None
+                link_drive_id = row[0]
             # 检查用户网盘是否存在
-            if not self.get_user_drive(drive_id):
+            elif not conn.execute("SELECT 1 FROM user_drives WHERE id = ?", (drive_id,)).fetchone():
                 return None
                 
-            # 生成不重复的UUID
-            link_uuid = str(uuid.uuid4())
-            while self.get_external_link_by_uuid(link_uuid):
-                link_uuid = str(uuid.uuid4())
-            
-            # 如果没有指定到期时间，默认为24小时后
-            if not expiry_time:
-                expiry_time = (datetime.now() + timedelta(hours=24)).isoformat()
+            # 生成不重复的外链标识
+            link_key = new_link_key()
+            while conn.execute("SELECT 1 FROM external_links WHERE link_key = ?", (link_key,)).fetchone():
+                link_key = new_link_key()
                 
-            self.cursor.execute(
-                "INSERT INTO external_links (drive_id, total_quota, used_quota, link_uuid, remarks, expiry_time) VALUES (?, ?, 0, ?, ?, ?)",
-                (drive_id, total_quota, link_uuid, remarks, expiry_time)
-            )
-            self.conn.commit()
-            return link_uuid
+            link_id = conn.execute(
+                "INSERT INTO external_links (drive_id, total_quota, used_quota, link_key, remarks, expiry_time, expiry_epoch, pool_id) VALUES (?, ?, 0, ?, ?, ?, ?, ?)",
+                (link_drive_id, int(total_quota), link_key, remarks, expiry_time, expiry_epoch, pool_id)
+            ).lastrowid
+            return link_id, encode_link_key(link_key)
+        
+        try:
+            created = self._writer.execute(insert)
+            if not created:
+                return None
+            link_id, link_code = created
+            link_filter = loaded_link_filter(self.db_path)
+            if link_filter:
+                link_filter.add(link_code, link_id)
+            active = int(total_quota) > 0 and expiry_epoch > time.time()
+            self._count_changes(total_links_count=1, active_links_count=int(active))
+            return link_code
         except Exception as e:
-            print(f"创建外链错误: {e}")
+            logger.error("创建外链错误: %s", e)
+            return None
+    
+    def create_external_links_bulk(self, count: int, drive_id: Optional[int], total_quota: int,
+                                   remarks: Optional[str] = None, expiry_time: str = None,
+                                   pool_id: Optional[int] = None) -> Optional[List[Tuple[int, str]]]:
+        """
+        在一个事务中批量创建外链
+        
+        网盘或账号池只校验一次，外链标识在内存中生成后在同一事务中逐行插入（语句只编译一次），
+        由link_key的唯一约束保证不重复，极少数冲突时整批重新生成。
+        
+        参数:
+            count: 创建数量
+            drive_id: 网盘ID，指定pool_id时可为None
+            total_quota: 每个外链的总配额
+            remarks: 备注说明
+            expiry_time: 过期时间，格式为ISO 8601，不指定时为24小时后
+            pool_id: 账号池ID，可选
+            
+        返回:
+            List: [(外链ID, 外链短码)]，网盘不存在或过期时间无效时返回None
+        """
+        if expiry_time:
+            expiry_epoch = parse_expiry(expiry_time)
+            if not expiry_epoch:
+                return None
+        else:
+            expiry_epoch = int(time.time()) + 24 * 3600
+        expiry_time = format_expiry(expiry_epoch)
+        
+        def insert(conn):
+            link_drive_id = drive_id
+            if pool_id is not None:
+                row = conn.execute(
+                    "SELECT drive_id FROM drive_pool_members WHERE pool_id = ? ORDER BY drive_id LIMIT 1", (pool_id,)
+                ).fetchone()
+                if not row:
+                    return None
+                link_drive_id = row[0]
+            elif not conn.execute("SELECT 1 FROM user_drives WHERE id = ?", (drive_id,)).fetchone():
+                return None
+            
+            # 自增ID不保证连续，逐行取 lastrowid
+            created = []
+            for _ in range(count):
+                link_key = new_link_key()
+                cursor = conn.execute(
+                    "INSERT INTO external_links (drive_id, total_quota, used_quota, link_key, remarks, expiry_time, expiry_epoch, pool_id) VALUES (?, ?, 0, ?, ?, ?, ?, ?)",
+                    (link_drive_id, int(total_quota), link_key, remarks, expiry_time, expiry_epoch, pool_id)
+                )
+                created.append((cursor.lastrowid, encode_link_key(link_key)))
+            return created
+        
+        for _ in range(3):
+            try:
+                created = self._writer.execute(insert)
+                break
+            except sqlite3.IntegrityError as e:
+                logger.warning("批量创建外链标识冲突，重新生成: %s", e)
+            except Exception as e:
+                logger.error("批量创建外链错误: %s", e)
+                return None
+        else:
             return None
+        
+        if created:
+            link_filter = loaded_link_filter(self.db_path)
+            if link_filter:
+                link_filter.add_many([(link_code, link_id) for link_id, link_code in created])
+            active = int(total_quota) > 0 and expiry_epoch > time.time()
+            self._count_changes(total_links_count=len(created), active_links_count=len(created) if active else 0)
+        return created
     
     def get_external_link(self, link_id: int) -> Optional[Dict[str, Any]]:
         """
@@ -369,28 +842,207 @@ class CloudDriveDatabase:
         返回:
             Dict: 外链信息，不存在时返回None
         """
-        self.cursor.execute("SELECT * FROM external_links WHERE id = ?", (link_id,))
+        self.cursor.execute(f"SELECT {LINK_SELECT} FROM external_links WHERE id = ?", (link_id,))
         result = self.cursor.fetchone()
         if result:
             return dict(result)
         return None
     
-    def get_external_link_by_uuid(self, link_uuid: str) -> Optional[Dict[str, Any]]:
+    def get_external_link_by_code(self, link_code: str) -> Optional[Dict[str, Any]]:
         """
-        通过UUID获取外链信息
+        通过短码获取外链信息
         
         参数:
-            link_uuid: 外链UUID
+            link_code: 外链短码，也可以是旧版UUID
             
         返回:
-            Dict: 外链信息，不存在时返回None
+            Dict: 外链信息，不存在或短码格式无效时返回None
         """
-        self.cursor.execute("SELECT * FROM external_links WHERE link_uuid = ?", (link_uuid,))
+        link_key = decode_link_code(link_code)
+        if link_key is None:
+            return None
+        self.cursor.execute(f"SELECT {LINK_SELECT} FROM external_links WHERE link_key = ?", (link_key,))
         result = self.cursor.fetchone()
         if result:
             return dict(result)
         return None
     
+    def get_resolved_link(self, link_code: str) -> Optional[Tuple[Dict[str, Any], List[Dict[str, Any]]]]:
+        """
+        获取外链及其可用于登录的网盘信息，优先读取进程内缓存
+        
+        绑定账号池的外链返回池中全部账号，外链信息中附带账号池的选择策略pool_strategy；
+        普通外链返回其关联的单个网盘。返回的对象在缓存中共享，调用方不应修改。
+        
+        参数:
+            link_code: 外链短码
+            
+        返回:
+            Tuple: (外链信息, 候选网盘列表)，网盘不存在时列表为空；外链不存在时返回None
+        """
+        resolved = self._link_cache.get(link_code)
+        if resolved is not None:
+            return resolved
+        
+        # 读取期间外链被修改并失效时不回填，以免把旧数据写回缓存
+        generation = self._link_cache.generation(link_code)
+        link_info = self.get_external_link_by_code(link_code)
+        if not link_info:
+            return None
+        pool = self.get_drive_pool(link_info['pool_id']) if link_info.get('pool_id') else None
+        if pool:
+            link_info['pool_strategy'] = pool['strategy']
+            drives = self.get_pool_drives(pool['id'])
+        else:
+            drive = self.get_user_drive(link_info['drive_id'])
+            drives = [drive] if drive else []
+        resolved = (link_info, drives)
+        self._link_cache.set(link_code, resolved, generation)
+        return resolved
+    
+    def list_external_links(self, cursor: Optional[int] = None, limit: int = 50, drive_id: Optional[int] = None,
+                            provider_name: Optional[str] = None, status: Optional[str] = None,
+                            remarks: Optional[str] = None, fields: Optional[List[str]] = None) -> Tuple[list, Optional[int]]:
+        """
+        按ID倒序分页查询外链
+        
+        参数:
+            cursor: 上一页返回的游标，None表示第一页
+            limit: 每页条数
+            drive_id: 只查询指定网盘的外链，可选
+            provider_name: 只查询指定服务商的外链，可选
+            status: active（可用）、expired（已过期）或 exhausted（次数用尽），可选
+            remarks: 备注包含的文字，可选
+            fields: 返回的字段，默认为全部字段
+            
+        返回:
+            Tuple: (外链列表, 下一页游标)，没有下一页时游标为None
+        """
+        columns = _project(fields, LINK_FIELDS, LINK_FIELDS)
+        conditions, params = _link_conditions({
+            "drive_id": drive_id, "provider_name": provider_name, "status": status, "remarks": remarks,
+        })
+        return self._fetch_page("external_links", columns, conditions, params, cursor, limit)
+    
+    def bulk_update_links(self, action: str, selection: Dict[str, Any], values: Dict[str, Any],
+                          dry_run: bool = False) -> Dict[str, int]:
+        """
+        按筛选条件批量修改外链，在一个事务中以单条UPDATE/DELETE完成
+        
+        筛选条件为空时拒绝执行，避免误操作整张表。
+        
+        参数:
+            action: extend_expiry（延长过期时间）、set_quota（设置总配额）或 delete（删除）
+            selection: 筛选条件，见 _link_conditions
+            values: 操作参数
+                extend_expiry: extend_seconds（延长的秒数）或 expiry_time（新的过期时间）
+                set_quota: total_quota（新的总配额，已用次数超过它的外链跳过），reset_used（是否清零已用次数）
+            dry_run: 为True时只统计数量，不修改数据
+            
+        返回:
+            Dict: matched（匹配的外链数）、affected（将被/已被修改的外链数）
+            
+        异常:
+            ValueError: 操作、筛选条件或参数无效
+        """
+        conditions, params = _link_conditions(selection)
+        if not conditions:
+            raise ValueError("缺少筛选条件")
+        where = " AND ".join(conditions)
+        now = int(time.time())
+        
+        # 每种操作的额外条件和执行语句
+        if action == "extend_expiry":
+            if values.get("expiry_time"):
+                expiry_epoch = parse_expiry(values["expiry_time"])
+                if not expiry_epoch:
+                    raise ValueError("过期时间格式无效")
+                expression, expression_params = "?", [expiry_epoch]
+                extra, extra_params = "1", []
+            else:
+                seconds = int(values.get("extend_seconds") or 0)
+                if seconds <= 0:
+                    raise ValueError("extend_seconds需大于0")
+                expression, expression_params = "expiry_epoch + ?", [seconds]
+                # 永不过期的外链保持不变
+                extra, extra_params = "expiry_epoch IS NOT NULL", []
+            # SET中引用的列都是修改前的值，两列都由同一表达式计算
+            statement = (
+                f"UPDATE external_links SET expiry_epoch = {expression}, "
+                f"expiry_time = strftime('%Y-%m-%dT%H:%M:%SZ', {expression}, 'unixepoch') "
+                f"WHERE {where} AND {extra}"
+            )
+            statement_params = expression_params * 2 + params + extra_params
+        elif action == "set_quota":
+            total_quota = int(values["total_quota"])
+            if total_quota <= 0:
+                raise ValueError("total_quota需大于0")
+            if values.get("reset_used"):
+                used = "0"
+                extra, extra_params = "1", []
+            else:
+                # 总配额不能小于已使用次数
+                used = "used_quota"
+                extra, extra_params = "used_quota <= ?", [total_quota]
+            statement = (
+                f"UPDATE external_links SET total_quota = ?, used_quota = {used}, "
+                f"exhausted_at = CASE WHEN {used} >= ? THEN COALESCE(exhausted_at, ?) END "
+                f"WHERE {where} AND {extra}"
+            )
+            statement_params = [total_quota, total_quota, now] + params + extra_params
+        elif action == "delete":
+            extra, extra_params = "1", []
+            statement = f"DELETE FROM external_links WHERE {where}"
+            statement_params = params
+        else:
+            raise ValueError(f"未知的批量操作: {action}")
+        
+        if dry_run:
+            self.cursor.execute(
+                f"SELECT COUNT(*), COALESCE(SUM({extra}), 0) FROM external_links WHERE {where}",
+                extra_params + params
+            )
+            matched, affected = self.cursor.fetchone()
+            return {"matched": matched, "affected": affected}
+        
+        def mutate(conn):
+            matched = conn.execute(f"SELECT COUNT(*) FROM external_links WHERE {where}", params).fetchone()[0]
+            # 先取出受影响外链的短码用于清理缓存，写线程串行执行，两条语句之间数据不会变化
+            affected = conn.execute(
+                f"SELECT link_code(link_key) FROM external_links WHERE {where} AND {extra}", params + extra_params
+            ).fetchall()
+            conn.execute(statement, statement_params)
+            return matched, [row[0] for row in affected]
+        
+        matched, link_codes = self._writer.execute(mutate)
+        
+        link_filter = loaded_link_filter(self.db_path) if action == "delete" else None
+        if len(link_codes) > self._link_cache.maxsize:
+            # 受影响的外链比缓存容量还多时直接清空缓存
+            self._link_cache.clear()
+        else:
+            for link_code in link_codes:
+                self._link_cache.invalidate(link_code)
+        if link_filter:
+            for link_code in link_codes:
+                link_filter.remove(link_code)
+        if link_codes:
+            self._count_changes()
+        return {"matched": matched, "affected": len(link_codes)}
+    
+    def get_external_links_by_pool(self, pool_id: int) -> list:
+        """
+        获取绑定指定账号池的所有外链
+        
+        参数:
+            pool_id: 账号池ID
+            
+        返回:
+            List: 外链信息列表
+        """
+        self.cursor.execute(f"SELECT {LINK_SELECT} FROM external_links WHERE pool_id = ?", (pool_id,))
+        return [dict(row) for row in self.cursor.fetchall()]
+    
     def get_external_links_by_drive(self, drive_id: int) -> list:
         """
         获取指定用户网盘的所有外链
@@ -401,90 +1053,314 @@ class CloudDriveDatabase:
         返回:
             List: 外链信息列表
         """
-        self.cursor.execute("SELECT * FROM external_links WHERE drive_id = ?", (drive_id,))
+        self.cursor.execute(f"SELECT {LINK_SELECT} FROM external_links WHERE drive_id = ?", (drive_id,))
         return [dict(row) for row in self.cursor.fetchall()]
     
-    def update_external_link_quota(self, link_uuid: str, used_quota: float) -> bool:
+    def update_external_link_quota(self, link_code: str, used_quota: int) -> bool:
         """
         更新外链已使用配额
         
         参数:
-            link_uuid: 外链UUID
+            link_code: 外链短码
             used_quota: 已使用配额
             
         返回:
             bool: 是否更新成功
         """
         try:
-            link = self.get_external_link_by_uuid(link_uuid)
-            if not link:
-                return False
-                
             # 确保不超过总配额
-            if used_quota > link['total_quota']:
+            updated = self._writer.execute(lambda conn: conn.execute(
+                "UPDATE external_links SET used_quota = ?, "
+                "exhausted_at = CASE WHEN total_quota <= ? THEN COALESCE(exhausted_at, ?) END "
+                "WHERE link_key = ? AND total_quota >= ?",
+                (used_quota, used_quota, int(time.time()), decode_link_code(link_code), used_quota)
+            ).rowcount > 0)
+            if updated:
+                self._count_changes()
+            return updated
+        except Exception:
+            return False
+        finally:
+            self._link_cache.invalidate(link_code)
+    
+    def consume_quota(self, link_code: str) -> Optional["QuotaReservation"]:
+        """
+        预占外链的一次使用配额
+        
+        使用单条条件UPDATE原子地扣减，并发请求不会超出总配额，已过期的外链不会扣减。
+        调用方在上游登录成功后调用 commit()，失败时调用 release() 归还配额；
+        作为上下文管理器使用时，未确认的预占在退出时自动归还。
+        
+        参数:
+            link_code: 外链短码
+            
+        返回:
+            QuotaReservation: 预占凭据，配额已用完、外链已过期或不存在时返回None
+        """
+        try:
+            now = int(time.time())
+            # 用掉最后一次配额时记录用尽时间，供归档任务判断保留期
+            # 返回本次预占是否用尽了配额，用于更新有效外链数
+            reserved = self._writer.execute(lambda conn: conn.execute(
+                "UPDATE external_links SET used_quota = used_quota + 1, "
+                "exhausted_at = CASE WHEN used_quota + 1 >= total_quota THEN ? END "
+                "WHERE link_key = ? AND used_quota < total_quota AND (expiry_epoch IS NULL OR expiry_epoch > ?) "
+                "RETURNING used_quota >= total_quota",
+                (now, decode_link_code(link_code), now)
+            ).fetchall())
+        except Exception as e:
+            logger.error("预占外链配额错误: %s", e)
+            return None
+        finally:
+            self._link_cache.invalidate(link_code)
+        if not reserved:
+            return None
+        if reserved[0][0]:
+            self._count_changes(active_links_count=-1)
+        return QuotaReservation(self, link_code)
+    
+    def release_quota(self, link_code: str) -> bool:
+        """
+        归还一次已预占的外链配额
+        
+        参数:
+            link_code: 外链短码
+            
+        返回:
+            bool: 是否归还成功
+        """
+        try:
+            now = int(time.time())
+            # 返回归还后外链是否从用尽恢复为有效
+            released = self._writer.execute(lambda conn: conn.execute(
+                "UPDATE external_links SET used_quota = used_quota - 1, "
+                "exhausted_at = CASE WHEN used_quota - 1 >= total_quota THEN exhausted_at END "
+                "WHERE link_key = ? AND used_quota > 0 "
+                "RETURNING used_quota + 1 = total_quota AND (expiry_epoch IS NULL OR expiry_epoch > ?)",
+                (decode_link_code(link_code), now)
+            ).fetchall())
+            if not released:
                 return False
-                
-            self.cursor.execute(
-                "UPDATE external_links SET used_quota = ? WHERE link_uuid = ?",
-                (used_quota, link_uuid)
-            )
-            self.conn.commit()
+            if released[0][0]:
+                self._count_changes(active_links_count=1)
             return True
-        except Exception:
+        except Exception as e:
+            logger.error("归还外链配额错误: %s", e)
             return False
+        finally:
+            self._link_cache.invalidate(link_code)
     
-    def update_external_link(self, link_uuid: str, total_quota: float = None, remarks: str = None) -> bool:
+    def update_external_link(self, link_code: str, total_quota: int = None, remarks: str = None) -> bool:
         """
         更新外链信息
         
         参数:
-            link_uuid: 外链UUID
+            link_code: 外链短码
             total_quota: 总配额，可选
             remarks: 备注说明，可选
             
         返回:
             bool: 是否更新成功
         """
-        try:
-            link = self.get_external_link_by_uuid(link_uuid)
+        link_key = decode_link_code(link_code)
+        
+        def update(conn):
+            link = conn.execute(
+                "SELECT total_quota, used_quota, remarks FROM external_links WHERE link_key = ?", (link_key,)
+            ).fetchone()
             if not link:
                 return False
                 
-            if total_quota is None:
-                total_quota = link['total_quota']
-                
-            if remarks is None:
-                remarks = link['remarks']
+            new_total_quota = link['total_quota'] if total_quota is None else total_quota
+            new_remarks = link['remarks'] if remarks is None else remarks
                 
             # 确保新的总配额不小于已使用配额
-            if total_quota < link['used_quota']:
+            if new_total_quota < link['used_quota']:
                 return False
                 
-            self.cursor.execute(
-                "UPDATE external_links SET total_quota = ?, remarks = ? WHERE link_uuid = ?",
-                (total_quota, remarks, link_uuid)
+            conn.execute(
+                "UPDATE external_links SET total_quota = ?, remarks = ?, "
+                "exhausted_at = CASE WHEN used_quota >= ? THEN COALESCE(exhausted_at, ?) END WHERE link_key = ?",
+                (new_total_quota, new_remarks, new_total_quota, int(time.time()), link_key)
             )
-            self.conn.commit()
             return True
+        
+        try:
+            updated = self._writer.execute(update)
+            if updated and total_quota is not None:
+                self._count_changes()
+            return updated
         except Exception:
             return False
+        finally:
+            self._link_cache.invalidate(link_code)
     
-    def delete_external_link(self, link_uuid: str) -> bool:
+    def delete_external_link(self, link_code: str) -> bool:
         """
         删除外链
         
         参数:
-            link_uuid: 外链UUID
+            link_code: 外链短码
             
         返回:
             bool: 是否删除成功
         """
         try:
-            self.cursor.execute("DELETE FROM external_links WHERE link_uuid = ?", (link_uuid,))
-            self.conn.commit()
-            return self.cursor.rowcount > 0
+            now = int(time.time())
+            # 返回被删除的外链是否有效，用于更新有效外链数
+            deleted = self._writer.execute(lambda conn: conn.execute(
+                "DELETE FROM external_links WHERE link_key = ? "
+                "RETURNING used_quota < total_quota AND (expiry_epoch IS NULL OR expiry_epoch > ?)",
+                (decode_link_code(link_code), now)
+            ).fetchall())
+            if not deleted:
+                return False
+            link_filter = loaded_link_filter(self.db_path)
+            if link_filter:
+                link_filter.remove(link_code)
+            self._count_changes(total_links_count=-1, active_links_count=-int(bool(deleted[0][0])))
+            return True
         except Exception:
             return False
+        finally:
+            self._link_cache.invalidate(link_code)
+    
+    # 外链归档操作
+    def archive_dead_links(self, retention: float, batch_size: int = 200) -> int:
+        """
+        将过期或配额用尽超过保留时间的外链移入归档表
+        
+        每次调用在一个写事务中最多移动batch_size条，避免长时间占用写锁。
+        
+        参数:
+            retention: 过期或用尽后在主表中保留的秒数
+            batch_size: 本批最多归档的外链数
+            
+        返回:
+            int: 归档的外链数
+        """
+        now = int(time.time())
+        cutoff = now - int(retention)
+        
+        def archive(conn):
+            # 两个条件分别走 expiry_epoch 和 exhausted_at 索引
+            # 同时过期且用尽的外链会出现两次，按ID去重
+            rows = {link_id: (link_code, reason) for link_id, link_code, reason in conn.execute(
+                "SELECT id, link_code(link_key), 'expired' FROM external_links WHERE expiry_epoch <= ? "
+                "UNION SELECT id, link_code(link_key), 'exhausted' FROM external_links WHERE exhausted_at <= ? "
+                "LIMIT ?",
+                (cutoff, cutoff, batch_size)
+            )}
+            if not rows:
+                return []
+            conn.executemany(
+                "INSERT OR REPLACE INTO external_links_archive "
+                "(id, drive_id, total_quota, used_quota, link_key, remarks, expiry_time, pool_id, expiry_epoch, exhausted_at, archived_at, archive_reason) "
+                "SELECT id, drive_id, total_quota, used_quota, link_key, remarks, expiry_time, pool_id, expiry_epoch, exhausted_at, ?, ? "
+                "FROM external_links WHERE id = ?",
+                [(now, reason, link_id) for link_id, (_, reason) in rows.items()]
+            )
+            conn.executemany("DELETE FROM external_links WHERE id = ?", [(link_id,) for link_id in rows])
+            return [link_code for link_code, _ in rows.values()]
+        
+        try:
+            archived = self._writer.execute(archive)
+        except Exception as e:
+            logger.error("归档外链错误: %s", e)
+            return 0
+        
+        link_filter = loaded_link_filter(self.db_path)
+        for link_code in archived:
+            if link_filter:
+                link_filter.remove(link_code)
+            self._link_cache.invalidate(link_code)
+        # 归档的外链都已过期或用尽，只影响外链总数
+        if archived:
+            self._count_changes(total_links_count=-len(archived))
+        return len(archived)
+    
+    def incremental_vacuum(self, pages: int = 0) -> bool:
+        """
+        归还数据库中的空闲页，数据库需处于增量回收模式
+        
+        参数:
+            pages: 最多归还的页数，0表示全部
+            
+        返回:
+            bool: 是否执行成功
+        """
+        try:
+            self._writer.execute(lambda conn: conn.execute(f"PRAGMA incremental_vacuum({int(pages)})").fetchall())
+            return True
+        except Exception as e:
+            logger.error("回收空闲页错误: %s", e)
+            return False
+    
+    def get_archived_links(self, link_code: Optional[str] = None, limit: int = 100) -> list:
+        """
+        查询已归档的外链，按归档时间倒序
+        
+        参数:
+            link_code: 只查询指定外链，可选
+            limit: 最多返回的条数
+            
+        返回:
+            List: 归档外链信息列表
+        """
+        if link_code:
+            self.cursor.execute(
+                f"SELECT {ARCHIVE_SELECT} FROM external_links_archive WHERE link_key = ?", (decode_link_code(link_code),)
+            )
+        else:
+            self.cursor.execute(
+                f"SELECT {ARCHIVE_SELECT} FROM external_links_archive ORDER BY archived_at DESC LIMIT ?", (limit,)
+            )
+        return [dict(row) for row in self.cursor.fetchall()]
+    
+    # 登录任务表操作
+    def save_login_job(self, job_id: str, job: Dict[str, Any], retention: float = 300) -> bool:
+        """
+        保存已结束的登录任务结果，并清理过期的任务记录
+        
+        参数:
+            job_id: 任务ID
+            job: 任务信息，包含state、result、message、finished_at
+            retention: 任务记录保留时间（秒）
+            
+        返回:
+            bool: 是否保存成功
+        """
+        def save(conn):
+            conn.execute(
+                "INSERT OR REPLACE INTO login_jobs (job_id, state, result, message, finished_at) VALUES (?, ?, ?, ?, ?)",
+                (job_id, job['state'], int(bool(job['result'])), job['message'], job['finished_at'])
+            )
+            conn.execute("DELETE FROM login_jobs WHERE finished_at < ?", (job['finished_at'] - retention,))
+            return True
+        
+        try:
+            return self._writer.execute(save)
+        except Exception as e:
+            logger.error("保存登录任务错误: %s", e)
+            return False
+    
+    def get_login_job(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """
+        获取已结束的登录任务结果
+        
+        参数:
+            job_id: 任务ID
+            
+        返回:
+            Dict: 任务信息，不存在时返回None
+        """
+        self.cursor.execute("SELECT * FROM login_jobs WHERE job_id = ?", (job_id,))
+        result = self.cursor.fetchone()
+        if result:
+            job = dict(result)
+            job['result'] = bool(job['result'])
+            return job
+        return None
     
     def get_total_user_drives_count(self) -> int:
         """
@@ -498,7 +1374,7 @@ class CloudDriveDatabase:
             result = self.cursor.fetchone()
             return result[0] if result else 0
         except Exception as e:
-            print(f"获取用户网盘总数错误: {e}")
+            logger.error("获取用户网盘总数错误: %s", e)
             return 0
     
     def get_active_external_links_count(self) -> int:
@@ -509,18 +1385,19 @@ class CloudDriveDatabase:
             int: 活跃外链数量
         """
         try:
-            # 获取当前时间的ISO格式
-            now = datetime.now().isoformat()
+            now = int(time.time())
             
             # 查询未过期且使用次数未达到上限的外链
+            # 拆成两个范围查询，都只扫描 (expiry_epoch, used_quota, total_quota) 索引
             self.cursor.execute(
-                "SELECT COUNT(*) FROM external_links WHERE (expiry_time IS NULL OR expiry_time > ?) AND used_quota < total_quota",
+                "SELECT (SELECT COUNT(*) FROM external_links WHERE expiry_epoch > ? AND used_quota < total_quota)"
+                " + (SELECT COUNT(*) FROM external_links WHERE expiry_epoch IS NULL AND used_quota < total_quota)",
                 (now,)
             )
             result = self.cursor.fetchone()
             return result[0] if result else 0
         except Exception as e:
-            print(f"获取活跃外链数量错误: {e}")
+            logger.error("获取活跃外链数量错误: %s", e)
             return 0  # 返回0或其他错误指示
 
     def get_total_external_links_count(self) -> int:
@@ -535,7 +1412,7 @@ class CloudDriveDatabase:
             result = self.cursor.fetchone()
             return result[0] if result else 0
         except Exception as e:
-            print(f"获取外链总数错误: {e}")
+            logger.error("获取外链总数错误: %s", e)
             return 0
 
     def get_user_drives_count_by_provider(self) -> Dict[str, int]:
@@ -550,10 +1427,62 @@ class CloudDriveDatabase:
             results = self.cursor.fetchall()
             return {row['provider_name']: row['count'] for row in results}
         except Exception as e:
-            print(f"按提供商统计用户网盘数量错误: {e}")
+            logger.error("按提供商统计用户网盘数量错误: %s", e)
             return {}
             
+    def get_access_trend(self, start: int, end: int, step: int, link_code: Optional[str] = None,
+                         drive_id: Optional[int] = None, provider_name: Optional[str] = None) -> list:
+        """
+        获取外链访问趋势，只读取预聚合的统计桶
+        
+        参数:
+            start: 开始时间戳
+            end: 结束时间戳
+            step: 每个数据点的时间跨度（秒）
+            link_code: 只统计指定外链，可选
+            drive_id: 只统计指定网盘，可选
+            provider_name: 只统计指定服务商，可选
+            
+        返回:
+            List: 按时间排列的数据点
+        """
+        return query_access_trend(self.conn, start, end, step, link_code, drive_id, provider_name)
+    
     def close(self):
-        """关闭数据库连接"""
+        """将数据库连接归还到连接池"""
         if self.conn:
-            self.conn.close() 
\ No newline at end of file
+            self.cursor.close()
+            self._pool.release(self.conn)
+            self.conn = None
+
+
+class QuotaReservation:
+    """外链配额预占凭据，由 CloudDriveDatabase.consume_quota 创建"""
+    
+    def __init__(self, db: CloudDriveDatabase, link_code: str):
+        self._db = db
+        self.link_code = link_code
+        self.settled = False
+        
+    def commit(self):
+        """确认本次使用，配额在预占时已经扣减，无需再写数据库"""
+        self.settled = True
+        
+    def release(self) -> bool:
+        """
+        归还本次预占的配额
+        
+        返回:
+            bool: 是否归还成功，已确认或已归还时返回False
+        """
+        if self.settled:
+            return False
+        self.settled = True
+        return self._db.release_quota(self.link_code)
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.release()
+        return False
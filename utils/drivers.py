@@ -0,0 +1,179 @@
+from typing import Any, Dict, Optional
+
+from .cache import TTLCache
+
+
+class UpstreamError(Exception):
+    """上游接口不可用、限流或返回了无法解析的响应"""
+
+
+class LoginTemplate:
+    """
+    预编译的登录请求模板
+
+    保存某个网盘账号登录请求中不随请求变化的部分，每次登录只需填入vcode、request_id、token等字段。
+    """
+    __slots__ = ("url", "headers", "params", "form")
+
+    def __init__(self, url: str, headers: Dict[str, str], params: str, form: Dict[str, Any]):
+        """
+        参数:
+            url: 登录接口地址
+            headers: 请求头
+            params: 查询字符串前缀
+            form: 表单字段，动态字段以None占位以保持字段顺序
+        """
+        self.url = url
+        self.headers = headers
+        self.params = params
+        self.form = form
+
+
+class BaseDriver:
+    """网盘登录驱动基类，新的网盘类型继承此类并通过 register_driver 注册"""
+
+    def compile(self, login_config: Dict[str, Any]) -> LoginTemplate:
+        """
+        将网盘账号的登录配置编译为请求模板
+
+        参数:
+            login_config: user_drives.login_config
+
+        返回:
+            LoginTemplate: 请求模板
+        """
+        raise NotImplementedError
+
+    def login(self, template: LoginTemplate, token: str, session=None) -> bool:
+        """
+        使用请求模板执行一次扫码登录
+
+        参数:
+            template: 请求模板
+            token: 二维码中的登录token
+            session: HTTP会话，默认使用驱动的共享会话
+
+        返回:
+            bool: 是否登录成功
+
+        异常:
+            UpstreamError: 上游不可用或限流，与token无效导致的登录失败区分开
+        """
+        raise NotImplementedError
+
+
+_drivers: Dict[str, BaseDriver] = {}
+_default_provider: Optional[str] = None
+# 网盘ID -> (服务商名称, 行版本号, 请求模板)；读取时与网盘行的版本号比较，
+# 其他进程更新登录配置后，本进程读到新版本的网盘行即重新编译，不依赖本进程收到失效通知
+_templates = TTLCache(maxsize=1024, ttl=60)
+
+
+def configure_templates(maxsize: int = 1024, ttl: float = 60):
+    """
+    设置登录请求模板缓存的容量和存活时间，需在首次登录前调用
+
+    参数:
+        maxsize: 最多缓存的模板数
+        ttl: 模板存活时间（秒），超过后重新编译，长时间未使用的账号不占用缓存
+    """
+    global _templates
+    _templates = TTLCache(maxsize=maxsize, ttl=ttl)
+
+
+def template_stats() -> Dict[str, Any]:
+    """
+    获取登录请求模板缓存的统计信息
+
+    返回:
+        Dict: 缓存统计
+    """
+    return _templates.stats()
+
+
+def register_driver(provider_name: str, driver: BaseDriver, default: bool = False):
+    """
+    注册网盘登录驱动
+
+    参数:
+        provider_name: 服务商名称，对应 drive_providers.provider_name
+        driver: 驱动实例
+        default: 是否作为未注册服务商的默认驱动
+    """
+    global _default_provider
+    _drivers[provider_name] = driver
+    if default:
+        _default_provider = provider_name
+    invalidate_templates(provider_name=provider_name)
+
+
+def get_driver(provider_name: str) -> Optional[BaseDriver]:
+    """
+    获取服务商对应的登录驱动
+
+    参数:
+        provider_name: 服务商名称
+
+    返回:
+        BaseDriver: 登录驱动，未注册且没有默认驱动时返回None
+    """
+    driver = _drivers.get(provider_name)
+    if driver is None and _default_provider:
+        driver = _drivers.get(_default_provider)
+    return driver
+
+
+def get_template(drive: Dict[str, Any]) -> Optional[LoginTemplate]:
+    """
+    获取网盘账号的登录请求模板，首次使用或网盘行版本号变化时编译并缓存
+
+    参数:
+        drive: 用户网盘信息，需包含id、provider_name、login_config，以及 user_drives.version
+
+    返回:
+        LoginTemplate: 请求模板，没有可用驱动时返回None
+    """
+    drive_id = int(drive['id'])
+    version = drive.get('version')
+    cached = _templates.get(drive_id)
+    if cached is not None and cached[1] == version:
+        return cached[2]
+    driver = get_driver(drive['provider_name'])
+    if driver is None:
+        return None
+    generation = _templates.generation(drive_id)
+    template = driver.compile(drive.get('login_config') or {})
+    _templates.set(drive_id, (drive['provider_name'], version, template), generation)
+    return template
+
+
+def invalidate_templates(drive_id: Optional[int] = None, provider_name: Optional[str] = None):
+    """
+    使登录请求模板失效，网盘账号或服务商配置更新后调用
+
+    参数:
+        drive_id: 网盘ID，指定时只使该账号的模板失效
+        provider_name: 服务商名称，指定时使该服务商所有账号的模板失效
+    """
+    if drive_id is not None:
+        # 前端传入的ID可能是字符串，缓存键统一为int
+        _templates.invalidate(int(drive_id))
+    if provider_name is not None:
+        _templates.invalidate_where(lambda _, value: value[0] == provider_name)
+
+
+def login_with_drive(drive: Dict[str, Any], token: str) -> Optional[bool]:
+    """
+    使用网盘账号对应的驱动执行扫码登录
+
+    参数:
+        drive: 用户网盘信息
+        token: 二维码中的登录token
+
+    返回:
+        bool: 是否登录成功，没有可用驱动时返回None
+    """
+    template = get_template(drive)
+    if template is None:
+        return None
+    return get_driver(drive['provider_name']).login(template, token)
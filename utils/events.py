@@ -0,0 +1,205 @@
+import atexit
+import logging
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+from .writer import get_writer
+from .rollups import PRUNE_BATCH_SIZE, apply_events, compact_rollups, get_rollup_option, prune_events
+
+
+logger = logging.getLogger(__name__)
+
+
+class EventLog:
+    """
+    外链访问事件缓冲区
+
+    请求线程只把事件追加到内存缓冲区，由后台线程定期批量写入 link_events 表，
+    并在同一事务中累加分钟统计桶，记录事件不会在请求路径上增加一次提交。
+    缓冲区达到上限时丢弃新事件并计数。后台线程同时定期压缩统计桶，并删除超过保留时间的原始事件。
+    """
+
+    def __init__(self, db_path: str, max_buffer: int = 10000, flush_interval: float = 1.0, flush_size: int = 500):
+        """
+        初始化缓冲区并启动刷新线程
+
+        参数:
+            db_path: 数据库文件路径
+            max_buffer: 缓冲区最多保留的事件数
+            flush_interval: 刷新间隔（秒）
+            flush_size: 缓冲事件数达到该值时提前刷新
+        """
+        self.db_path = db_path
+        self.max_buffer = max_buffer
+        self.flush_interval = flush_interval
+        self.flush_size = flush_size
+        self._buffer: List[tuple] = []
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._flush_lock = threading.Lock()
+        self.recorded = 0
+        self.flushed = 0
+        self.dropped = 0
+        self.flush_errors = 0
+        self.last_flush_ms = 0.0
+        self.compacted = 0
+        self.pruned = 0
+        self._last_compact = time.monotonic()
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, name="link-events", daemon=True)
+        self._thread.start()
+
+    def record(self, event: str, link_code: str, outcome: str, latency_ms: Optional[float] = None,
+               drive_id: Optional[int] = None, provider_name: Optional[str] = None):
+        """
+        记录一条事件，不访问数据库
+
+        参数:
+            event: 事件类型，view 或 login
+            link_code: 外链短码
+            outcome: 结果，如 ok、expired、success、failed
+            latency_ms: 处理耗时（毫秒）
+            drive_id: 网盘ID
+            provider_name: 服务商名称
+        """
+        row = (time.time(), event, link_code, drive_id, provider_name, outcome, latency_ms)
+        with self._lock:
+            if len(self._buffer) >= self.max_buffer:
+                self.dropped += 1
+                return
+            self._buffer.append(row)
+            self.recorded += 1
+            pending = len(self._buffer)
+        if pending >= self.flush_size:
+            self._wakeup.set()
+
+    def _run(self):
+        """刷新线程主循环"""
+        while not self._closed:
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            self.flush()
+            if time.monotonic() - self._last_compact >= get_rollup_option("compact_interval"):
+                self._last_compact = time.monotonic()
+                self.compact()
+
+    def flush(self) -> int:
+        """
+        将缓冲区中的事件写入数据库
+
+        返回:
+            int: 写入的事件数
+        """
+        with self._flush_lock:
+            with self._lock:
+                batch, self._buffer = self._buffer, []
+            if not batch:
+                return 0
+            start = time.perf_counter()
+            
+            def write(conn):
+                conn.executemany(
+                    "INSERT INTO link_events (ts, event, link_code, drive_id, provider_name, outcome, latency_ms) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    batch
+                )
+                apply_events(conn, batch)
+            
+            try:
+                get_writer(self.db_path).execute(write)
+            except Exception as e:
+                logger.error("写入外链事件失败: %s", e)
+                with self._lock:
+                    self.flush_errors += 1
+                    self.dropped += len(batch)
+                return 0
+            self.last_flush_ms = (time.perf_counter() - start) * 1000
+            with self._lock:
+                self.flushed += len(batch)
+            return len(batch)
+
+    def compact(self) -> int:
+        """
+        合并超过保留时间的细粒度统计桶，并删除超过保留时间的原始事件
+
+        返回:
+            int: 被合并删除的统计桶数
+        """
+        writer = get_writer(self.db_path)
+        try:
+            merged = writer.execute(compact_rollups)
+        except Exception as e:
+            logger.error("压缩访问统计失败: %s", e)
+            return 0
+        self.compacted += merged
+        try:
+            # 分批删除，每批单独提交，其他写操作可以穿插执行
+            while True:
+                pruned = writer.execute(prune_events)
+                self.pruned += pruned
+                if pruned < PRUNE_BATCH_SIZE:
+                    break
+        except Exception as e:
+            logger.error("删除过期访问事件失败: %s", e)
+        return merged
+
+    def close(self):
+        """停止刷新线程并写入剩余事件"""
+        if self._closed:
+            return
+        self._closed = True
+        self._wakeup.set()
+        self._thread.join()
+        self.flush()
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        获取事件缓冲区统计信息
+
+        返回:
+            Dict: 缓冲中、已记录、已写入、丢弃、已删除的过期事件数及最近一次刷新耗时
+        """
+        with self._lock:
+            return {
+                "buffered": len(self._buffer),
+                "max_buffer": self.max_buffer,
+                "recorded": self.recorded,
+                "flushed": self.flushed,
+                "dropped": self.dropped,
+                "flush_errors": self.flush_errors,
+                "last_flush_ms": round(self.last_flush_ms, 2),
+                "compacted_buckets": self.compacted,
+                "pruned_events": self.pruned,
+            }
+
+
+_event_logs: Dict[str, EventLog] = {}
+_event_logs_lock = threading.Lock()
+
+
+def get_event_log(db_path: str, max_buffer: int = 10000, flush_interval: float = 1.0) -> EventLog:
+    """
+    获取指定数据库的进程级事件缓冲区，首次调用时创建
+
+    参数:
+        db_path: 数据库文件路径
+        max_buffer: 缓冲区最多保留的事件数，仅首次创建时生效
+        flush_interval: 刷新间隔（秒），仅首次创建时生效
+
+    返回:
+        EventLog: 事件缓冲区
+    """
+    event_log = _event_logs.get(db_path)
+    if event_log is None:
+        with _event_logs_lock:
+            event_log = _event_logs.get(db_path)
+            if event_log is None:
+                event_log = _event_logs[db_path] = EventLog(db_path, max_buffer, flush_interval)
+    return event_log
+
+
+@atexit.register
+def _close_event_logs():
+    """进程退出前写入缓冲中的事件，先于写队列关闭执行"""
+    for event_log in list(_event_logs.values()):
+        event_log.close()
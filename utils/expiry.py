@@ -0,0 +1,58 @@
+import time
+from datetime import datetime, timezone
+from typing import Optional
+
+
+def parse_expiry(value: Optional[str]) -> Optional[int]:
+    """
+    将ISO 8601格式的过期时间转换为UTC时间戳
+
+    不带时区的时间按UTC处理。
+
+    参数:
+        value: 过期时间字符串
+
+    返回:
+        int: UTC时间戳（秒）；未设置过期时间时返回None；无法解析时返回0，即视为已过期
+    """
+    if not value:
+        return None
+    try:
+        # Python < 3.11 的 fromisoformat 不支持 Z 后缀
+        if value.endswith('Z'):
+            value = value[:-1] + '+00:00'
+        expiry = datetime.fromisoformat(value)
+    except (ValueError, TypeError, AttributeError):
+        return 0
+    if expiry.tzinfo is None:
+        expiry = expiry.replace(tzinfo=timezone.utc)
+    return int(expiry.timestamp())
+
+
+def format_expiry(epoch: Optional[int]) -> Optional[str]:
+    """
+    将UTC时间戳格式化为带Z后缀的ISO 8601字符串
+
+    参数:
+        epoch: UTC时间戳（秒）
+
+    返回:
+        str: 形如 2025-04-12T11:08:00Z 的字符串，epoch为None时返回None
+    """
+    if epoch is None:
+        return None
+    return datetime.fromtimestamp(epoch, timezone.utc).strftime('%Y-%m-%dT%H:%M:%SZ')
+
+
+def is_expired(epoch: Optional[int], now: Optional[float] = None) -> bool:
+    """
+    判断过期时间戳是否已过期
+
+    参数:
+        epoch: UTC时间戳，None表示永不过期
+        now: 当前时间戳，默认取系统时间
+
+    返回:
+        bool: 是否已过期
+    """
+    return epoch is not None and epoch <= (time.time() if now is None else now)
@@ -0,0 +1,122 @@
+import csv
+import io
+import json
+import zlib
+from typing import Iterable, Iterator, List, Optional
+
+from .pool import get_pool
+from .database import LINK_FIELDS, ARCHIVE_FIELDS, DRIVE_FIELDS, select_list
+
+# 可导出的数据：名称 -> (表名, 允许的字段)
+EXPORT_TABLES = {
+    "links": ("external_links", LINK_FIELDS),
+    "drives": ("user_drives", DRIVE_FIELDS),
+    "archive": ("external_links_archive", ARCHIVE_FIELDS),
+}
+
+
+def export_columns(name: str, fields: Optional[List[str]] = None) -> List[str]:
+    """
+    确定导出的列，忽略不允许的字段
+
+    参数:
+        name: 导出数据名称，见 EXPORT_TABLES
+        fields: 请求的字段，默认为全部字段
+
+    返回:
+        List: 导出的列
+    """
+    allowed = EXPORT_TABLES[name][1]
+    columns = [field for field in (fields or allowed) if field in allowed]
+    return columns or list(allowed)
+
+
+def iter_rows(db_path: str, name: str, columns: List[str], chunk_size: int = 1000) -> Iterator[list]:
+    """
+    按固定大小分块读取整张表
+
+    使用单独的池连接和服务端游标，每次只在内存中保留一个分块；
+    整个导出在同一个读快照中完成，不受导出期间写入的影响。
+
+    参数:
+        db_path: 数据库文件路径
+        name: 导出数据名称
+        columns: 导出的列
+        chunk_size: 每块行数
+
+    返回:
+        Iterator: 每次产出一块行数据
+    """
+    pool = get_pool(db_path)
+    conn = pool.acquire()
+    cursor = None
+    try:
+        cursor = conn.execute(f"SELECT {select_list(columns)} FROM {EXPORT_TABLES[name][0]} ORDER BY id")
+        while True:
+            rows = cursor.fetchmany(chunk_size)
+            if not rows:
+                break
+            yield rows
+    finally:
+        if cursor is not None:
+            cursor.close()
+        pool.release(conn)
+
+
+def ndjson_chunks(chunks: Iterable[list], columns: List[str]) -> Iterator[bytes]:
+    """
+    将分块行数据编码为NDJSON，每行一个JSON对象
+
+    参数:
+        chunks: iter_rows 产出的分块
+        columns: 列名
+
+    返回:
+        Iterator: 编码后的字节块
+    """
+    for rows in chunks:
+        yield "".join(
+            json.dumps(dict(zip(columns, row)), ensure_ascii=False) + "\n" for row in rows
+        ).encode("utf-8")
+
+
+def csv_chunks(chunks: Iterable[list], columns: List[str]) -> Iterator[bytes]:
+    """
+    将分块行数据编码为CSV，首行为列名
+
+    参数:
+        chunks: iter_rows 产出的分块
+        columns: 列名
+
+    返回:
+        Iterator: 编码后的字节块
+    """
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    # 带BOM便于Excel识别UTF-8
+    writer.writerow(columns)
+    yield ("\ufeff" + buffer.getvalue()).encode("utf-8")
+    for rows in chunks:
+        buffer.seek(0)
+        buffer.truncate()
+        writer.writerows(rows)
+        yield buffer.getvalue().encode("utf-8")
+
+
+def gzip_chunks(chunks: Iterable[bytes], level: int = 6) -> Iterator[bytes]:
+    """
+    以gzip格式流式压缩字节块
+
+    参数:
+        chunks: 原始字节块
+        level: 压缩级别
+
+    返回:
+        Iterator: 压缩后的字节块
+    """
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
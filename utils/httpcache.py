@@ -0,0 +1,125 @@
+import gzip
+import hashlib
+import sqlite3
+import threading
+from typing import Any, Dict, Optional
+
+# brotli为可选依赖，未安装时只使用gzip
+try:
+    import brotli
+except ImportError:
+    try:
+        import brotlicffi as brotli
+    except ImportError:
+        brotli = None
+
+
+# 值得压缩的响应类型，图片、压缩包等已压缩的内容不再重复压缩
+COMPRESSIBLE_MIMETYPES = frozenset({
+    "text/html", "text/plain", "text/css", "text/csv", "text/javascript",
+    "application/json", "application/javascript", "application/x-ndjson",
+})
+
+
+class DataVersionProbe:
+    """
+    数据库变更探测
+
+    使用一个专用的只读连接读取 PRAGMA data_version：其他连接（包括写线程和其他进程）每提交一次，
+    该值就会变化。值未变化时，由数据库内容生成的响应也不会变化，可直接返回304。
+    data_version 只在同一连接上可比较，因此每个进程只使用这一个连接读取。
+    """
+
+    def __init__(self, db_path: str):
+        """
+        参数:
+            db_path: 数据库文件路径
+        """
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.execute("PRAGMA query_only = 1")
+        self._lock = threading.Lock()
+        self.probes = 0
+
+    def version(self) -> int:
+        """
+        读取当前的数据版本号
+
+        返回:
+            int: 数据版本号，数据库有新的提交时变化
+        """
+        with self._lock:
+            self.probes += 1
+            return self._conn.execute("PRAGMA data_version").fetchone()[0]
+
+
+_probes: Dict[str, DataVersionProbe] = {}
+_probes_lock = threading.Lock()
+
+
+def get_version_probe(db_path: str) -> DataVersionProbe:
+    """
+    获取指定数据库的进程级变更探测器
+
+    参数:
+        db_path: 数据库文件路径
+
+    返回:
+        DataVersionProbe: 变更探测器
+    """
+    probe = _probes.get(db_path)
+    if probe is None:
+        with _probes_lock:
+            probe = _probes.get(db_path)
+            if probe is None:
+                probe = _probes[db_path] = DataVersionProbe(db_path)
+    return probe
+
+
+def make_etag(*parts: Any) -> str:
+    """
+    由决定响应内容的各部分生成ETag值
+
+    参数:
+        parts: 外链行的配额与版本号、数据版本号、查询参数等
+
+    返回:
+        str: 不带引号的ETag值
+    """
+    return hashlib.blake2b(repr(parts).encode("utf-8"), digest_size=12).hexdigest()
+
+
+def choose_encoding(accept_encodings) -> Optional[str]:
+    """
+    根据客户端的 Accept-Encoding 选择压缩格式，优先brotli
+
+    参数:
+        accept_encodings: werkzeug 的 Accept 对象（request.accept_encodings）
+
+    返回:
+        str: br 或 gzip，客户端不支持压缩时返回None
+    """
+    if brotli is not None and accept_encodings.quality("br") > 0:
+        return "br"
+    if accept_encodings.quality("gzip") > 0:
+        return "gzip"
+    return None
+
+
+def compress_body(data: bytes, encoding: str, gzip_level: int = 6, brotli_quality: int = 5) -> bytes:
+    """
+    压缩响应体
+
+    参数:
+        data: 原始响应体
+        encoding: br 或 gzip
+        gzip_level: gzip压缩级别
+        brotli_quality: brotli压缩质量，0-11，默认值在压缩率与耗时之间折中
+
+    返回:
+        bytes: 压缩后的响应体
+    """
+    if encoding == "br":
+        return brotli.compress(data, quality=brotli_quality)
+    # mtime固定为0，相同内容的压缩结果相同
+    return gzip.compress(data, compresslevel=gzip_level, mtime=0)
+
@@ -0,0 +1,178 @@
+import logging
+import threading
+import time
+import uuid
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional
+
+
+logger = logging.getLogger(__name__)
+
+
+def _percentile(samples, pct: float) -> float:
+    """计算样本的百分位数，样本为空时返回0"""
+    if not samples:
+        return 0
+    samples = sorted(samples)
+    return samples[min(len(samples) - 1, int(len(samples) * pct / 100))]
+
+
+def job_age(job_id: str) -> Optional[float]:
+    """
+    根据任务ID计算任务已创建的时间
+
+    参数:
+        job_id: 任务ID
+
+    返回:
+        float: 已创建的秒数，ID格式无效时返回None
+    """
+    try:
+        return time.time() - int(job_id.split('-', 1)[0], 16)
+    except (ValueError, AttributeError):
+        return None
+
+
+class JobRunner:
+    """
+    有界的后台任务执行器
+
+    任务在线程池中执行，排队与执行中的任务总数超过max_pending时拒绝新任务，
+    避免上游变慢时无限堆积。任务结果在内存中保留result_ttl秒供轮询。
+    """
+
+    def __init__(self, max_workers: int = 8, max_pending: int = 64, result_ttl: float = 300,
+                 on_finish: Optional[Callable[[str, Dict[str, Any]], None]] = None):
+        """
+        初始化执行器
+
+        参数:
+            max_workers: 工作线程数
+            max_pending: 排队与执行中的最大任务数
+            result_ttl: 已完成任务的保留时间（秒）
+            on_finish: 任务结束后在工作线程中调用的回调，参数为 (任务ID, 任务信息)
+        """
+        self.max_workers = max_workers
+        self.max_pending = max_pending
+        self.result_ttl = result_ttl
+        self.on_finish = on_finish
+        self._executor = ThreadPoolExecutor(max_workers, thread_name_prefix="login-job")
+        self._jobs: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+        self._queued = 0
+        self._running = 0
+        self.submitted = 0
+        self.completed = 0
+        self.failed = 0
+        self.rejected = 0
+        self._wait_ms = deque(maxlen=1024)
+        self._run_ms = deque(maxlen=1024)
+
+    def submit(self, fn: Callable[..., tuple], *args) -> Optional[str]:
+        """
+        提交任务
+
+        参数:
+            fn: 任务函数，返回 (结果, 提示信息)
+            args: 任务参数
+
+        返回:
+            str: 任务ID，队列已满时返回None
+        """
+        with self._lock:
+            self._purge()
+            if self._queued + self._running >= self.max_pending:
+                self.rejected += 1
+                return None
+            # 任务ID带创建时间，其他进程据此判断未知任务是否可能仍在执行
+            job_id = f"{int(time.time()):x}-{uuid.uuid4().hex}"
+            self._jobs[job_id] = {
+                "state": "pending",
+                "result": None,
+                "message": None,
+                "created_at": time.time(),
+                "finished_at": None,
+            }
+            self._queued += 1
+            self.submitted += 1
+        self._executor.submit(self._run, job_id, fn, args)
+        return job_id
+
+    def _run(self, job_id: str, fn: Callable[..., tuple], args: tuple):
+        """在工作线程中执行任务并记录结果"""
+        started = time.time()
+        with self._lock:
+            job = self._jobs[job_id]
+            job["state"] = "running"
+            self._queued -= 1
+            self._running += 1
+            self._wait_ms.append((started - job["created_at"]) * 1000)
+        try:
+            result, message = fn(*args)
+            state = "done"
+        except Exception:
+            logger.exception("任务 %s 执行失败", job_id)
+            result, message, state = False, "登录请求失败", "failed"
+        finished = time.time()
+        with self._lock:
+            job.update(state=state, result=result, message=message, finished_at=finished)
+            self._running -= 1
+            self._run_ms.append((finished - started) * 1000)
+            if state == "done":
+                self.completed += 1
+            else:
+                self.failed += 1
+            snapshot = dict(job)
+        if self.on_finish:
+            try:
+                self.on_finish(job_id, snapshot)
+            except Exception:
+                logger.exception("保存任务 %s 结果失败", job_id)
+
+    def _purge(self):
+        """清理超过保留时间的已完成任务，调用方需持有锁"""
+        cutoff = time.time() - self.result_ttl
+        expired = [job_id for job_id, job in self._jobs.items()
+                   if job["finished_at"] is not None and job["finished_at"] < cutoff]
+        for job_id in expired:
+            del self._jobs[job_id]
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """
+        获取任务状态
+
+        参数:
+            job_id: 任务ID
+
+        返回:
+            Dict: 任务信息副本，不存在时返回None
+        """
+        with self._lock:
+            job = self._jobs.get(job_id)
+            return dict(job) if job else None
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        获取执行器统计信息
+
+        返回:
+            Dict: 队列深度、执行中任务数、累计计数及排队/执行耗时分位数
+        """
+        with self._lock:
+            wait_ms = list(self._wait_ms)
+            run_ms = list(self._run_ms)
+            return {
+                "queued": self._queued,
+                "running": self._running,
+                "max_workers": self.max_workers,
+                "max_pending": self.max_pending,
+                "submitted": self.submitted,
+                "completed": self.completed,
+                "failed": self.failed,
+                "rejected": self.rejected,
+                "wait_ms_p50": round(_percentile(wait_ms, 50), 2),
+                "wait_ms_p95": round(_percentile(wait_ms, 95), 2),
+                "run_ms_p50": round(_percentile(run_ms, 50), 2),
+                "run_ms_p95": round(_percentile(run_ms, 95), 2),
+            }
@@ -0,0 +1,143 @@
+import os
+import sqlite3
+import uuid
+from typing import Optional
+
+
+BASE62_ALPHABET = "0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz"
+_BASE62_INDEX = {char: index for index, char in enumerate(BASE62_ALPHABET)}
+
+# 允许的外链标识长度（字节），短于8字节时随机标识容易被枚举
+MIN_KEY_BYTES = 8
+MAX_KEY_BYTES = 16
+
+
+def _code_width(key_bytes: int) -> int:
+    """计算指定字节数的标识编码为base62后的固定长度"""
+    width = 1
+    while 62 ** width < 256 ** key_bytes:
+        width += 1
+    return width
+
+
+# base62编码长度 -> 标识字节数，每种字节数的编码长度都不相同，解码时据此还原前导零字节
+_WIDTHS = {_code_width(size): size for size in range(MIN_KEY_BYTES, MAX_KEY_BYTES + 1)}
+
+_options = {
+    "key_bytes": 12,
+}
+
+
+def configure_link_codes(key_bytes: int = 12):
+    """
+    设置新建外链的标识长度，已有外链不受影响
+
+    参数:
+        key_bytes: 标识字节数，8到16之间，12字节对应17位的base62短码
+    """
+    if not MIN_KEY_BYTES <= key_bytes <= MAX_KEY_BYTES:
+        raise ValueError(f"外链标识长度需在{MIN_KEY_BYTES}到{MAX_KEY_BYTES}字节之间")
+    _options["key_bytes"] = key_bytes
+
+
+def new_link_key() -> bytes:
+    """
+    生成新的随机外链标识
+
+    返回:
+        bytes: 外链标识
+    """
+    return os.urandom(_options["key_bytes"])
+
+
+def encode_link_key(key: bytes) -> str:
+    """
+    将外链标识编码为定长的base62短码
+
+    参数:
+        key: 外链标识
+
+    返回:
+        str: 外链短码
+    """
+    value = int.from_bytes(key, 'big')
+    chars = []
+    for _ in range(_code_width(len(key))):
+        value, index = divmod(value, 62)
+        chars.append(BASE62_ALPHABET[index])
+    return ''.join(reversed(chars))
+
+
+def legacy_link_key(link_uuid: str) -> bytes:
+    """
+    将旧版的UUID外链转换为外链标识
+
+    UUID本身就是16字节，转换后旧链接仍可按原UUID访问。不是合法UUID的旧数据按UUID5派生标识，
+    之后只能通过新的短码访问。
+
+    参数:
+        link_uuid: 旧版外链UUID
+
+    返回:
+        bytes: 16字节的外链标识
+    """
+    try:
+        return uuid.UUID(link_uuid).bytes
+    except (ValueError, AttributeError, TypeError):
+        return uuid.uuid5(uuid.NAMESPACE_URL, str(link_uuid)).bytes
+
+
+def decode_link_code(code: str) -> Optional[bytes]:
+    """
+    解析外链短码或旧版UUID
+
+    参数:
+        code: base62短码，或带连字符的36位UUID
+
+    返回:
+        bytes: 外链标识，格式无效时返回None
+    """
+    if not isinstance(code, str):
+        return None
+    if len(code) == 36 and '-' in code:
+        try:
+            return uuid.UUID(code).bytes
+        except ValueError:
+            return None
+    size = _WIDTHS.get(len(code))
+    if size is None:
+        return None
+    value = 0
+    for char in code:
+        index = _BASE62_INDEX.get(char)
+        if index is None:
+            return None
+        value = value * 62 + index
+    if value >= 256 ** size:
+        return None
+    return value.to_bytes(size, 'big')
+
+
+def normalize_link_code(code: str) -> Optional[str]:
+    """
+    将外链短码或旧版UUID统一转换为短码，作为缓存、过滤器和事件日志中的外链标识
+
+    参数:
+        code: 外链短码或旧版UUID
+
+    返回:
+        str: 外链短码，格式无效时返回None
+    """
+    key = decode_link_code(code)
+    return encode_link_key(key) if key is not None else None
+
+
+def register_link_functions(conn: sqlite3.Connection):
+    """
+    在连接上注册 link_code(link_key) SQL函数，查询中可直接返回外链短码
+
+    参数:
+        conn: 数据库连接
+    """
+    conn.create_function("link_code", 1, lambda key: encode_link_key(key) if key is not None else None,
+                         deterministic=True)
@@ -1,62 +1,186 @@
 import requests
 import time
-import json
+import logging
+import threading
+from http.cookiejar import DefaultCookiePolicy
+from typing import Dict, Tuple
+from urllib.parse import urlsplit
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 
+from .drivers import BaseDriver, LoginTemplate, UpstreamError, register_driver
 
-def login_quark(token, config_vars):
+
+logger = logging.getLogger(__name__)
+
+
+QUARK_LOGIN_URL = 'https://uop.quark.cn/cas/ajax/loginWithKpsAndQrcodeToken'
+
+QUARK_HEADERS = {
+    'Accept': 'application/json, text/plain, */*',
+    'Content-Type': 'application/x-www-form-urlencoded',
+    'Origin': 'https://b.quark.cn',
+    'Referer': 'https://b.quark.cn/',
+    'User-Agent': 'Mozilla/5.0 (Linux; U; Android 15; zh-CN; 2312DRA50C Build/AQ3A.240912.001) AppleWebKit/537.36 (KHTML, like Gecko) Version/4.0 Chrome/123.0.6312.80 Quark/7.9.2.771 Mobile Safari/537.36',
+    'X-Requested-With': 'com.quark.browser',
+    'sec-ch-ua': '"Android WebView";v="123", "Not:A-Brand";v="8", "Chromium";v="123"',
+    'sec-ch-ua-mobile': '?1',
+    'sec-ch-ua-platform': '"Android"'
+}
+
+# 上游请求的会话参数，可在启动时通过 configure_sessions 调整
+_session_options = {
+    "pool_maxsize": 16,
+    "timeout": (3.05, 10),
+    "retries": 2,
+}
+_sessions: Dict[str, requests.Session] = {}
+_sessions_lock = threading.Lock()
+
+
+def configure_sessions(pool_maxsize: int = 16, timeout: Tuple[float, float] = (3.05, 10), retries: int = 2):
+    """
+    设置上游会话参数，需在首次请求前调用
+
+    参数:
+        pool_maxsize: 每个主机保持的最大连接数，应不小于并发登录数
+        timeout: (连接超时, 读取超时)，单位秒
+        retries: 建立连接失败时的重试次数
+    """
+    _session_options.update(pool_maxsize=pool_maxsize, timeout=tuple(timeout), retries=retries)
+
+
+def get_session(provider: str) -> requests.Session:
+    """
+    获取指定服务商的进程级HTTP会话，连接在多次登录之间保持复用
+
+    会话不保存Cookie，不同账号的登录请求之间不会互相影响。
+
+    参数:
+        provider: 服务商标识
+
+    返回:
+        requests.Session: HTTP会话
+    """
+    session = _sessions.get(provider)
+    if session is None:
+        with _sessions_lock:
+            session = _sessions.get(provider)
+            if session is None:
+                session = _sessions[provider] = _create_session()
+    return session
+
+
+def _create_session() -> requests.Session:
+    """创建带连接池和重试策略的会话"""
+    session = requests.Session()
+    session.cookies.set_policy(DefaultCookiePolicy(allowed_domains=[]))
+    # 登录请求不是幂等的，只在连接尚未建立时重试，读取超时和错误状态码不重试
+    retry = Retry(total=_session_options["retries"], connect=_session_options["retries"], read=0, status=0, backoff_factor=0.2)
+    adapter = HTTPAdapter(pool_connections=4, pool_maxsize=_session_options["pool_maxsize"], max_retries=retry)
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    return session
+
+
+def warm_sessions():
+    """
+    在后台线程中预先建立到各服务商的连接，失败时忽略
+    """
+    def warm():
+        origin = "{0.scheme}://{0.netloc}/".format(urlsplit(QUARK_LOGIN_URL))
+        try:
+            get_session("quark").head(origin, timeout=_session_options["timeout"])
+        except requests.RequestException as e:
+            logger.warning("预热上游连接失败: %s", e)
+
+    threading.Thread(target=warm, name="warm-sessions", daemon=True).start()
+
+
+class QuarkDriver(BaseDriver):
+    """夸克网盘登录驱动"""
+
+    def compile(self, login_config):
+        """
+        编译夸克网盘的登录请求模板
+
+        参数:
+            login_config: 登录配置，包含queryParams和data
+
+        返回:
+            LoginTemplate: 请求模板
+        """
+        _config_vars = login_config.get("data") or {}
+        form = {
+            'client_id': _config_vars.get("client_id"),
+            'v': _config_vars.get("v"),
+            'request_id': None,
+            'sign_wg': _config_vars.get("sign_wg"),
+            'kps_wg': _config_vars.get("kps_wg"),
+            'vcode': None,
+            'token': None
+        }
+        return LoginTemplate(QUARK_LOGIN_URL, QUARK_HEADERS, login_config.get("queryParams") or "", form)
+
+    def login(self, template, token, session=None):
+        """
+        夸克网盘扫码登录
+
+        参数:
+            template: 请求模板
+            token: 登录token
+            session: HTTP会话，默认使用进程级共享会话
+
+        返回:
+            bool: 是否登录成功
+
+        异常:
+            UpstreamError: 请求失败、超时、被限流或响应无法解析
+        """
+        s = session or get_session("quark")
+
+        # 生成时间戳，用于请求参数
+        vcode = int(time.time() * 1000)  # 获取当前时间的毫秒数
+
+        # 只填入每次请求不同的字段
+        data = dict(template.form)
+        data['request_id'] = vcode + 5
+        data['vcode'] = vcode
+        data['token'] = token
+
+        # 发送登录请求，表单中的token在写入日志时隐去
+        logger.debug("夸克登录请求", extra={"form": data})
+        try:
+            res = s.post(template.url, data=data, params=template.params + str(vcode), headers=template.headers,
+                         timeout=_session_options["timeout"])
+        except requests.RequestException as e:
+            raise UpstreamError(f"夸克登录接口请求失败: {e}") from e
+        if res.status_code == 429 or res.status_code >= 500:
+            raise UpstreamError(f"夸克登录接口返回状态码 {res.status_code}")
+        try:
+            result = res.json()
+        except ValueError as e:
+            raise UpstreamError("夸克登录接口返回了无法解析的响应") from e
+        logger.debug("夸克登录响应", extra={"response": result})
+
+        # 检查登录结果
+        return result.get('status') == 2000000
+
+
+def login_quark(token, config_vars, session=None):
     """
     夸克网盘登录
-    
+
     参数:
         token: 登录token
         config_vars: 配置参数
-    
+        session: HTTP会话，默认使用进程级共享会话
+
     返回:
         bool: 是否登录成功
     """
-    if len(config_vars) > 0:
-        _config_vars = config_vars.get("data")
-    
-    s = requests.Session()
-    s.headers = {
-        'Accept': 'application/json, text/plain, */*',
-        'Content-Type': 'application/x-www-form-urlencoded',
-        'Origin': 'https://b.quark.cn',
-        'Referer': 'https://b.quark.cn/',
-        'User-Agent': 'Mozilla/5.0 (Linux; U; Android 15; zh-CN; 2312DRA50C Build/AQ3A.240912.001) AppleWebKit/537.36 (KHTML, like Gecko) Version/4.0 Chrome/123.0.6312.80 Quark/7.9.2.771 Mobile Safari/537.36',
-        'X-Requested-With': 'com.quark.browser',
-        'sec-ch-ua': '"Android WebView";v="123", "Not:A-Brand";v="8", "Chromium";v="123"',
-        'sec-ch-ua-mobile': '?1',
-        'sec-ch-ua-platform': '"Android"'
-    }
-    
-    # 生成时间戳，用于请求参数
-    vcode = int(time.time() * 1000)  # 获取当前时间的毫秒数
-    request_id = vcode + 5
-    is_login = False
-    
-    # 构建请求URL和参数
-    url = 'https://uop.quark.cn/cas/ajax/loginWithKpsAndQrcodeToken'
-    queryParams = config_vars.get("queryParams") + str(int(time.time() * 1000))
-    
-    # 构建请求数据
-    data = {
-       'client_id': _config_vars.get("client_id"),
-       'v': _config_vars.get("v"),
-       'request_id': request_id,
-       'sign_wg': _config_vars.get("sign_wg"),
-       'kps_wg': _config_vars.get("kps_wg"),
-       'vcode': vcode,
-       'token': token
-    }
-    
-    # 发送登录请求
-    print(data)
-    res = s.post(url, data=data, params=queryParams)
-    print(res.json())
-    
-    # 检查登录结果
-    if res.json().get('status') == 2000000:
-        is_login = True
-        
-    return is_login
\ No newline at end of file
+    driver = QuarkDriver()
+    return driver.login(driver.compile(config_vars), token, session)
+
+
+register_driver("夸克网盘", QuarkDriver())
@@ -0,0 +1,198 @@
+import atexit
+import copy
+import json
+import logging
+import os
+import queue
+import random
+import re
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+from typing import Any, Dict, Optional
+
+
+# 日志中需要隐去的字段（不区分大小写），包括上游登录token、外链令牌和网盘登录配置中的签名
+REDACTED_KEYS = frozenset({
+    "token", "link_token", "kps_wg", "sign_wg", "service_ticket",
+    "password", "secret", "secret_key", "cookie", "authorization",
+})
+REDACTED = "***"
+_REDACT_PATTERN = re.compile(
+    r"""(['"]?\b(?:%s)\b['"]?\s*[:=]\s*['"]?)[^'",\s&}]+""" % "|".join(sorted(REDACTED_KEYS)),
+    re.IGNORECASE,
+)
+
+# LogRecord自带的属性，其余属性视为通过 extra 传入的结构化字段
+_RECORD_ATTRS = frozenset(logging.LogRecord("", 0, "", 0, "", (), None).__dict__) | {"message", "asctime", "taskName"}
+
+
+def redact(value: Any) -> Any:
+    """
+    隐去嵌套字典与列表中的敏感字段
+
+    参数:
+        value: 日志字段的值
+
+    返回:
+        Any: 隐去敏感字段后的副本，不修改原对象
+    """
+    if isinstance(value, dict):
+        return {key: REDACTED if str(key).lower() in REDACTED_KEYS else redact(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [redact(item) for item in value]
+    if isinstance(value, str):
+        return _REDACT_PATTERN.sub(r"\1" + REDACTED, value)
+    return value
+
+
+class JSONFormatter(logging.Formatter):
+    """每条日志输出为一行JSON，通过 extra 传入的字段作为顶层字段输出"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": redact(record.getMessage()),
+        }
+        for key, value in record.__dict__.items():
+            if key not in _RECORD_ATTRS and not key.startswith("_"):
+                entry[key] = REDACTED if key.lower() in REDACTED_KEYS else redact(value)
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            entry["exc"] = record.exc_text
+        if record.levelno >= logging.WARNING:
+            entry["where"] = f"{record.pathname}:{record.lineno}"
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class RedactingFormatter(logging.Formatter):
+    """文本格式的日志（控制台），输出前隐去敏感字段"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        return redact(super().format(record))
+
+
+class SamplingFilter(logging.Filter):
+    """
+    按路由采样INFO及以下级别的日志
+
+    带有 route 字段（请求的endpoint）且在采样配置中的日志按比例保留，保留的日志带有 sample_rate 字段，
+    统计时按 1/sample_rate 还原；WARNING及以上级别的日志全部保留。
+    """
+
+    def __init__(self, rates: Optional[Dict[str, float]] = None):
+        """
+        参数:
+            rates: endpoint -> 保留比例（0-1）
+        """
+        super().__init__()
+        self.rates = dict(rates or {})
+        self.sampled_out = 0
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        rate = self.rates.get(getattr(record, "route", None))
+        if rate is None or rate >= 1 or record.levelno >= logging.WARNING:
+            return True
+        if random.random() < rate:
+            record.sample_rate = rate
+            return True
+        self.sampled_out += 1
+        return False
+
+
+class NonBlockingQueueHandler(QueueHandler):
+    """队列已满时丢弃日志并计数，请求线程从不等待"""
+
+    def __init__(self, log_queue: queue.Queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # 只合并消息参数；异常堆栈转为文本后单独保存，JSON格式化留给监听线程
+        record = copy.copy(record)
+        record.message = record.getMessage()
+        record.msg, record.args = record.message, None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+_state: Dict[str, Any] = {}
+
+
+def setup_logging(path: str = "logs/app.log", level: str = "INFO", max_bytes: int = 10 * 1024 * 1024,
+                  backup_count: int = 5, queue_size: int = 10000, sampling: Optional[Dict[str, float]] = None,
+                  console_level: Optional[str] = "WARNING") -> QueueListener:
+    """
+    配置进程的日志：调用方线程只把日志放入内存队列，由后台线程格式化为JSON并写入按大小轮转的文件
+
+    根日志器只挂载队列处理器，各模块使用 logging.getLogger(__name__) 即可；重复调用时返回已有的监听线程。
+
+    参数:
+        path: 日志文件路径
+        level: 日志级别
+        max_bytes: 单个日志文件的最大大小（字节），超过后轮转
+        backup_count: 保留的轮转文件数
+        queue_size: 内存队列容量，队列满时丢弃新日志
+        sampling: endpoint -> 访问日志保留比例
+        console_level: 同时输出到控制台的最低级别，为None时不输出到控制台
+
+    返回:
+        QueueListener: 写日志的后台监听线程
+    """
+    if "listener" in _state:
+        return _state["listener"]
+
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    file_handler = RotatingFileHandler(path, maxBytes=max_bytes, backupCount=backup_count, encoding="utf-8")
+    file_handler.setFormatter(JSONFormatter())
+    handlers = [file_handler]
+    if console_level:
+        console_handler = logging.StreamHandler()
+        console_handler.setLevel(console_level)
+        console_handler.setFormatter(RedactingFormatter("%(asctime)s %(levelname)s %(name)s: %(message)s"))
+        handlers.append(console_handler)
+
+    queue_handler = NonBlockingQueueHandler(queue.Queue(maxsize=queue_size))
+    sampling_filter = SamplingFilter(sampling)
+    # 采样在放入队列之前进行，被丢弃的日志不占用队列
+    queue_handler.addFilter(sampling_filter)
+
+    root = logging.getLogger()
+    root.setLevel(level)
+    root.addHandler(queue_handler)
+
+    listener = QueueListener(queue_handler.queue, *handlers, respect_handler_level=True)
+    listener.start()
+    # 退出时写完队列中剩余的日志
+    atexit.register(listener.stop)
+    _state.update(listener=listener, queue_handler=queue_handler, sampling_filter=sampling_filter)
+    return listener
+
+
+def logging_stats() -> Dict[str, Any]:
+    """
+    获取日志队列的统计信息
+
+    返回:
+        Dict: 队列中待写入的日志数、因队列满丢弃的日志数、采样丢弃的日志数
+    """
+    queue_handler = _state.get("queue_handler")
+    if queue_handler is None:
+        return {}
+    return {
+        "queued": queue_handler.queue.qsize(),
+        "dropped": queue_handler.dropped,
+        "sampled_out": _state["sampling_filter"].sampled_out,
+    }
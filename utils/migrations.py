@@ -0,0 +1,360 @@
+import logging
+import sqlite3
+from typing import Callable, List
+
+from .expiry import parse_expiry
+from .linkcode import legacy_link_key, register_link_functions
+
+
+logger = logging.getLogger(__name__)
+
+
+def _add_column_if_not_exists(conn: sqlite3.Connection, table_name: str, column_name: str, column_type: str):
+    """
+    检查表是否存在指定列，如果不存在则添加
+
+    参数:
+        conn: 数据库连接
+        table_name: 表名
+        column_name: 列名
+        column_type: 列类型
+    """
+    columns = [column[1] for column in conn.execute(f"PRAGMA table_info({table_name})").fetchall()]
+    if column_name not in columns:
+        conn.execute(f"ALTER TABLE {table_name} ADD COLUMN {column_name} {column_type}")
+        logger.info("已成功添加列 %s 到表 %s", column_name, table_name)
+
+
+def _v1_initial_schema(conn: sqlite3.Connection):
+    """初始表结构，兼容迁移机制引入之前已创建的数据库"""
+    # 1. 网盘驱动表
+    conn.execute('''
+    CREATE TABLE IF NOT EXISTS drive_providers (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        provider_name TEXT UNIQUE NOT NULL,
+        config_vars TEXT NOT NULL,
+        remarks TEXT
+    )
+    ''')
+
+    # 2. 用户网盘表
+    conn.execute('''
+    CREATE TABLE IF NOT EXISTS user_drives (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        provider_name TEXT NOT NULL,
+        login_config TEXT NOT NULL,
+        remarks TEXT,
+        FOREIGN KEY (provider_name) REFERENCES drive_providers (provider_name)
+    )
+    ''')
+
+    # 3. 外链表
+    conn.execute('''
+    CREATE TABLE IF NOT EXISTS external_links (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        drive_id INTEGER NOT NULL,
+        total_quota REAL NOT NULL,
+        used_quota REAL NOT NULL DEFAULT 0,
+        link_uuid TEXT UNIQUE NOT NULL,
+        remarks TEXT,
+        FOREIGN KEY (drive_id) REFERENCES user_drives (id)
+    )
+    ''')
+
+    # 旧版本数据库可能缺少expiry_time列
+    _add_column_if_not_exists(conn, 'external_links', 'expiry_time', 'TEXT')
+
+
+def _v2_login_jobs(conn: sqlite3.Connection):
+    """异步登录任务结果表，供其他工作进程查询任务结果"""
+    conn.execute('''
+    CREATE TABLE IF NOT EXISTS login_jobs (
+        job_id TEXT PRIMARY KEY,
+        state TEXT NOT NULL,
+        result INTEGER,
+        message TEXT,
+        finished_at REAL NOT NULL
+    )
+    ''')
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_login_jobs_finished_at ON login_jobs (finished_at)")
+
+
+def _v3_drive_pools(conn: sqlite3.Connection):
+    """网盘账号池：外链可以绑定同一服务商的一组账号"""
+    conn.execute('''
+    CREATE TABLE IF NOT EXISTS drive_pools (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        pool_name TEXT UNIQUE NOT NULL,
+        provider_name TEXT NOT NULL,
+        strategy TEXT NOT NULL DEFAULT 'round_robin',
+        remarks TEXT,
+        FOREIGN KEY (provider_name) REFERENCES drive_providers (provider_name)
+    )
+    ''')
+    conn.execute('''
+    CREATE TABLE IF NOT EXISTS drive_pool_members (
+        pool_id INTEGER NOT NULL,
+        drive_id INTEGER NOT NULL,
+        PRIMARY KEY (pool_id, drive_id),
+        FOREIGN KEY (pool_id) REFERENCES drive_pools (id),
+        FOREIGN KEY (drive_id) REFERENCES user_drives (id)
+    )
+    ''')
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_drive_pool_members_drive_id ON drive_pool_members (drive_id)")
+    # 绑定账号池的外链仍保留drive_id（账号池创建外链时的首个账号），兼容按账号查询外链的逻辑
+    _add_column_if_not_exists(conn, 'external_links', 'pool_id', 'INTEGER REFERENCES drive_pools (id)')
+
+
+def _v4_link_events(conn: sqlite3.Connection):
+    """外链访问与登录事件日志，只追加不修改"""
+    conn.execute('''
+    CREATE TABLE IF NOT EXISTS link_events (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        ts REAL NOT NULL,
+        event TEXT NOT NULL,
+        link_uuid TEXT NOT NULL,
+        drive_id INTEGER,
+        provider_name TEXT,
+        outcome TEXT NOT NULL,
+        latency_ms REAL
+    )
+    ''')
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_link_events_ts ON link_events (ts)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_link_events_link_uuid ON link_events (link_uuid, ts)")
+
+
+def _v5_link_rollups(conn: sqlite3.Connection):
+    """按分钟、小时、天预聚合的外链访问统计，granularity为桶宽度（秒）"""
+    conn.execute('''
+    CREATE TABLE IF NOT EXISTS link_rollups (
+        granularity INTEGER NOT NULL,
+        bucket INTEGER NOT NULL,
+        link_uuid TEXT NOT NULL,
+        drive_id INTEGER NOT NULL DEFAULT 0,
+        provider_name TEXT,
+        views INTEGER NOT NULL DEFAULT 0,
+        views_ok INTEGER NOT NULL DEFAULT 0,
+        logins INTEGER NOT NULL DEFAULT 0,
+        logins_success INTEGER NOT NULL DEFAULT 0,
+        login_ms REAL NOT NULL DEFAULT 0,
+        PRIMARY KEY (granularity, bucket, link_uuid, drive_id)
+    )
+    ''')
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_link_rollups_bucket ON link_rollups (bucket)")
+
+
+def _v6_expiry_epoch(conn: sqlite3.Connection):
+    """过期时间改存UTC整数时间戳，并建立覆盖活跃外链判断的复合索引"""
+    _add_column_if_not_exists(conn, 'external_links', 'expiry_epoch', 'INTEGER')
+    # 旧数据中不带时区的时间按UTC处理，无法解析的记为0（已过期）
+    rows = conn.execute("SELECT id, expiry_time FROM external_links").fetchall()
+    conn.executemany(
+        "UPDATE external_links SET expiry_epoch = ? WHERE id = ?",
+        [(parse_expiry(expiry_time), link_id) for link_id, expiry_time in rows]
+    )
+    conn.execute(
+        "CREATE INDEX IF NOT EXISTS idx_external_links_expiry ON external_links (expiry_epoch, used_quota, total_quota)"
+    )
+
+
+def _v7_links_archive(conn: sqlite3.Connection):
+    """已过期或用尽的外链归档表，以及记录配额用尽时间的exhausted_at列"""
+    _add_column_if_not_exists(conn, 'external_links', 'exhausted_at', 'INTEGER')
+    # 迁移前已用尽的外链从迁移时开始计算保留时间
+    conn.execute(
+        "UPDATE external_links SET exhausted_at = CAST(strftime('%s', 'now') AS INTEGER) "
+        "WHERE used_quota >= total_quota AND exhausted_at IS NULL"
+    )
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_external_links_exhausted_at ON external_links (exhausted_at)")
+    conn.execute('''
+    CREATE TABLE IF NOT EXISTS external_links_archive (
+        id INTEGER PRIMARY KEY,
+        drive_id INTEGER NOT NULL,
+        total_quota REAL NOT NULL,
+        used_quota REAL NOT NULL,
+        link_uuid TEXT NOT NULL,
+        remarks TEXT,
+        expiry_time TEXT,
+        pool_id INTEGER,
+        expiry_epoch INTEGER,
+        exhausted_at INTEGER,
+        archived_at INTEGER NOT NULL,
+        archive_reason TEXT NOT NULL
+    )
+    ''')
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_external_links_archive_link_uuid ON external_links_archive (link_uuid)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_external_links_archive_archived_at ON external_links_archive (archived_at)")
+
+
+def _copy_links_table(conn: sqlite3.Connection, table_name: str, extra_columns: str = ""):
+    """
+    将旧外链表的数据复制到 {table_name}_new 并替换旧表，UUID转换为外链标识，配额取整
+
+    参数:
+        conn: 数据库连接
+        table_name: external_links 或 external_links_archive
+        extra_columns: 表特有的列
+    """
+    conn.execute(f'''
+    INSERT INTO {table_name}_new
+    SELECT id, drive_id, pool_id, legacy_link_key(link_uuid), CAST(ROUND(total_quota) AS INTEGER),
+           CAST(ROUND(used_quota) AS INTEGER), remarks, expiry_time, expiry_epoch, exhausted_at{extra_columns}
+    FROM {table_name}
+    ''')
+    conn.execute(f"DROP TABLE {table_name}")
+    conn.execute(f"ALTER TABLE {table_name}_new RENAME TO {table_name}")
+
+
+def _v8_compact_link_keys(conn: sqlite3.Connection):
+    """
+    外链标识由36位TEXT格式的UUID改为BLOB，公开链接使用base62短码，配额列改为整数
+
+    旧UUID直接转换为16字节标识，原有的 /exlink/<uuid> 链接仍可访问；
+    事件日志和统计表中的外链UUID同步改写为短码。
+    """
+    conn.create_function("legacy_link_key", 1, legacy_link_key, deterministic=True)
+    register_link_functions(conn)
+    # 删除表会同时删除自增序列，先保存以免已归档外链的ID被重新分配
+    sequence = conn.execute("SELECT seq FROM sqlite_sequence WHERE name = 'external_links'").fetchone()
+    conn.execute('''
+    CREATE TABLE external_links_new (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        drive_id INTEGER NOT NULL,
+        pool_id INTEGER,
+        link_key BLOB NOT NULL,
+        total_quota INTEGER NOT NULL,
+        used_quota INTEGER NOT NULL DEFAULT 0,
+        remarks TEXT,
+        expiry_time TEXT,
+        expiry_epoch INTEGER,
+        exhausted_at INTEGER,
+        FOREIGN KEY (drive_id) REFERENCES user_drives (id),
+        FOREIGN KEY (pool_id) REFERENCES drive_pools (id)
+    )
+    ''')
+    _copy_links_table(conn, "external_links")
+    if sequence:
+        conn.execute("DELETE FROM sqlite_sequence WHERE name = 'external_links'")
+        conn.execute("INSERT INTO sqlite_sequence (name, seq) VALUES ('external_links', ?)", (sequence[0],))
+    conn.execute("CREATE UNIQUE INDEX idx_external_links_link_key ON external_links (link_key)")
+    conn.execute("CREATE INDEX idx_external_links_expiry ON external_links (expiry_epoch, used_quota, total_quota)")
+    conn.execute("CREATE INDEX idx_external_links_exhausted_at ON external_links (exhausted_at)")
+
+    conn.execute('''
+    CREATE TABLE external_links_archive_new (
+        id INTEGER PRIMARY KEY,
+        drive_id INTEGER NOT NULL,
+        pool_id INTEGER,
+        link_key BLOB NOT NULL,
+        total_quota INTEGER NOT NULL,
+        used_quota INTEGER NOT NULL,
+        remarks TEXT,
+        expiry_time TEXT,
+        expiry_epoch INTEGER,
+        exhausted_at INTEGER,
+        archived_at INTEGER NOT NULL,
+        archive_reason TEXT NOT NULL
+    )
+    ''')
+    _copy_links_table(conn, "external_links_archive", ", archived_at, archive_reason")
+    conn.execute("CREATE INDEX idx_external_links_archive_link_key ON external_links_archive (link_key)")
+    conn.execute("CREATE INDEX idx_external_links_archive_archived_at ON external_links_archive (archived_at)")
+
+    conn.execute("DROP INDEX IF EXISTS idx_link_events_link_uuid")
+    for table_name in ("link_events", "link_rollups"):
+        conn.execute(f"ALTER TABLE {table_name} RENAME COLUMN link_uuid TO link_code")
+        conn.execute(f"UPDATE {table_name} SET link_code = link_code(legacy_link_key(link_code))")
+    conn.execute("CREATE INDEX idx_link_events_link_code ON link_events (link_code, ts)")
+
+
+def _v9_row_versions(conn: sqlite3.Connection):
+    """服务商和用户网盘增加版本号，每次更新递增，用于缓存解析后的配置"""
+    _add_column_if_not_exists(conn, 'drive_providers', 'version', 'INTEGER NOT NULL DEFAULT 1')
+    _add_column_if_not_exists(conn, 'user_drives', 'version', 'INTEGER NOT NULL DEFAULT 1')
+
+
+# 按顺序排列的迁移列表，第 N 项执行后 user_version 即为 N
+# 已发布的迁移不可修改，结构变更只能追加新的迁移
+MIGRATIONS: List[Callable[[sqlite3.Connection], None]] = [
+    _v1_initial_schema,
+    _v2_login_jobs,
+    _v3_drive_pools,
+    _v4_link_events,
+    _v5_link_rollups,
+    _v6_expiry_epoch,
+    _v7_links_archive,
+    _v8_compact_link_keys,
+    _v9_row_versions,
+]
+
+
+def get_schema_version(conn: sqlite3.Connection) -> int:
+    """
+    获取数据库当前的结构版本
+
+    参数:
+        conn: 数据库连接
+
+    返回:
+        int: PRAGMA user_version 的值
+    """
+    return conn.execute("PRAGMA user_version").fetchone()[0]
+
+
+def run_migrations(conn: sqlite3.Connection) -> int:
+    """
+    将数据库升级到最新结构版本
+
+    每个迁移在独立的 BEGIN IMMEDIATE 事务中执行，并在拿到写锁后重新检查版本号，
+    多个进程同时启动时只有一个会真正执行迁移。
+
+    参数:
+        conn: 数据库连接
+
+    返回:
+        int: 迁移完成后的结构版本
+    """
+    target = len(MIGRATIONS)
+    if get_schema_version(conn) >= target:
+        return get_schema_version(conn)
+
+    for version in range(1, target + 1):
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            if get_schema_version(conn) >= version:
+                conn.rollback()
+                continue
+            MIGRATIONS[version - 1](conn)
+            conn.execute(f"PRAGMA user_version = {version}")
+            conn.commit()
+            logger.info("数据库结构已升级到版本 %s", version)
+        except Exception:
+            conn.rollback()
+            raise
+    return get_schema_version(conn)
+
+
+def enable_incremental_vacuum(conn: sqlite3.Connection) -> bool:
+    """
+    将数据库切换为增量回收空闲页模式
+
+    切换 auto_vacuum 需要执行一次完整的 VACUUM，只能在事务之外进行，因此不放在版本化迁移中。
+    已经是增量模式时直接返回；其他进程正在使用数据库导致 VACUUM 失败时跳过，下次启动再试。
+
+    参数:
+        conn: 不在事务中的数据库连接
+
+    返回:
+        bool: 数据库是否已处于增量回收模式
+    """
+    # 0: NONE, 1: FULL, 2: INCREMENTAL
+    if conn.execute("PRAGMA auto_vacuum").fetchone()[0] == 2:
+        return True
+    conn.execute("PRAGMA auto_vacuum = INCREMENTAL")
+    try:
+        conn.execute("VACUUM")
+    except sqlite3.OperationalError as e:
+        logger.warning("切换增量回收模式失败，下次启动时重试: %s", e)
+        return False
+    logger.info("数据库已切换为增量回收模式")
+    return True
@@ -0,0 +1,144 @@
+import queue
+import sqlite3
+import threading
+from typing import Dict, Any
+
+from .migrations import run_migrations, enable_incremental_vacuum
+from .linkcode import register_link_functions
+
+
+def configure_connection(conn: sqlite3.Connection):
+    """
+    设置每个连接都需要的PRAGMA，并注册自定义SQL函数
+
+    参数:
+        conn: 数据库连接
+    """
+    # WAL模式下NORMAL同步级别不会损坏数据库，只在断电时可能丢失最近的提交
+    conn.execute("PRAGMA synchronous = NORMAL")
+    conn.execute("PRAGMA busy_timeout = 5000")
+    register_link_functions(conn)
+
+
+class ConnectionPool:
+    """
+    SQLite只读连接池，连接在创建时完成初始化，之后在请求之间复用
+
+    数据库使用WAL模式，读连接不会被写事务阻塞；所有写操作由写队列（utils.writer）完成。
+    """
+
+    def __init__(self, db_path: str, max_size: int = 8):
+        """
+        初始化连接池并执行数据库迁移
+
+        参数:
+            db_path: 数据库文件路径
+            max_size: 池中保留的最大空闲连接数
+        """
+        self.db_path = db_path
+        self.max_size = max_size
+        self._idle = queue.LifoQueue(maxsize=max_size)
+        self._lock = threading.Lock()
+        self._created = 0
+        self._reused = 0
+
+        conn = sqlite3.connect(db_path)
+        try:
+            # journal_mode 会持久化到数据库文件，只需在启动时设置一次
+            conn.execute("PRAGMA journal_mode = WAL")
+            configure_connection(conn)
+            self.schema_version = run_migrations(conn)
+            # 归档任务删除外链后通过 incremental_vacuum 归还空闲页
+            enable_incremental_vacuum(conn)
+        finally:
+            conn.close()
+
+    def _connect(self) -> sqlite3.Connection:
+        """创建一个新的数据库连接"""
+        # 连接可能在线程之间传递（例如Flask的线程模式），由连接池保证同一时刻只有一个使用者
+        conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        conn.row_factory = sqlite3.Row
+        configure_connection(conn)
+        conn.execute("PRAGMA query_only = 1")
+        with self._lock:
+            self._created += 1
+        return conn
+
+    def acquire(self) -> sqlite3.Connection:
+        """
+        从池中取出一个可用连接，池为空时新建连接
+
+        返回:
+            sqlite3.Connection: 数据库连接
+        """
+        try:
+            conn = self._idle.get_nowait()
+        except queue.Empty:
+            return self._connect()
+        with self._lock:
+            self._reused += 1
+        return conn
+
+    def release(self, conn: sqlite3.Connection):
+        """
+        将连接归还到池中，池已满时直接关闭
+
+        参数:
+            conn: 数据库连接
+        """
+        try:
+            # 丢弃使用者遗留的未提交事务，避免下一个使用者继承
+            if conn.in_transaction:
+                conn.rollback()
+            self._idle.put_nowait(conn)
+        except queue.Full:
+            conn.close()
+        except sqlite3.Error:
+            conn.close()
+
+    def close(self):
+        """关闭池中所有空闲连接"""
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except queue.Empty:
+                break
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        获取连接池统计信息
+
+        返回:
+            Dict: 空闲连接数、累计创建数和复用次数
+        """
+        return {
+            "idle": self._idle.qsize(),
+            "max_size": self.max_size,
+            "created": self._created,
+            "reused": self._reused,
+            "schema_version": self.schema_version,
+        }
+
+
+_pools: Dict[str, ConnectionPool] = {}
+_pools_lock = threading.Lock()
+
+
+def get_pool(db_path: str, max_size: int = 8) -> ConnectionPool:
+    """
+    获取指定数据库的进程级连接池，首次调用时创建并执行迁移
+
+    参数:
+        db_path: 数据库文件路径
+        max_size: 池中保留的最大空闲连接数，仅首次创建时生效
+
+    返回:
+        ConnectionPool: 连接池
+    """
+    pool = _pools.get(db_path)
+    if pool is None:
+        with _pools_lock:
+            pool = _pools.get(db_path)
+            if pool is None:
+                pool = _pools[db_path] = ConnectionPool(db_path, max_size)
+    return pool
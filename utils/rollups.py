@@ -0,0 +1,186 @@
+import sqlite3
+import time
+from typing import Any, Dict, Iterable, List, Optional
+
+
+# 统计粒度名称与桶宽度（秒）
+GRANULARITIES = {"minute": 60, "hour": 3600, "day": 86400}
+
+# 压缩参数，可在启动时通过 configure_rollups 调整
+_rollup_options = {
+    "minute_retention": 6 * 3600,
+    "hour_retention": 30 * 86400,
+    "compact_interval": 300,
+    "event_retention": 30 * 86400,
+}
+
+# 单次删除的过期事件数上限
+PRUNE_BATCH_SIZE = 5000
+
+_UPSERT_SQL = """
+INSERT INTO link_rollups (granularity, bucket, link_code, drive_id, provider_name, views, views_ok, logins, logins_success, login_ms)
+{source}
+ON CONFLICT (granularity, bucket, link_code, drive_id) DO UPDATE SET
+    provider_name = COALESCE(excluded.provider_name, provider_name),
+    views = views + excluded.views,
+    views_ok = views_ok + excluded.views_ok,
+    logins = logins + excluded.logins,
+    logins_success = logins_success + excluded.logins_success,
+    login_ms = login_ms + excluded.login_ms
+"""
+
+
+def configure_rollups(**options):
+    """
+    设置统计压缩参数
+
+    参数:
+        options: minute_retention（分钟桶保留秒数）、hour_retention（小时桶保留秒数）、compact_interval（压缩间隔秒数）、
+            event_retention（原始事件保留秒数，为0时不删除）
+    """
+    _rollup_options.update(options)
+
+
+def get_rollup_option(name: str) -> Any:
+    """获取统计压缩参数"""
+    return _rollup_options[name]
+
+
+def apply_events(conn: sqlite3.Connection, events: Iterable[tuple]) -> int:
+    """
+    将一批事件累加到分钟统计桶，需在写队列中执行
+
+    参数:
+        conn: 写连接
+        events: (ts, event, link_code, drive_id, provider_name, outcome, latency_ms) 列表
+
+    返回:
+        int: 更新的统计桶数
+    """
+    buckets: Dict[tuple, list] = {}
+    for ts, event, link_code, drive_id, provider_name, outcome, latency_ms in events:
+        key = (60, int(ts) // 60 * 60, link_code, drive_id or 0)
+        counters = buckets.get(key)
+        if counters is None:
+            counters = buckets[key] = [provider_name, 0, 0, 0, 0, 0.0]
+        if event == "view":
+            counters[1] += 1
+            if outcome == "ok":
+                counters[2] += 1
+        elif event == "login":
+            counters[3] += 1
+            if outcome == "success":
+                counters[4] += 1
+            counters[5] += latency_ms or 0
+    conn.executemany(
+        _UPSERT_SQL.format(source="VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)"),
+        [key + tuple(counters) for key, counters in buckets.items()]
+    )
+    return len(buckets)
+
+
+def _merge(conn: sqlite3.Connection, source: int, target: int, cutoff: int) -> int:
+    """把 bucket < cutoff 的细粒度统计桶合并到粗粒度桶并删除"""
+    conn.execute(
+        _UPSERT_SQL.format(source=f"""
+        SELECT ?, bucket / {target} * {target} AS merged, link_code, drive_id, MAX(provider_name),
+               SUM(views), SUM(views_ok), SUM(logins), SUM(logins_success), SUM(login_ms)
+        FROM link_rollups WHERE granularity = ? AND bucket < ?
+        GROUP BY merged, link_code, drive_id
+        """),
+        (target, source, cutoff)
+    )
+    return conn.execute("DELETE FROM link_rollups WHERE granularity = ? AND bucket < ?", (source, cutoff)).rowcount
+
+
+def compact_rollups(conn: sqlite3.Connection, now: Optional[float] = None) -> int:
+    """
+    将超过保留时间的分钟桶合并为小时桶、小时桶合并为天桶，需在写队列中执行
+
+    只合并完整的小时和天，合并与删除在同一事务中完成，多个进程重复执行不会重复计数。
+
+    参数:
+        conn: 写连接
+        now: 当前时间戳，默认取系统时间
+
+    返回:
+        int: 被合并删除的统计桶数
+    """
+    now = int(now if now is not None else time.time())
+    merged = _merge(conn, 60, 3600, (now - _rollup_options["minute_retention"]) // 3600 * 3600)
+    merged += _merge(conn, 3600, 86400, (now - _rollup_options["hour_retention"]) // 86400 * 86400)
+    return merged
+
+
+def prune_events(conn: sqlite3.Connection, now: Optional[float] = None, limit: int = PRUNE_BATCH_SIZE) -> int:
+    """
+    删除超过保留时间的原始事件，需在写队列中执行
+
+    事件写入时已在同一事务中累加到统计桶，删除原始事件不影响访问趋势。只删除完整的天，
+    且每次最多删除limit条，调用方重复调用直到返回值小于limit，避免长时间占用写线程。
+
+    参数:
+        conn: 写连接
+        now: 当前时间戳，默认取系统时间
+        limit: 单次最多删除的事件数
+
+    返回:
+        int: 删除的事件数
+    """
+    retention = _rollup_options["event_retention"]
+    if not retention:
+        return 0
+    now = int(now if now is not None else time.time())
+    cutoff = (now - retention) // 86400 * 86400
+    return conn.execute(
+        "DELETE FROM link_events WHERE id IN (SELECT id FROM link_events WHERE ts < ? ORDER BY ts LIMIT ?)",
+        (cutoff, limit)
+    ).rowcount
+
+
+def query_access_trend(conn: sqlite3.Connection, start: int, end: int, step: int,
+                       link_code: Optional[str] = None, drive_id: Optional[int] = None,
+                       provider_name: Optional[str] = None) -> List[Dict[str, Any]]:
+    """
+    从统计桶查询访问趋势
+
+    已压缩为粗粒度的时间段，其数据落在粗粒度桶的起始时间点上。
+
+    参数:
+        conn: 数据库连接
+        start: 开始时间戳（包含）
+        end: 结束时间戳（不包含）
+        step: 每个数据点的时间跨度（秒）
+        link_code: 只统计指定外链
+        drive_id: 只统计指定网盘
+        provider_name: 只统计指定服务商
+
+    返回:
+        List: 按时间排列的数据点，没有数据的时间点补零
+    """
+    start = start // step * step
+    conditions = ["bucket >= ?", "bucket < ?"]
+    params: list = [start, end]
+    for column, value in (("link_code", link_code), ("drive_id", drive_id), ("provider_name", provider_name)):
+        if value is not None:
+            conditions.append(f"{column} = ?")
+            params.append(value)
+    rows = conn.execute(
+        f"SELECT bucket / {int(step)} * {int(step)} AS t, SUM(views), SUM(views_ok), SUM(logins), SUM(logins_success), SUM(login_ms) "
+        f"FROM link_rollups WHERE {' AND '.join(conditions)} GROUP BY t",
+        params
+    ).fetchall()
+    values = {row[0]: row[1:] for row in rows}
+
+    points = []
+    for t in range(start, end, step):
+        views, views_ok, logins, logins_success, login_ms = values.get(t, (0, 0, 0, 0, 0))
+        points.append({
+            "t": t,
+            "views": views,
+            "views_ok": views_ok,
+            "logins": logins,
+            "logins_success": logins_success,
+            "avg_login_ms": round(login_ms / logins, 1) if logins else 0,
+        })
+    return points
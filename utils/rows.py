@@ -0,0 +1,153 @@
+import json
+import threading
+from typing import Any, Hashable, Iterable, Optional
+
+from .cache import TTLCache
+
+
+# 已解析的JSON列，键为 (表名, 行标识, 行版本号, 列名)；版本号在每次更新时递增，条目不会过期
+_decoded = TTLCache(maxsize=4096, ttl=float("inf"))
+# 行对象可能在缓存中被多个线程共享，只在首次解析时加锁
+_decode_lock = threading.Lock()
+
+
+def configure_json_memo(maxsize: int = 4096):
+    """
+    设置已解析JSON列的缓存容量，需在首次查询前调用
+
+    参数:
+        maxsize: 最多缓存的解析结果数
+    """
+    global _decoded
+    _decoded = TTLCache(maxsize=maxsize, ttl=float("inf"))
+
+
+def json_memo_stats():
+    """
+    获取已解析JSON列缓存的统计信息
+
+    返回:
+        Dict: 缓存统计
+    """
+    stats = _decoded.stats()
+    # 条目不会过期，去掉无穷大的ttl以便输出为合法JSON
+    stats.pop("ttl", None)
+    return stats
+
+
+class LazyJSONRow(dict):
+    """
+    JSON列延迟解析的查询结果行
+
+    JSON列先以原始文本保存，首次读取该列时才解析，未使用配置的调用方不再付出json.loads的开销。
+    提供行标识和版本号时，解析结果按 (表名, 行标识, 版本号) 在进程内共享，同一版本只解析一次；
+    共享的解析结果不应被调用方修改。
+    """
+    __slots__ = ("_pending", "_memo_key")
+
+    def __init__(self, row, json_columns: Iterable[str], memo_key: Optional[Hashable] = None):
+        """
+        参数:
+            row: 查询结果行（sqlite3.Row 或 dict）
+            json_columns: 需要延迟解析的列
+            memo_key: 行标识与版本号，如 ("user_drives", 1, 3)，为None时不共享解析结果
+        """
+        super().__init__(row)
+        self._pending = {column for column in json_columns if column in self}
+        self._memo_key = memo_key
+
+    def _decode(self, column: str):
+        """解析指定的JSON列并写回，先写回解析结果再移出待解析集合"""
+        with _decode_lock:
+            if column in self._pending:
+                raw = dict.__getitem__(self, column)
+                key = self._memo_key + (column,) if self._memo_key is not None else None
+                value = _decoded.get(key) if key is not None else None
+                if value is None:
+                    value = json.loads(raw) if raw is not None else None
+                    if key is not None and value is not None:
+                        _decoded.set(key, value)
+                dict.__setitem__(self, column, value)
+                self._pending.discard(column)
+        return dict.__getitem__(self, column)
+
+    def _decode_all(self):
+        for column in list(self._pending):
+            self._decode(column)
+
+    def __getitem__(self, key):
+        if key in self._pending:
+            return self._decode(key)
+        return dict.__getitem__(self, key)
+
+    def __setitem__(self, key, value):
+        with _decode_lock:
+            dict.__setitem__(self, key, value)
+            self._pending.discard(key)
+
+    def get(self, key, default=None):
+        return self[key] if key in self else default
+
+    def __iter__(self):
+        # 覆盖 __iter__ 使 dict(row) 和 {**row} 经过 keys() 与 __getitem__，不会复制未解析的原始文本
+        return dict.__iter__(self)
+
+    def items(self):
+        self._decode_all()
+        return dict.items(self)
+
+    def values(self):
+        self._decode_all()
+        return dict.values(self)
+
+    def copy(self):
+        return dict(self.items())
+
+    def __eq__(self, other):
+        self._decode_all()
+        return dict.__eq__(self, other)
+
+    __hash__ = None
+
+    def __repr__(self):
+        self._decode_all()
+        return dict.__repr__(self)
+
+    def is_decoded(self, column: str) -> bool:
+        """
+        判断指定的JSON列是否已经解析
+
+        参数:
+            column: 列名
+
+        返回:
+            bool: 是否已解析
+        """
+        return column not in self._pending
+
+
+def drive_row(row) -> Any:
+    """
+    将 user_drives 查询结果转换为延迟解析login_config的行
+
+    参数:
+        row: 查询结果行，需包含id和version
+
+    返回:
+        LazyJSONRow: 用户网盘信息
+    """
+    return LazyJSONRow(row, ("login_config",), ("user_drives", row["id"], row["version"]))
+
+
+def provider_row(row) -> Any:
+    """
+    将 drive_providers 查询结果转换为延迟解析config_vars的行
+
+    参数:
+        row: 查询结果行，需包含id和version
+
+    返回:
+        LazyJSONRow: 服务商信息
+    """
+    # 按自增ID而不是服务商名称区分，删除后重新添加的同名服务商不会读到旧的解析结果
+    return LazyJSONRow(row, ("config_vars",), ("drive_providers", row["id"], row["version"]))
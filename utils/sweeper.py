@@ -0,0 +1,125 @@
+import logging
+import threading
+import time
+from typing import Any, Dict, Optional
+
+from .database import CloudDriveDatabase
+
+
+logger = logging.getLogger(__name__)
+
+
+class LinkSweeper:
+    """
+    外链归档任务
+
+    后台线程定期把过期或配额用尽超过保留时间的外链分批移入归档表，
+    批次之间暂停以限制对写队列的占用，每轮结束后执行增量回收归还空闲页。
+    """
+
+    def __init__(self, db_path: str, retention: float = 7 * 86400, interval: float = 300,
+                 batch_size: int = 200, max_batches: int = 50, pause: float = 0.1, vacuum_pages: int = 1000):
+        """
+        初始化归档任务并启动后台线程
+
+        参数:
+            db_path: 数据库文件路径
+            retention: 外链过期或用尽后在主表中保留的秒数
+            interval: 两轮归档之间的间隔（秒）
+            batch_size: 每个写事务最多归档的外链数
+            max_batches: 每轮最多执行的批次数
+            pause: 批次之间的暂停时间（秒）
+            vacuum_pages: 每轮最多归还的空闲页数，0表示全部
+        """
+        self.db_path = db_path
+        self.retention = retention
+        self.interval = interval
+        self.batch_size = batch_size
+        self.max_batches = max_batches
+        self.pause = pause
+        self.vacuum_pages = vacuum_pages
+        self.runs = 0
+        self.archived = 0
+        self.last_run_at: Optional[float] = None
+        self.last_run_ms = 0.0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._loop, name="link-sweeper", daemon=True)
+        self._thread.start()
+
+    def _loop(self):
+        """后台线程主循环"""
+        while not self._stop.wait(self.interval):
+            try:
+                self.run_once()
+            except Exception:
+                logger.exception("外链归档任务执行失败")
+
+    def run_once(self) -> int:
+        """
+        执行一轮归档
+
+        返回:
+            int: 本轮归档的外链数
+        """
+        start = time.perf_counter()
+        total = 0
+        db = CloudDriveDatabase(self.db_path)
+        try:
+            for _ in range(self.max_batches):
+                archived = db.archive_dead_links(self.retention, self.batch_size)
+                total += archived
+                if archived < self.batch_size or self._stop.is_set():
+                    break
+                self._stop.wait(self.pause)
+            if total:
+                db.incremental_vacuum(self.vacuum_pages)
+        finally:
+            db.close()
+        self.runs += 1
+        self.archived += total
+        self.last_run_at = time.time()
+        self.last_run_ms = (time.perf_counter() - start) * 1000
+        return total
+
+    def stop(self):
+        """停止后台线程"""
+        self._stop.set()
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        获取归档任务统计信息
+
+        返回:
+            Dict: 执行轮数、累计归档数、最近一轮的时间与耗时
+        """
+        return {
+            "retention": self.retention,
+            "runs": self.runs,
+            "archived": self.archived,
+            "last_run_at": self.last_run_at,
+            "last_run_ms": round(self.last_run_ms, 2),
+        }
+
+
+_sweepers: Dict[str, LinkSweeper] = {}
+_sweepers_lock = threading.Lock()
+
+
+def get_sweeper(db_path: str, **options) -> LinkSweeper:
+    """
+    获取指定数据库的进程级归档任务，首次调用时创建并启动
+
+    参数:
+        db_path: 数据库文件路径
+        options: LinkSweeper 的参数，仅首次创建时生效
+
+    返回:
+        LinkSweeper: 归档任务
+    """
+    sweeper = _sweepers.get(db_path)
+    if sweeper is None:
+        with _sweepers_lock:
+            sweeper = _sweepers.get(db_path)
+            if sweeper is None:
+                sweeper = _sweepers[db_path] = LinkSweeper(db_path, **options)
+    return sweeper
@@ -0,0 +1,150 @@
+import base64
+import hashlib
+import hmac
+import re
+import struct
+import time
+from typing import Any, Dict, Optional
+
+from .linkcode import MIN_KEY_BYTES, MAX_KEY_BYTES, decode_link_code, encode_link_key
+
+
+# 签名截断为16字节，base64编码后22位
+SIGNATURE_BYTES = 16
+_KEY_ID_PATTERN = re.compile(r'^[A-Za-z0-9_-]{1,16}$')
+_TAIL = struct.Struct(">QQ")
+# 密钥的最小长度（字节），以及配置文件示例中的占位密钥，使用它们签发的令牌可以被任何人伪造
+MIN_SECRET_BYTES = 16
+PLACEHOLDER_SECRETS = frozenset({"replace-with-your-secure-key", "replace-with-random-secret"})
+
+
+class InvalidToken(Exception):
+    """外链令牌格式错误、签名无效、密钥未知或已过期"""
+
+    def __init__(self, reason: str):
+        """
+        参数:
+            reason: malformed、unknown_key、bad_signature 或 expired
+        """
+        super().__init__(reason)
+        self.reason = reason
+
+
+def _b64encode(data: bytes) -> str:
+    return base64.urlsafe_b64encode(data).rstrip(b'=').decode('ascii')
+
+
+def _b64decode(text: str) -> bytes:
+    return base64.urlsafe_b64decode(text + '=' * (-len(text) % 4))
+
+
+class LinkSigner:
+    """
+    外链令牌的签发与校验
+
+    令牌格式为 {密钥ID}.{载荷}.{签名}，载荷包含外链标识、网盘ID和过期时间戳，
+    签名为HMAC-SHA256。校验只做内存计算，伪造或过期的令牌不需要访问数据库即可拒绝。
+    轮换密钥时新增一个密钥并设为签发密钥，旧密钥在其签发的令牌全部过期前保留用于校验。
+    """
+
+    def __init__(self, keys: Dict[str, str], active_key: Optional[str] = None):
+        """
+        参数:
+            keys: 密钥ID -> 密钥（str或bytes），密钥ID只能包含字母、数字、下划线和连字符
+            active_key: 签发新令牌使用的密钥ID，默认为keys中的第一个
+
+        异常:
+            ValueError: 没有密钥、密钥ID无效，或密钥为占位值、长度不足 MIN_SECRET_BYTES
+        """
+        if not keys:
+            raise ValueError("至少需要一个令牌密钥")
+        for key_id, secret in keys.items():
+            if not _KEY_ID_PATTERN.match(key_id):
+                raise ValueError(f"无效的令牌密钥ID: {key_id}")
+            secret = secret.decode('utf-8', 'replace') if isinstance(secret, bytes) else str(secret or '')
+            if secret in PLACEHOLDER_SECRETS or len(secret.encode('utf-8')) < MIN_SECRET_BYTES:
+                raise ValueError(f"令牌密钥 {key_id} 为占位值或长度不足{MIN_SECRET_BYTES}字节")
+        self.active_key = active_key or next(iter(keys))
+        if self.active_key not in keys:
+            raise ValueError(f"签发密钥 {self.active_key} 不在密钥列表中")
+        # 预先计算每个密钥的HMAC状态，签名时只需复制
+        self._macs = {
+            key_id: hmac.new(secret if isinstance(secret, bytes) else secret.encode('utf-8'), digestmod=hashlib.sha256)
+            for key_id, secret in keys.items()
+        }
+
+    def _signature(self, key_id: str, signed: str) -> bytes:
+        mac = self._macs[key_id].copy()
+        mac.update(signed.encode('ascii'))
+        return mac.digest()[:SIGNATURE_BYTES]
+
+    def sign(self, link_code: str, drive_id: int, expiry_epoch: Optional[int]) -> str:
+        """
+        签发外链令牌
+
+        参数:
+            link_code: 外链短码
+            drive_id: 外链关联的网盘ID
+            expiry_epoch: 外链过期时间戳，None表示永不过期
+
+        返回:
+            str: 外链令牌
+        """
+        link_key = decode_link_code(link_code)
+        if link_key is None:
+            raise ValueError("外链短码格式无效")
+        payload = _b64encode(link_key + _TAIL.pack(int(drive_id), int(expiry_epoch or 0)))
+        signed = f"{self.active_key}.{payload}"
+        return f"{signed}.{_b64encode(self._signature(self.active_key, signed))}"
+
+    def verify(self, token: str, now: Optional[float] = None) -> Dict[str, Any]:
+        """
+        校验外链令牌
+
+        参数:
+            token: 外链令牌
+            now: 当前时间戳，默认为当前时间
+
+        返回:
+            Dict: link_code、drive_id、expiry_epoch（永不过期时为None）、key_id
+
+        异常:
+            InvalidToken: 令牌无效或已过期
+        """
+        parts = token.split('.') if isinstance(token, str) else ()
+        if len(parts) != 3:
+            raise InvalidToken("malformed")
+        key_id, payload, signature = parts
+        if key_id not in self._macs:
+            raise InvalidToken("unknown_key")
+        try:
+            expected = _b64decode(signature)
+            data = _b64decode(payload)
+        except ValueError:
+            raise InvalidToken("malformed")
+        if not hmac.compare_digest(expected, self._signature(key_id, f"{key_id}.{payload}")):
+            raise InvalidToken("bad_signature")
+        if not MIN_KEY_BYTES <= len(data) - _TAIL.size <= MAX_KEY_BYTES:
+            raise InvalidToken("malformed")
+        drive_id, expiry_epoch = _TAIL.unpack(data[-_TAIL.size:])
+        if expiry_epoch and expiry_epoch <= (now if now is not None else time.time()):
+            raise InvalidToken("expired")
+        return {
+            "link_code": encode_link_key(data[:-_TAIL.size]),
+            "drive_id": drive_id,
+            "expiry_epoch": expiry_epoch or None,
+            "key_id": key_id,
+        }
+
+
+def is_link_token(value: str) -> bool:
+    """
+    判断外链地址中的ID是否为令牌，短码和旧版UUID都不包含点号
+
+    参数:
+        value: 外链地址中的ID
+
+    返回:
+        bool: 是否为令牌格式
+    """
+    return '.' in value
@@ -0,0 +1,254 @@
+import atexit
+import logging
+import queue
+import sqlite3
+import threading
+from concurrent.futures import Future, TimeoutError
+from typing import Callable, Dict, Any, Optional
+
+from .pool import get_pool, configure_connection
+
+
+logger = logging.getLogger(__name__)
+
+
+class WriteQueue:
+    """
+    单写线程队列
+
+    所有写操作排队交给同一个线程执行，线程每次取出队列中已积压的全部操作，
+    在一个事务中依次执行后统一提交（group commit），一次fsync服务多个写请求。
+    每个操作包在独立的SAVEPOINT中，单个操作失败不会影响同批次的其他操作；
+    事务本身出错（SAVEPOINT回滚或提交失败等）时整批操作失败，写线程继续处理后续批次。
+    """
+
+    def __init__(self, db_path: str, max_batch: int = 64, timeout: float = 30):
+        """
+        初始化写连接并启动写线程
+
+        参数:
+            db_path: 数据库文件路径
+            max_batch: 单次提交最多合并的写操作数
+            timeout: execute() 等待写操作完成的默认超时（秒）
+        """
+        self.db_path = db_path
+        self.max_batch = max_batch
+        self.timeout = timeout
+        self._queue = queue.Queue()
+        # 写连接由写线程独占，事务完全由这里显式管理
+        self._conn = sqlite3.connect(db_path, check_same_thread=False, isolation_level=None)
+        self._conn.row_factory = sqlite3.Row
+        configure_connection(self._conn)
+        self._commits = 0
+        self._operations = 0
+        self._failed_commits = 0
+        self._failed_batches = 0
+        self._timeouts = 0
+        self._closed = False
+        self._thread_lock = threading.Lock()
+        self._thread = None
+        self._ensure_thread()
+
+    def _ensure_thread(self):
+        """启动写线程，写线程意外退出后由下一次提交重新启动"""
+        with self._thread_lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            if self._thread is not None:
+                logger.error("写线程已退出，重新启动")
+            self._thread = threading.Thread(target=self._run, name="sqlite-writer", daemon=True)
+            self._thread.start()
+
+    def submit(self, operation: Callable[[sqlite3.Connection], Any]) -> Future:
+        """
+        提交一个写操作，立即返回Future
+
+        操作在写线程中以写连接为参数执行，不能自行提交事务，也不能再次调用写队列。
+        Future在所在批次提交成功后才会完成。
+
+        参数:
+            operation: 接收写连接的可调用对象，其返回值即Future的结果
+
+        返回:
+            Future: 写操作结果
+        """
+        if self._closed:
+            raise RuntimeError("写队列已关闭")
+        self._ensure_thread()
+        future = Future()
+        self._queue.put((operation, future))
+        return future
+
+    def execute(self, operation: Callable[[sqlite3.Connection], Any], timeout: Optional[float] = None) -> Any:
+        """
+        提交一个写操作并等待其提交完成
+
+        参数:
+            operation: 接收写连接的可调用对象
+            timeout: 等待超时（秒），为None时使用创建写队列时的默认超时
+
+        返回:
+            Any: 操作的返回值，操作抛出的异常会原样抛出
+
+        异常:
+            concurrent.futures.TimeoutError: 超时仍未完成；操作尚未开始执行时会被取消，已开始执行的操作仍可能提交
+        """
+        future = self.submit(operation)
+        try:
+            return future.result(self.timeout if timeout is None else timeout)
+        except TimeoutError:
+            future.cancel()
+            self._timeouts += 1
+            raise
+
+    def _run(self):
+        """写线程主循环"""
+        while True:
+            item = self._queue.get()
+            if item is None:
+                break
+            batch = [item]
+            # 只合并已经在排队的操作，不为凑批次额外等待
+            while len(batch) < self.max_batch:
+                try:
+                    item = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if item is None:
+                    self._run_batch(batch)
+                    return
+                batch.append(item)
+            self._run_batch(batch)
+
+    def _run_batch(self, batch: list):
+        """
+        执行一批写操作，事务出错时回滚整批并让所有未完成的Future失败，写线程不会因此退出
+
+        参数:
+            batch: (操作, Future) 列表
+        """
+        try:
+            self._commit_batch(batch)
+        except BaseException as e:
+            self._failed_batches += 1
+            logger.exception("写事务执行失败，整批回滚", extra={"batch_size": len(batch)})
+            # SQLite在IOERR、FULL等错误后可能已自动回滚，此时不能再执行ROLLBACK
+            if self._conn.in_transaction:
+                try:
+                    self._conn.execute("ROLLBACK")
+                except sqlite3.Error:
+                    logger.exception("回滚写事务失败")
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            if not isinstance(e, Exception):
+                raise
+
+    def _commit_batch(self, batch: list):
+        """
+        在一个事务中执行一批写操作并提交
+
+        单个操作的异常只回滚该操作的SAVEPOINT；SAVEPOINT本身或提交出错时抛出，由 _run_batch 处理。
+
+        参数:
+            batch: (操作, Future) 列表
+        """
+        outcomes = []
+        try:
+            self._conn.execute("BEGIN IMMEDIATE")
+        except sqlite3.Error as e:
+            for _, future in batch:
+                if future.set_running_or_notify_cancel():
+                    future.set_exception(e)
+            return
+
+        for operation, future in batch:
+            if not future.set_running_or_notify_cancel():
+                continue
+            self._conn.execute("SAVEPOINT write_op")
+            try:
+                result = operation(self._conn)
+                self._conn.execute("RELEASE write_op")
+                outcomes.append((future, result, None))
+            except Exception as e:
+                self._conn.execute("ROLLBACK TO write_op")
+                self._conn.execute("RELEASE write_op")
+                outcomes.append((future, None, e))
+
+        try:
+            self._conn.execute("COMMIT")
+        except sqlite3.Error as e:
+            self._failed_commits += 1
+            if self._conn.in_transaction:
+                self._conn.execute("ROLLBACK")
+            for future, _, _ in outcomes:
+                future.set_exception(e)
+            return
+
+        self._commits += 1
+        self._operations += len(outcomes)
+        for future, result, error in outcomes:
+            if error is not None:
+                future.set_exception(error)
+            else:
+                future.set_result(result)
+
+    def close(self):
+        """执行完队列中剩余的写操作后停止写线程"""
+        if self._closed:
+            return
+        self._closed = True
+        self._queue.put(None)
+        self._thread.join()
+        self._conn.close()
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        获取写队列统计信息
+
+        返回:
+            Dict: 排队数、提交次数、已执行操作数、失败次数和平均批次大小
+        """
+        return {
+            "pending": self._queue.qsize(),
+            "commits": self._commits,
+            "operations": self._operations,
+            "failed_commits": self._failed_commits,
+            "failed_batches": self._failed_batches,
+            "timeouts": self._timeouts,
+            "avg_batch_size": round(self._operations / self._commits, 2) if self._commits else 0,
+        }
+
+
+_writers: Dict[str, WriteQueue] = {}
+_writers_lock = threading.Lock()
+
+
+def get_writer(db_path: str, max_batch: int = 64, timeout: float = 30) -> WriteQueue:
+    """
+    获取指定数据库的进程级写队列，首次调用时创建
+
+    参数:
+        db_path: 数据库文件路径
+        max_batch: 单次提交最多合并的写操作数，仅首次创建时生效
+        timeout: 等待写操作完成的默认超时（秒），仅首次创建时生效
+
+    返回:
+        WriteQueue: 写队列
+    """
+    writer = _writers.get(db_path)
+    if writer is None:
+        with _writers_lock:
+            writer = _writers.get(db_path)
+            if writer is None:
+                # 确保写入前表结构已迁移完成
+                get_pool(db_path)
+                writer = _writers[db_path] = WriteQueue(db_path, max_batch, timeout)
+    return writer
+
+
+@atexit.register
+def _close_writers():
+    """进程退出前提交所有排队中的写操作"""
+    for writer in list(_writers.values()):
+        writer.close()